@@ -1,7 +1,7 @@
 """
 PipeUpdUV - Salesforce Pipeline Data Integration Tool
 
-This script integrates Salesforce pipeline export data (XLS/XLSX) into an existing Excel
+This script integrates Salesforce pipeline export data (XLS/XLSX/CSV) into an existing Excel
 tracking file (XLSM) for B2B sales opportunity management. The system focuses on
 Opportunity (OpTY), Quotes, and Claims tracking while preserving manually entered data.
 
@@ -36,10 +36,24 @@ Usage:
 """
 
 import math
+import hashlib
+import csv
+import codecs
+import io
+import json
+import operator
+import zlib
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import Future, ProcessPoolExecutor
+import multiprocessing
 from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.styles import numbers
 from datetime import date,datetime
+import numpy as np
 import pandas as pd
+from pandas.io.parsers import TextParser
 import openpyxl
 import glob
 import os
@@ -49,7 +63,7 @@ import time
 import re
 import shutil
 import logging
-from typing import List, Optional, Tuple, Dict, Any
+from typing import List, Optional, Tuple, Dict, Any, Iterator
 from pathlib import Path
 from dotenv import load_dotenv
 from colorama import Fore, Style, init
@@ -68,7 +82,7 @@ VERSION_STRING = f"{VERSION_MAJOR}.{VERSION_MINOR}"
 
 # Excel format specifications
 V1_COLUMN_COUNT = 21  # Original format (without Week columns)
-V2_COLUMN_COUNT = 26  # Current format (with 5 Week columns)
+V2_COLUMN_COUNT = 26  # Current format (with the default 5 Week columns, see WEEK_COLUMNS)
 
 # Custom formatter for colored DEBUG and ERROR messages
 class ColoredFormatter(logging.Formatter):
@@ -220,17 +234,81 @@ if EXCLUDED_PIPE_OWNERS:
 else:
     EXCLUDED_PIPE_OWNERS = []
 
+# Export cleanup rules (see PipeCleanupRules)
+# Owner values of the report title/footer lines, separated by '|' (the footer text contains commas)
+PIPE_BOGUS_OWNERS = os.getenv("PIPE_BOGUS_OWNERS")
+if (PIPE_BOGUS_OWNERS == None or PIPE_BOGUS_OWNERS.strip() == ''):
+    PIPE_BOGUS_OWNERS = 'Total|Confidential Information - Do Not Distribute|Copyright © 2000-2023 salesforce.com, inc. All rights reserved.'
+PIPE_BOGUS_OWNERS = [owner.strip() for owner in PIPE_BOGUS_OWNERS.split('|') if owner.strip()]
+
+# Generic end customers are only kept for deals of at least GENERIC_MIN_TOTAL_PRICE
+GENERIC_CUSTOMER_PREFIX = os.getenv("GENERIC_CUSTOMER_PREFIX", "Generic")
+GENERIC_MIN_TOTAL_PRICE = float(os.getenv("GENERIC_MIN_TOTAL_PRICE", "50000"))
+
+EXCLUDED_PRODUCT_LINES = os.getenv("EXCLUDED_PRODUCT_LINES", "LM,MS,MR")
+# Parse comma-separated list and strip whitespace
+if EXCLUDED_PRODUCT_LINES:
+    EXCLUDED_PRODUCT_LINES = [line.strip() for line in EXCLUDED_PRODUCT_LINES.split(',') if line.strip()]
+else:
+    EXCLUDED_PRODUCT_LINES = []
+
+# Number of dynamic Week columns of Pipeline Sell Out, the current week in the middle
+WEEK_COLUMNS = int(os.getenv("WEEK_COLUMNS", "5"))
+
 # Owner Opty Tracking: Number of weeks to track in the details table
 WEEKS_TO_TRACK_DETAILS = int(os.getenv("WEEKS_TO_TRACK_DETAILS", "13"))
 
+# Quarter Invoice: first month of the fiscal year (1: calendar quarters)
+# A fiscal year is named after the calendar year it ends in (start month 4: April 2025 is Q1FY26)
+FISCAL_YEAR_START_MONTH = int(os.getenv("FISCAL_YEAR_START_MONTH", "1"))
+
 # Hidden tabs: List of Excel sheet names to hide
-HIDDEN_TABS = os.getenv("HIDDEN_TABS", "Owner Opty Tracking,Week History,Pipeline Close Lost,Owner Opty Tracking Details")
+HIDDEN_TABS = os.getenv("HIDDEN_TABS", "Owner Opty Tracking,Week History,Pipeline Close Lost,Owner Opty Tracking Details,Pipe Fingerprints")
 # Parse comma-separated list and strip whitespace
 if HIDDEN_TABS:
     HIDDEN_TABS = [tab.strip() for tab in HIDDEN_TABS.split(',') if tab.strip()]
 else:
     HIDDEN_TABS = []
 
+# Export reader backend: 'auto' (calamine if installed, else openpyxl), 'openpyxl' or 'calamine'
+PIPE_READER_ENGINE = os.getenv("PIPE_READER_ENGINE")
+if (PIPE_READER_ENGINE == None or PIPE_READER_ENGINE.strip() == ''): PIPE_READER_ENGINE='auto'
+
+# CSV exports are read in chunks of this many rows, cleanup filters run per chunk
+PIPE_CSV_CHUNKSIZE = int(os.getenv("PIPE_CSV_CHUNKSIZE", "50000"))
+
+# Exports are prepared by up to this many worker processes, in parallel with the tracking
+# workbook load and with each other for multi-part exports (0: everything in the main process)
+PIPE_LOAD_WORKERS = int(os.getenv("PIPE_LOAD_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Watch mode: seconds between two scans of DIRECTORY_PIPE_RAW, and seconds a new export
+# must stay unchanged (size and modification time) before it is processed
+PIPE_WATCH_INTERVAL = float(os.getenv("PIPE_WATCH_INTERVAL", "10"))
+PIPE_WATCH_SETTLE = float(os.getenv("PIPE_WATCH_SETTLE", "5"))
+
+# Columnar cache of parsed and cleaned exports (Parquet when pyarrow is installed)
+PIPE_CACHE = (str(os.getenv("PIPE_CACHE", "true")).lower() == 'true')
+
+# Incremental update: only the added, changed and removed lines of Pipeline Sell Out are written,
+# unchanged lines stay in place (new lines are added at the bottom instead of the export order)
+INCREMENTAL_UPDATE = (str(os.getenv("INCREMENTAL_UPDATE", "false")).lower() == 'true')
+
+PIPE_CACHE_DIR = os.getenv("PIPE_CACHE_DIR")
+if (PIPE_CACHE_DIR == None or PIPE_CACHE_DIR.strip() == ''):
+    # Default: 'PipeCache' folder next to the Salesforce export directory
+    if DIRECTORY_PIPE_RAW:
+        PIPE_CACHE_DIR = os.path.join(os.path.dirname(os.path.normpath(DIRECTORY_PIPE_RAW)), 'PipeCache')
+    else:
+        PIPE_CACHE_DIR = None
+
+# Change feed: JSON file of the opportunity lines added, removed or changed by each update
+# Default: next to OUTPUT_SUIVI_RAW ('<name>.changes.json'), 'none' to only fill the Change Feed tab
+CHANGE_FEED_FILE = os.getenv("CHANGE_FEED_FILE")
+if (CHANGE_FEED_FILE == None or CHANGE_FEED_FILE.strip() == ''):
+    CHANGE_FEED_FILE = f'{os.path.splitext(OUTPUT_SUIVI_RAW)[0]}.changes.json' if OUTPUT_SUIVI_RAW else None
+elif CHANGE_FEED_FILE.strip().lower() == 'none':
+    CHANGE_FEED_FILE = None
+
 # To avoid localisation colision
 # Define col index for labels in Pipe file
 # Only done for col name with problem
@@ -238,9 +316,14 @@ COL_OPTYOWNER=0
 COL_CREATED=1
 COL_CLOSED=2
 COL_STAGE=3
+COL_OPTYNUMBER=4
 COL_CUSTOMER=6
+COL_QTY=7
+COL_SALESPRICE=8
 COL_TOTPRICE=9
 COL_SALESMODELNAME=10
+COL_PRODUCTLINE=13
+COL_DEALTYPE=14
 
 # Global variable to store actual column names (language-specific)
 # This is set during dataframe processing after column reorganization
@@ -287,6 +370,18 @@ def display_environment_config() -> None:
         logger.debug(f"SKIP_ROW = {SKIP_ROW} (default: 12)")
         logger.debug(f"GRANULARITE = {repr(GRANULARITE)} (default: 'Date')")
         logger.debug(f"GRANULARITE_COL = {GRANULARITE_COL} (default: 0)")
+        logger.debug(f"PIPE_BOGUS_OWNERS = {PIPE_BOGUS_OWNERS}")
+        logger.debug(f"GENERIC_CUSTOMER_PREFIX = {repr(GENERIC_CUSTOMER_PREFIX)} (default: 'Generic')")
+        logger.debug(f"GENERIC_MIN_TOTAL_PRICE = {GENERIC_MIN_TOTAL_PRICE} (default: 50000)")
+        logger.debug(f"EXCLUDED_PRODUCT_LINES = {EXCLUDED_PRODUCT_LINES} (default: ['LM', 'MS', 'MR'])")
+        logger.debug(f"PIPE_READER_ENGINE = {repr(PIPE_READER_ENGINE)} (default: 'auto')")
+        logger.debug(f"PIPE_CSV_CHUNKSIZE = {PIPE_CSV_CHUNKSIZE} (default: 50000)")
+        logger.debug(f"PIPE_LOAD_WORKERS = {PIPE_LOAD_WORKERS} (default: CPU count, max 4)")
+        logger.debug(f"PIPE_WATCH_INTERVAL = {PIPE_WATCH_INTERVAL} (default: 10)")
+        logger.debug(f"PIPE_WATCH_SETTLE = {PIPE_WATCH_SETTLE} (default: 5)")
+        logger.debug(f"PIPE_CACHE = {PIPE_CACHE} (default: True)")
+        logger.debug(f"INCREMENTAL_UPDATE = {INCREMENTAL_UPDATE} (default: False)")
+        logger.debug(f"PIPE_CACHE_DIR = {repr(PIPE_CACHE_DIR)} (default: 'PipeCache' next to DIRECTORY_PIPE_RAW)")
 
         # Analysis configuration
         logger.debug(f"NORMAXDELTA = {NORMAXDELTA} (default: 10000000)")
@@ -295,14 +390,17 @@ def display_environment_config() -> None:
 
         # Testing configuration
         logger.debug(f"CURWEEK = {CURWEEK} (default: None - use current week)")
+        logger.debug(f"WEEK_COLUMNS = {WEEK_COLUMNS} (default: 5)")
 
         # Owner Opportunity Tracking configuration
         logger.debug(f"EXCLUDED_OPTY_OWNERS = {EXCLUDED_OPTY_OWNERS} (default: [])")
         logger.debug(f"EXCLUDED_PIPE_OWNERS = {EXCLUDED_PIPE_OWNERS} (default: [])")
         logger.debug(f"WEEKS_TO_TRACK_DETAILS = {WEEKS_TO_TRACK_DETAILS} (default: 13)")
+        logger.debug(f"FISCAL_YEAR_START_MONTH = {FISCAL_YEAR_START_MONTH} (default: 1)")
 
         # Excel tab configuration
-        logger.debug(f"HIDDEN_TABS = {HIDDEN_TABS} (default: ['Owner Opty Tracking', 'Week History', 'Pipeline Close Lost'])")
+        logger.debug(f"HIDDEN_TABS = {HIDDEN_TABS} (default: ['Owner Opty Tracking', 'Week History', 'Pipeline Close Lost', 'Owner Opty Tracking Details', 'Pipe Fingerprints'])")
+        logger.debug(f"CHANGE_FEED_FILE = {repr(CHANGE_FEED_FILE)} (default: '<OUTPUT_SUIVI_RAW>.changes.json')")
 
         # Backup configuration
         logger.debug(f"BCKUP_PIPE_FILE = {BCKUP_PIPE_FILE} (default: False)")
@@ -339,6 +437,12 @@ def validate_configuration() -> None:
     if ROLLINGWINDOWS > 31:
         logger.warning(f"ROLLINGWINDOWS value {ROLLINGWINDOWS} exceeds recommended maximum of 31")
 
+    if not 1 <= WEEK_COLUMNS <= 52:
+        raise ConfigurationError(f"WEEK_COLUMNS must be between 1 and 52: {WEEK_COLUMNS}")
+
+    if not 1 <= FISCAL_YEAR_START_MONTH <= 12:
+        raise ConfigurationError(f"FISCAL_YEAR_START_MONTH must be a month number (1-12): {FISCAL_YEAR_START_MONTH}")
+
     logger.info("Configuration validation completed successfully")
 
 ################################################################
@@ -377,14 +481,44 @@ def BackupPipeBefore(pipefullpath: str) -> bool:
 
     return True
 
+# Sub-folders of DIRECTORY_PIPE_RAW named '<name>.parts' hold the parts of one multi-part export
+MULTIPART_SUFFIX = '.parts'
+
+def ListPipeParts(path: str) -> List[str]:
+    """List the export files of a pipe: the file itself, or the parts of a multi-part export folder"""
+    if os.path.isdir(path):
+        return sorted(f for f in glob.glob(f'{path}/*.xls*') + glob.glob(f'{path}/*.csv') if os.path.isfile(f))
+    return [path]
+
+def ListPipeFiles(idir: str) -> List[str]:
+    """List the Salesforce exports in a directory
+
+    Excel workbooks and CSV files are single exports. Each sub-folder named
+    '<name>.parts' (MULTIPART_SUFFIX) is one multi-part export (report split by
+    owner, date range...) whose parts are merged at load time (see
+    LoadPipeExport). Other sub-folders (archives, backups...) are ignored.
+    """
+    files = glob.glob(f'{idir}/*.xls*') + glob.glob(f'{idir}/*.csv')
+    for folder in glob.glob(f'{idir}/*/'):
+        folder = os.path.normpath(folder)
+        if not folder.endswith(MULTIPART_SUFFIX):
+            logger.debug(f"Ignoring sub-folder {os.path.basename(folder)} (not a '{MULTIPART_SUFFIX}' multi-part export)")
+        elif ListPipeParts(folder):
+            files.append(folder)
+    return files
+
+def GetPipeTime(path: str) -> float:
+    """Creation time of an export, the latest part for a multi-part export"""
+    return max(os.path.getctime(part) for part in ListPipeParts(path))
+
 def GetLatestPipe(idir: str) -> str:
-    """Get the latest pipe file from directory"""
+    """Get the latest pipe file from directory (export time, see ListManifestPipes)"""
     try:
-        files = glob.glob(f'{idir}/*.xls*')
+        files = ListManifestPipes(idir)
         if not files:
-            raise PipeProcessingError(f"No Excel files found in directory: {idir}")
+            raise PipeProcessingError(f"No Excel or CSV files found in directory: {idir}")
 
-        latest_file = max(files, key=os.path.getctime)
+        latest_file = files[-1]
         # Create colored debug message for latest pipe file
         filename = os.path.basename(latest_file)
         colored_latest_message = f"Latest pipe file found: {Fore.GREEN}{filename}{Style.RESET_ALL}"
@@ -394,19 +528,62 @@ def GetLatestPipe(idir: str) -> str:
         logger.error(f"Error finding latest pipe file: {str(e)}")
         raise PipeProcessingError(f"Failed to find latest pipe file: {str(e)}")
 
-def GetAllPipe(idir: str) -> List[str]:
-    """Get all pipe files from directory, sorted by creation time"""
+def GetAllPipe(idir: str, unprocessed: bool = False) -> List[str]:
+    """Get all pipe files from directory, sorted by export time
+
+    Args:
+        idir: Export directory
+        unprocessed: Only the exports not processed yet (see MarkPipeProcessed)
+    """
     try:
-        files = glob.glob(f'{idir}/*.xls*')
-        if not files:
-            raise PipeProcessingError(f"No Excel files found in directory: {idir}")
+        files = ListManifestPipes(idir, unprocessed)
+        if not files and not unprocessed:
+            raise PipeProcessingError(f"No Excel or CSV files found in directory: {idir}")
 
-        files.sort(key=os.path.getctime)
-        logger.info(f"Found {len(files)} pipe files")
+        logger.info(f"Found {len(files)} {'unprocessed ' if unprocessed else ''}pipe files")
         return files
     except Exception as e:
         logger.error(f"Error getting all pipe files: {str(e)}")
         raise PipeProcessingError(f"Failed to get pipe files: {str(e)}")
+
+# Known header columns that should always be present in Salesforce extracts
+# Multiple language variants: each entry is a (language, headers) set
+# We need at least 2 matches from ANY language set
+PIPE_HEADER_LANGUAGES = [
+    ('English', ['Opportunity Owner', 'Created Date', 'Close Date', 'Stage']),
+    ('French', ['Propriétaire de l\'opportunité', 'Date de création', 'Date de clôture', 'Étape']),
+]
+
+# Extensions accepted as Salesforce exports
+PIPE_FILE_EXTENSIONS = ['.xls', '.xlsx', '.csv']
+
+# Report preamble line written by Salesforce when the export hit its row limit
+PIPE_TRUNCATED_NOTICE = re.compile(r'(exported first|premi[eè]res)\s+[\d\s,.\u202f]+\s*(rows|lignes)', re.IGNORECASE)
+
+def MatchHeaderRow(values: Any) -> Optional[Tuple[str, List[str]]]:
+    """Check if a row of cell values is the Salesforce column header row
+
+    Args:
+        values: Iterable of raw cell values for one row
+
+    Returns:
+        Tuple of (language name, matched headers) or None if the row is not a header
+    """
+    row_values = {str(v).strip() for v in values}
+    for lang_name, expected_headers in PIPE_HEADER_LANGUAGES:
+        matches = [header for header in expected_headers if header in row_values]
+        if len(matches) >= 2:
+            return lang_name, matches
+    return None
+
+def _FallbackHeaderRow(max_rows: int) -> int:
+    """Header row to use when auto-detection found nothing in the first max_rows rows"""
+    if SKIP_ROW > 0:
+        logger.warning(f"Could not auto-detect header row in first {max_rows} rows, using SKIP_ROW={SKIP_ROW}")
+        return SKIP_ROW
+    logger.warning(f"Could not auto-detect header row in first {max_rows} rows, defaulting to row 12")
+    return 12
+
 def DetectHeaderRow(pfile: str, max_rows: int = 30) -> int:
     """Automatically detect the header row in Salesforce extract files
 
@@ -414,6 +591,9 @@ def DetectHeaderRow(pfile: str, max_rows: int = 30) -> int:
     This function scans the first rows to find the actual column headers.
     Supports multiple languages (English, French, etc.)
 
+    Note: UpdatePipe uses LoadPipeFile, which performs the same detection
+    while streaming the file. This function is kept for standalone checks.
+
     Args:
         pfile: Path to the Excel file
         max_rows: Maximum number of rows to scan (default 30)
@@ -426,44 +606,23 @@ def DetectHeaderRow(pfile: str, max_rows: int = 30) -> int:
         PipeProcessingError: If header row cannot be found
     """
     try:
-        # Read first N rows without headers
-        df = pd.read_excel(pfile, nrows=max_rows, header=None)
-
-        # Known header columns that should always be present in Salesforce extracts
-        # Multiple language variants: each inner list is a language set
-        # We need at least 2 matches from ANY language set
-        expected_headers_multilang = [
-            # English
-            ['Opportunity Owner', 'Created Date', 'Close Date', 'Stage'],
-            # French
-            ['Propriétaire de l\'opportunité', 'Date de création', 'Date de clôture', 'Étape'],
-        ]
-
-        # Scan each row looking for these headers
-        for row_idx in range(len(df)):
-            row = df.iloc[row_idx]
-            # Convert row values to strings and check for expected headers
-            row_str = row.astype(str).str.strip()
-
-            # Check each language set
-            for lang_idx, expected_headers in enumerate(expected_headers_multilang):
-                # Count how many expected headers are found in this row
-                matches = sum(1 for header in expected_headers if header in row_str.values)
-
-                # If we find at least 2 of the expected headers, this is our header row
-                if matches >= 2:
-                    lang_name = ['English', 'French'][lang_idx] if lang_idx < 2 else f'Language {lang_idx}'
-                    logger.info(f"Auto-detected header row at line {row_idx + 1} (will skip {row_idx} rows) - {lang_name} format")
-                    logger.debug(f"Found {matches} matching headers: {[h for h in expected_headers if h in row_str.values]}")
-                    return row_idx
+        # Scan the first N rows looking for the expected headers
+        for row_idx, row in enumerate(GetPipeReader(pfile=pfile).iter_rows(pfile)):
+            if row_idx >= max_rows:
+                break
+            layout = MatchKnownLayout(row_idx, row)
+            if layout:
+                logger.info(f"Known export layout at line {row_idx + 1} (will skip {row_idx} rows) - {layout['language']} format")
+                return row_idx
+            match = MatchHeaderRow(row)
+            if match:
+                lang_name, matches = match
+                logger.info(f"Auto-detected header row at line {row_idx + 1} (will skip {row_idx} rows) - {lang_name} format")
+                logger.debug(f"Found {len(matches)} matching headers: {matches}")
+                return row_idx
 
         # If no header found in first max_rows, log warning and use SKIP_ROW or default
-        if SKIP_ROW > 0:
-            logger.warning(f"Could not auto-detect header row in first {max_rows} rows, using SKIP_ROW={SKIP_ROW}")
-            return SKIP_ROW
-        else:
-            logger.warning(f"Could not auto-detect header row in first {max_rows} rows, defaulting to row 12")
-            return 12
+        return _FallbackHeaderRow(max_rows)
 
     except Exception as e:
         error_msg = f"Error during header detection: {str(e)}"
@@ -473,30 +632,1455 @@ def DetectHeaderRow(pfile: str, max_rows: int = 30) -> int:
             return SKIP_ROW
         raise PipeProcessingError(error_msg)
 
-def CheckPipeFile(pfile: str) -> bool:
-    """Check if pipe file is valid Excel file"""
-    try:
-        if not os.path.isfile(pfile):
-            logger.error(f"File does not exist: {pfile}")
-            return False
+class PipeReader:
+    """Base class of the Salesforce export reader backends
+
+    A backend streams the rows of the first sheet of an export as lists of
+    cell values, converted the same way pandas does (empty cell -> '',
+    integral float -> int) so every backend builds the same DataFrame.
+    """
+    name = 'base'
+
+    @classmethod
+    def available(cls) -> bool:
+        """Check if the backend dependencies are installed"""
+        return True
+
+    def iter_rows(self, pfile: str) -> Iterator[List[Any]]:
+        """Yield the rows of the first sheet of pfile"""
+        raise NotImplementedError
+
+class OpenpyxlPipeReader(PipeReader):
+    """Reference backend: openpyxl in read-only (streaming) mode"""
+    name = 'openpyxl'
+
+    def iter_rows(self, pfile: str) -> Iterator[List[Any]]:
+        ext = os.path.splitext(pfile)[-1].lower()
+        if ext == '.xls':
+            # Legacy binary format is not supported by openpyxl, let pandas parse it once
+            df_raw = pd.read_excel(pfile, header=None)
+            for row in df_raw.itertuples(index=False):
+                yield ['' if pd.isna(v) else v for v in row]
+            return
+
+        workbook = openpyxl.load_workbook(pfile, read_only=True, data_only=True, keep_links=False)
+        try:
+            sheet = workbook.worksheets[0]
+            # Salesforce exports do not always carry a reliable dimension tag
+            sheet.reset_dimensions()
+            for row in sheet.iter_rows(values_only=True):
+                converted = []
+                for value in row:
+                    if value is None:
+                        value = ''
+                    elif isinstance(value, float) and value.is_integer():
+                        value = int(value)
+                    converted.append(value)
+                yield converted
+        finally:
+            workbook.close()
+
+class CalaminePipeReader(PipeReader):
+    """Fast backend: native Rust parser from the optional python-calamine package"""
+    name = 'calamine'
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            import python_calamine  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def iter_rows(self, pfile: str) -> Iterator[List[Any]]:
+        from python_calamine import CalamineWorkbook
+
+        workbook = CalamineWorkbook.from_path(pfile)
+        try:
+            sheet = workbook.get_sheet_by_index(0)
+            # Keep the leading empty rows/columns, the header offset depends on them
+            for row in sheet.to_python(skip_empty_area=False):
+                converted = []
+                for value in row:
+                    if isinstance(value, float) and value.is_integer():
+                        value = int(value)
+                    elif isinstance(value, date) and not isinstance(value, datetime):
+                        # Same type as the openpyxl backend for date-only cells
+                        value = datetime(value.year, value.month, value.day)
+                    converted.append(value)
+                yield converted
+        finally:
+            workbook.close()
+
+def SniffPipeCsv(pfile: str, sample_size: int = 64 * 1024) -> Tuple[str, str]:
+    """Detect the encoding and the delimiter of a CSV export
+
+    Salesforce writes UTF-8 (with or without BOM) or the Windows code page,
+    and uses ';' instead of ',' for locales with a decimal comma.
+
+    Returns:
+        Tuple of (encoding, delimiter)
+    """
+    with open(pfile, 'rb') as f:
+        sample = f.read(sample_size)
+
+    if sample.startswith(codecs.BOM_UTF8):
+        encoding = 'utf-8-sig'
+    else:
+        try:
+            sample.decode('utf-8')
+            encoding = 'utf-8'
+        except UnicodeDecodeError as e:
+            # A multi-byte character cut by the sample size is still valid UTF-8
+            encoding = 'utf-8' if e.start >= len(sample) - 3 else 'cp1252'
+
+    # The delimiter is the one that splits a line into the known header columns,
+    # the preamble lines and decimal commas make generic sniffing unreliable
+    text = sample.decode(encoding, errors='ignore')
+    for delimiter in (',', ';', '\t'):
+        for row in csv.reader(io.StringIO(text), delimiter=delimiter):
+            if MatchHeaderRow(row):
+                return encoding, delimiter
+
+    try:
+        delimiter = csv.Sniffer().sniff(text, delimiters=',;\t').delimiter
+    except csv.Error:
+        delimiter = ','
+    return encoding, delimiter
+
+class CsvPipeReader(PipeReader):
+    """Backend for CSV exports (header detection and validation only)
+
+    Values are kept as text, LoadPipeCsvChunks parses the data rows with
+    pd.read_csv once the header row is known.
+    """
+    name = 'csv'
+
+    def iter_rows(self, pfile: str) -> Iterator[List[Any]]:
+        encoding, delimiter = SniffPipeCsv(pfile)
+        with open(pfile, newline='', encoding=encoding) as f:
+            for row in csv.reader(f, delimiter=delimiter):
+                yield row
+
+# Available reader backends, selected with PIPE_READER_ENGINE
+PIPE_READERS = {
+    OpenpyxlPipeReader.name: OpenpyxlPipeReader,
+    CalaminePipeReader.name: CalaminePipeReader,
+}
+
+def IsCsvPipe(pfile: str) -> bool:
+    """Check if a Salesforce export is a CSV file"""
+    return os.path.splitext(pfile)[-1].lower() == '.csv'
+
+def GetPipeReader(engine: Optional[str] = None, pfile: Optional[str] = None) -> PipeReader:
+    """Return the export reader backend for the configured engine
+
+    Args:
+        engine: 'auto', 'openpyxl' or 'calamine' (default: PIPE_READER_ENGINE)
+        pfile: Export to read, CSV exports always use the csv backend
+
+    Returns:
+        Reader instance. 'auto' prefers calamine and falls back to openpyxl
+        when the fast engine is not installed.
+    """
+    if pfile and IsCsvPipe(pfile):
+        return CsvPipeReader()
+
+    engine = (engine or PIPE_READER_ENGINE).lower()
+
+    if engine == 'auto':
+        reader_class = CalaminePipeReader if CalaminePipeReader.available() else OpenpyxlPipeReader
+    elif engine in PIPE_READERS:
+        reader_class = PIPE_READERS[engine]
+        if not reader_class.available():
+            logger.warning(f"Reader engine '{engine}' is not installed, falling back to openpyxl")
+            reader_class = OpenpyxlPipeReader
+    else:
+        logger.warning(f"Unknown reader engine '{engine}', using openpyxl")
+        reader_class = OpenpyxlPipeReader
+
+    return reader_class()
+
+def _RowsToFrame(header: List[Any], data: List[List[Any]]) -> pd.DataFrame:
+    """Build the export DataFrame from the header row and the data rows
+
+    Applies the same trimming, padding, NA and dtype inference rules as
+    pd.read_excel so downstream processing is unchanged.
+    """
+    rows = [header] + data
+    for row in rows:
+        # Trim trailing empty cells
+        while row and row[-1] == '':
+            row.pop()
+
+    # Trim trailing empty rows (the header row is always kept)
+    last_row_with_data = 0
+    for row_idx, row in enumerate(rows):
+        if row:
+            last_row_with_data = row_idx
+    rows = rows[:last_row_with_data + 1]
+
+    # Extend rows to max width
+    max_width = max(len(row) for row in rows)
+    rows = [row + [''] * (max_width - len(row)) for row in rows]
+
+    with TextParser(rows, header=0) as parser:
+        return parser.read()
+
+def _LocateHeaderRow(rows: Iterator[List[Any]], max_rows: int) -> Tuple[List[List[Any]], int]:
+    """Consume rows until the header row is found
+
+    Args:
+        rows: Row iterator of a reader backend, left positioned after the header
+        max_rows: Maximum number of rows to scan for the header
+
+    Returns:
+        Tuple of (rows read so far, header included, number of rows before the header)
+    """
+    # Buffer the first rows until the header is found
+    head = []
+    skip_rows = None
+    for row_idx, row in enumerate(rows):
+        head.append(row)
+        notice = next((str(v) for v in row if isinstance(v, str) and PIPE_TRUNCATED_NOTICE.search(v)), None)
+        if notice:
+            logger.warning(f"Export is truncated by Salesforce ({notice.strip()}). Split the report into parts "
+                           f"saved in one '<name>{MULTIPART_SUFFIX}' sub-folder of DIRECTORY_PIPE_RAW to load all rows")
+        layout = MatchKnownLayout(row_idx, row)
+        if layout:
+            logger.info(f"Known export layout at line {row_idx + 1} (will skip {row_idx} rows) - {layout['language']} format")
+            skip_rows = row_idx
+            break
+        match = MatchHeaderRow(row)
+        if match:
+            lang_name, matches = match
+            logger.info(f"Auto-detected header row at line {row_idx + 1} (will skip {row_idx} rows) - {lang_name} format")
+            logger.debug(f"Found {len(matches)} matching headers: {matches}")
+            skip_rows = row_idx
+            break
+        if len(head) >= max_rows:
+            break
+
+    if skip_rows is None:
+        skip_rows = _FallbackHeaderRow(max_rows)
+        for row in rows:
+            if len(head) > skip_rows:
+                break
+            head.append(row)
+        if len(head) <= skip_rows:
+            raise PipeProcessingError(f"File has only {len(head)} rows, no header row found")
+
+    if SKIP_ROW > 0 and SKIP_ROW != skip_rows:
+        logger.warning(f"SKIP_ROW={SKIP_ROW} in .env differs from auto-detected {skip_rows}. Using auto-detected value.")
+        logger.warning("Note: SKIP_ROW is deprecated. Auto-detection is now used by default.")
+
+    return head, skip_rows
+
+def _ValidatePipePath(pfile: str) -> None:
+    """Raise PipeProcessingError if pfile is missing or not a supported export"""
+    if not os.path.isfile(pfile):
+        raise PipeProcessingError(f"File does not exist: {pfile}")
+
+    ext = os.path.splitext(pfile)[-1].lower()
+    if ext not in PIPE_FILE_EXTENSIONS:
+        raise PipeProcessingError(f"Invalid file extension: {ext}. Expected {' or '.join(PIPE_FILE_EXTENSIONS)}")
+
+def _IterCsvChunks(pfile: str, skip_rows: int, chunksize: int, keep: Optional[List[int]] = None) -> Iterator[pd.DataFrame]:
+    """Parse the data rows of a CSV export with pd.read_csv, chunksize rows at a time
+
+    When keep is given only those columns are parsed, returned in keep order.
+    """
+    encoding, delimiter = SniffPipeCsv(pfile)
+    # read_csv returns the selected columns in file order
+    order = [sorted(keep).index(idx) for idx in keep] if keep else None
+    try:
+        reader = pd.read_csv(pfile, skiprows=skip_rows, sep=delimiter, encoding=encoding,
+                             decimal=',' if delimiter == ';' else '.', chunksize=chunksize,
+                             usecols=keep)
+        with reader:
+            for chunk in reader:
+                yield chunk.iloc[:, order] if order else chunk
+    except Exception as e:
+        raise PipeProcessingError(f"Failed to read CSV file {pfile}: {str(e)}")
+
+def LoadPipeCsvChunks(pfile: str, max_rows: int = 30, chunksize: Optional[int] = None,
+                      project: bool = False) -> Tuple[Iterator[pd.DataFrame], int]:
+    """Detect the header row of a CSV export and return its data rows as chunks
+
+    Only the first rows are read to find the header, the data is parsed
+    lazily so callers can filter each chunk and keep memory flat.
+
+    Args:
+        pfile: Path to the CSV export
+        max_rows: Maximum number of rows to scan for the header (default 30)
+        chunksize: Rows per chunk (default PIPE_CSV_CHUNKSIZE)
+        project: Parse only the layout columns, chunks are returned in master order
+
+    Returns:
+        Tuple of (DataFrame chunk iterator, number of rows skipped before the header)
+
+    Raises:
+        PipeProcessingError: If the file is missing, invalid or cannot be parsed
+    """
+    _ValidatePipePath(pfile)
+
+    try:
+        rows = CsvPipeReader().iter_rows(pfile)
+        try:
+            head, skip_rows = _LocateHeaderRow(rows, max_rows)
+        finally:
+            rows.close()
+    except PipeProcessingError:
+        raise
+    except Exception as e:
+        raise PipeProcessingError(f"Failed to read CSV file {pfile}: {str(e)}")
+
+    chunksize = chunksize or PIPE_CSV_CHUNKSIZE
+    if not project:
+        return _IterCsvChunks(pfile, skip_rows, chunksize), skip_rows
+
+    keep = ProjectPipeColumns(head[skip_rows], skip_rows)
+    if keep is None:
+        chunks = (ReorgPipeColumns(chunk, skip_rows) for chunk in _IterCsvChunks(pfile, skip_rows, chunksize))
+        return chunks, skip_rows
+    return _IterCsvChunks(pfile, skip_rows, chunksize, keep), skip_rows
+
+def LoadPipeFile(pfile: str, max_rows: int = 30, project: bool = False) -> Tuple[pd.DataFrame, int]:
+    """Validate, detect the header row and load a Salesforce export in a single pass
+
+    The file is opened once: rows are streamed, the header row is detected
+    within the first max_rows rows (same rules as DetectHeaderRow) and the
+    remaining rows are collected into the DataFrame. CSV exports are parsed
+    with pd.read_csv (see LoadPipeCsvChunks).
+
+    Args:
+        pfile: Path to the Salesforce export
+        max_rows: Maximum number of rows to scan for the header (default 30)
+        project: Keep only the layout columns, returned in master order
+            (same columns as ReorgPipeColumns) without building the others
+
+    Returns:
+        Tuple of (pipe DataFrame, number of rows skipped before the header)
+
+    Raises:
+        PipeProcessingError: If the file is missing, invalid or cannot be parsed
+    """
+    if IsCsvPipe(pfile):
+        chunks, skip_rows = LoadPipeCsvChunks(pfile, max_rows, project=project)
+        df_pipe = pd.concat(list(chunks))
+        logger.info(f"Successfully loaded pipe file with {len(df_pipe)} initial rows (skipped {skip_rows} header rows)")
+        return df_pipe, skip_rows
+
+    _ValidatePipePath(pfile)
+
+    try:
+        reader = GetPipeReader()
+        logger.debug(f"Reading {os.path.basename(pfile)} with the {reader.name} engine")
+        rows = reader.iter_rows(pfile)
+        head, skip_rows = _LocateHeaderRow(rows, max_rows)
+        header = head[skip_rows]
+
+        keep = ProjectPipeColumns(header, skip_rows) if project else None
+        if keep:
+            # Keep only the needed cells of each row while streaming
+            getter = operator.itemgetter(*keep)
+            width = max(keep) + 1
+
+            def pick(row: List[Any]) -> List[Any]:
+                if len(row) < width:
+                    row = list(row) + [''] * (width - len(row))
+                return list(getter(row)) if len(keep) > 1 else [getter(row)]
+
+            header = pick(header)
+            data = [pick(row) for row in head[skip_rows + 1:]]
+            data.extend(pick(row) for row in rows)
+        else:
+            # Keep streaming the data rows after the header
+            data = head[skip_rows + 1:]
+            data.extend(rows)
+
+        df_pipe = _RowsToFrame(header, data)
+    except PipeProcessingError:
+        raise
+    except Exception as e:
+        raise PipeProcessingError(f"Failed to read Excel file {pfile}: {str(e)}")
+
+    if project and not keep:
+        df_pipe = ReorgPipeColumns(df_pipe, skip_rows)
+
+    logger.info(f"Successfully loaded pipe file with {len(df_pipe)} initial rows (skipped {skip_rows} header rows)")
+    return df_pipe, skip_rows
+
+def CheckPipeFile(pfile: str) -> bool:
+    """Check if pipe file is valid Excel file"""
+    if os.path.isdir(pfile):
+        parts = ListPipeParts(pfile)
+        if not parts:
+            logger.error(f"No Excel or CSV files found in multi-part export: {pfile}")
+            return False
+        return all(CheckPipeFile(part) for part in parts)
+
+    try:
+        # Container check only, the workbook itself is not parsed
+        ValidatePipeStructure(pfile)
+        logger.debug(f"Pipe file validation successful: {pfile}")
+        return True
+    except PipeProcessingError as e:
+        logger.error(str(e))
+        return False
+    except DataValidationError as e:
+        logger.error(f"File appears to be corrupted: {str(e)}")
+        return False
+    except Exception as e:
+        logger.error(f"Error validating pipe file {pfile}: {str(e)}")
+        return False
+
+# Signature of OLE2 compound files (legacy .xls workbooks)
+OLE2_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+# Open XML namespaces used to find the first worksheet part of an xlsx package
+OOXML_NS = {
+    'main': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+    'rel': 'http://schemas.openxmlformats.org/package/2006/relationships',
+}
+OOXML_REL_ID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+
+def _OoxmlRelationships(archive: zipfile.ZipFile, part: str) -> Dict[str, Tuple[str, str]]:
+    """Relationships of a package part: {Id: (Type, zip member name of the target)}"""
+    folder, name = posixpath.split(part)
+    rels = ET.fromstring(archive.read(posixpath.join(folder, '_rels', f'{name}.rels')))
+    result = {}
+    for rel in rels.findall('rel:Relationship', OOXML_NS):
+        target = rel.get('Target', '')
+        if target.startswith('/'):
+            target = target.lstrip('/')
+        else:
+            target = posixpath.normpath(posixpath.join(folder, target))
+        result[rel.get('Id')] = (rel.get('Type', ''), target)
+    return result
+
+def FirstWorksheetPart(archive: zipfile.ZipFile) -> str:
+    """Zip member name of the first worksheet of an xlsx package
+
+    Follows the package relationships (_rels/.rels -> workbook -> first
+    <sheet>) by reading only these small XML parts.
+
+    Raises:
+        DataValidationError: If a part or relationship is missing
+    """
+    try:
+        workbook = next((target for rel_type, target in _OoxmlRelationships(archive, '').values()
+                         if rel_type.endswith('/officeDocument')), None)
+        if workbook is None:
+            raise DataValidationError("Package has no workbook part")
+        sheet = ET.fromstring(archive.read(workbook)).find('main:sheets/main:sheet', OOXML_NS)
+        if sheet is None:
+            raise DataValidationError("Workbook has no worksheet")
+        rel = _OoxmlRelationships(archive, workbook).get(sheet.get(OOXML_REL_ID))
+        if rel is None:
+            raise DataValidationError(f"No relationship for worksheet '{sheet.get('name')}'")
+        return rel[1]
+    except KeyError as e:
+        raise DataValidationError(f"Missing package part: {str(e)}")
+    except ET.ParseError as e:
+        raise DataValidationError(f"Invalid package XML: {str(e)}")
+
+def ValidatePipeStructure(pfile: str) -> None:
+    """Check that an export is structurally sound without parsing the workbook
+
+    xlsx files: the ZIP central directory is readable, every member passes
+    its CRC check and the first worksheet part exists. xls files: OLE2
+    signature. CSV files: not empty. This takes milliseconds even for large
+    exports, so a whole export folder can be screened before processing.
+
+    Args:
+        pfile: Path to the Salesforce export
+
+    Raises:
+        PipeProcessingError: If the file is missing or has an unsupported extension
+        DataValidationError: If the file content is corrupted or not a workbook
+    """
+    _ValidatePipePath(pfile)
+
+    if IsCsvPipe(pfile):
+        if os.path.getsize(pfile) == 0:
+            raise DataValidationError("CSV file is empty")
+        return
+
+    with open(pfile, 'rb') as f:
+        signature = f.read(len(OLE2_SIGNATURE))
+    if signature == OLE2_SIGNATURE:
+        if os.path.splitext(pfile)[-1].lower() != '.xls':
+            raise DataValidationError("Legacy or password protected workbook saved with an xlsx extension")
+        return
+
+    try:
+        with zipfile.ZipFile(pfile) as archive:
+            bad_member = archive.testzip()
+            if bad_member:
+                raise DataValidationError(f"CRC check failed for {bad_member}")
+            sheet_part = FirstWorksheetPart(archive)
+            if sheet_part not in archive.NameToInfo:
+                raise DataValidationError(f"First worksheet part {sheet_part} is missing")
+    except (zipfile.BadZipFile, zlib.error, EOFError) as e:
+        raise DataValidationError(f"Not a valid workbook archive: {str(e)}")
+
+def CheckPipeFiles(paths: List[str]) -> Tuple[List[str], List[str]]:
+    """Screen exports with CheckPipeFile
+
+    Returns:
+        Tuple of (valid paths, invalid paths), in the given order
+    """
+    valid, invalid = [], []
+    for path in paths:
+        (valid if CheckPipeFile(path) else invalid).append(path)
+    return valid, invalid
+
+################################################################
+# Export Layout Resolution
+################################################################
+
+# Export columns in master order, with the names they can have in the report
+# (English names first, then the French report labels)
+PIPE_COLUMN_ALIASES = [
+    ('Opportunity Owner', ["Propriétaire de l'opportunité"]),
+    ('Created Date', ['Date de création']),
+    ('Close Date', ['Date de clôture']),
+    ('Stage', ['Étape', 'Etape']),
+    ('Opportunity Number', []),
+    ('Indirect Account', ['Revendeur']),
+    ('End Customer', ['Client Final']),
+    ('Estimated Quantity', ['Quantité']),
+    ('Sales Price', ['Prix de vente']),
+    ('Estimated Total Price', ['Prix total']),
+    ('Sales Model Name', ['Nom du produit']),
+    ('Part Number', ['Code du produit']),
+    ('Account Name', ['Grossiste']),
+    ('Product Line', []),
+    ('Deal Type', []),
+    ('Win Rate', []),
+]
+
+# Bump when the resolution rules change so stored layouts are resolved again
+PIPE_LAYOUT_VERSION = 2
+
+# Known layouts per store file (None key: in-memory only store)
+_pipe_layouts = {}
+
+def _HeaderNames(values: Any) -> List[str]:
+    """Normalize header names for fingerprinting
+
+    Blank and pandas 'Unnamed: n' columns become '' and trailing blank
+    columns are dropped, so the raw header row of a file and the columns
+    of the DataFrame loaded from it give the same names.
+    """
+    names = []
+    for value in values:
+        name = '' if value is None else str(value).strip()
+        if name.startswith('Unnamed:'):
+            name = ''
+        names.append(name)
+    while names and names[-1] == '':
+        names.pop()
+    return names
+
+def _DedupeHeaderNames(values: List[Any]) -> List[str]:
+    """Rename duplicate header cells the way pandas does ('Name', 'Name.1', ...)"""
+    seen = {}
+    names = []
+    for name in _HeaderNames(values):
+        if name and name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+def _LoadedColumnNames(values: List[Any]) -> List[str]:
+    """Column names pandas gives to an export header row (blank cells -> 'Unnamed: n')"""
+    return [name or f'Unnamed: {idx}' for idx, name in enumerate(_DedupeHeaderNames(values))]
+
+def FingerprintHeader(values: Any) -> str:
+    """Return the fingerprint of an export header row (or DataFrame columns)"""
+    return hashlib.sha256('\x1f'.join(_HeaderNames(values)).encode('utf-8')).hexdigest()[:16]
+
+def _PipeLayoutFile() -> Optional[str]:
+    """JSON file of the known layouts, stored with the pipe cache"""
+    if PIPE_CACHE and PIPE_CACHE_DIR:
+        return os.path.join(PIPE_CACHE_DIR, 'layouts.json')
+    return None
+
+def _ReadPipeLayouts(layout_file: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    """Read the layouts stored in a layout file (empty if missing, unreadable or outdated)"""
+    if layout_file and os.path.isfile(layout_file):
+        try:
+            with open(layout_file, encoding='utf-8') as f:
+                stored = json.load(f)
+            if stored.get('version') == PIPE_LAYOUT_VERSION:
+                return stored.get('layouts', {})
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable layout store {layout_file}: {str(e)}")
+    return {}
+
+def _LoadPipeLayouts() -> Dict[str, Dict[str, Any]]:
+    """Return the known layouts, read once per store file"""
+    layout_file = _PipeLayoutFile()
+    if layout_file not in _pipe_layouts:
+        _pipe_layouts[layout_file] = _ReadPipeLayouts(layout_file)
+    return _pipe_layouts[layout_file]
+
+def _SavePipeLayouts() -> None:
+    """Persist the known layouts next to the pipe cache
+
+    Worker processes parsing exports at the same time each save their own
+    copy: the layouts stored meanwhile by the others are merged in first.
+    """
+    layout_file = _PipeLayoutFile()
+    if not layout_file:
+        return
+    layouts = _LoadPipeLayouts()
+    tmp_file = f'{layout_file}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(PIPE_CACHE_DIR, exist_ok=True)
+        for fingerprint, layout in _ReadPipeLayouts(layout_file).items():
+            layouts.setdefault(fingerprint, layout)
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'version': PIPE_LAYOUT_VERSION, 'layouts': layouts}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_file, layout_file)
+    except Exception as e:
+        logger.warning(f"Could not write layout store {layout_file}: {str(e)}")
+
+def MatchKnownLayout(row_idx: int, values: Any) -> Optional[Dict[str, Any]]:
+    """Return the known layout whose header row is this row, if any
+
+    Only rows at a header offset already seen are fingerprinted, other rows
+    go through the regular header detection.
+    """
+    layouts = _LoadPipeLayouts()
+    if not layouts or row_idx not in {layout['skip_rows'] for layout in layouts.values()}:
+        return None
+    layout = layouts.get(FingerprintHeader(_DedupeHeaderNames(values)))
+    if layout and layout['skip_rows'] == row_idx:
+        return layout
+    return None
+
+def _ResolveColumnOrder(columns: List[Any]) -> Tuple[List[Any], str]:
+    """Resolve the master column order of an export header
+
+    Columns are matched by name against PIPE_COLUMN_ALIASES. When a master
+    column is missing the legacy positional reorder is used instead.
+
+    Returns:
+        Tuple of (column names in master order, 'name' or 'position')
+    """
+    names = [col for col in columns if not str(col).startswith('Unnamed:')]
+
+    lookup = {}
+    for canonical, aliases in PIPE_COLUMN_ALIASES:
+        for alias in [canonical] + aliases:
+            lookup[alias.lower()] = canonical
+
+    mapping = {}
+    for name in names:
+        canonical = lookup.get(str(name).strip().lower())
+        if canonical and canonical not in mapping:
+            mapping[canonical] = name
+
+    if len(mapping) == len(PIPE_COLUMN_ALIASES):
+        # Extra report columns are not used downstream and are left out
+        return [mapping[canonical] for canonical, _ in PIPE_COLUMN_ALIASES], 'name'
+
+    missing = [canonical for canonical, _ in PIPE_COLUMN_ALIASES if canonical not in mapping]
+    logger.warning(f"Export columns not recognized by name ({', '.join(missing)}), using positional order")
+    # Col numbers starts at 0
+    ordered = list(names)
+    Cval = ordered.pop(11)
+    ordered.insert(7, Cval)
+    Cval = ordered.pop(11)
+    ordered.insert(7, Cval)
+    return ordered, 'position'
+
+def ResolvePipeLayout(columns: List[Any], skip_rows: Optional[int] = None) -> Dict[str, Any]:
+    """Return the layout of an export from its loaded columns, resolving it once per fingerprint
+
+    A layout holds the header offset, the report language and the column
+    names in master order. Layouts are stored next to the pipe cache so
+    later exports of the same Salesforce report reuse them.
+
+    Args:
+        columns: Columns of the loaded export DataFrame
+        skip_rows: Header offset detected by the loader
+
+    Returns:
+        Layout dictionary (skip_rows, language, columns, resolved_by)
+    """
+    layouts = _LoadPipeLayouts()
+    fingerprint = FingerprintHeader(columns)
+    layout = layouts.get(fingerprint)
+    if layout and (skip_rows is None or layout['skip_rows'] == skip_rows):
+        return layout
+
+    match = MatchHeaderRow(columns)
+    ordered, resolved_by = _ResolveColumnOrder(list(columns))
+    layout = {
+        'skip_rows': skip_rows if skip_rows is not None else (layout or {}).get('skip_rows'),
+        'language': match[0] if match else 'Unknown',
+        'columns': [str(col) for col in ordered],
+        'resolved_by': resolved_by,
+    }
+    layouts[fingerprint] = layout
+    logger.debug(f"New export layout {fingerprint}: {layout['language']} header at line {layout['skip_rows']}, columns resolved by {resolved_by}")
+    _SavePipeLayouts()
+    return layout
+
+################################################################
+# Pipe Preparation and Cache
+################################################################
+
+# Bump when the preparation logic changes so cached exports are rebuilt
+PIPE_CACHE_VERSION = 6
+
+# Declared dtypes of the prepared export columns, applied once at load
+# Columns are referenced by position in master order (language independent)
+# Low-cardinality text is stored as categorical, dates as datetime64, prices and quantity as float
+PIPE_SCHEMA = {
+    COL_OPTYOWNER: 'category',
+    COL_CREATED: 'datetime64[ns]',
+    COL_CLOSED: 'datetime64[ns]',
+    COL_STAGE: 'category',
+    COL_QTY: 'float64',
+    COL_SALESPRICE: 'float64',
+    COL_TOTPRICE: 'float64',
+    COL_SALESMODELNAME: 'category',
+    COL_PRODUCTLINE: 'category',
+    COL_DEALTYPE: 'category',
+}
+
+def ProjectPipeColumns(header: List[Any], skip_rows: int) -> Optional[List[int]]:
+    """Return the positions of the export columns to read, in master order
+
+    Args:
+        header: Raw header row of the export
+        skip_rows: Header offset detected by the loader
+
+    Returns:
+        Positions in the header row of the layout columns, or None when the
+        header names cannot be mapped (the full export is loaded instead)
+    """
+    names = _LoadedColumnNames(header)
+    layout = ResolvePipeLayout(names, skip_rows)
+    position = {name: idx for idx, name in enumerate(names)}
+    try:
+        keep = [position[name] for name in layout['columns']]
+    except KeyError:
+        return None
+    logger.debug(f"Reading {len(keep)} of {len(header)} export columns")
+    return keep
+
+def ReorgPipeColumns(df_pipe: pd.DataFrame, skip_rows: Optional[int] = None) -> pd.DataFrame:
+    """Drop empty columns and reorder the export columns to the master layout
+
+    The column order comes from the export layout (see ResolvePipeLayout),
+    resolved by column name once per report layout.
+
+    Args:
+        df_pipe: Raw export DataFrame as loaded by LoadPipeFile
+        skip_rows: Header offset detected by the loader
+
+    Returns:
+        DataFrame with columns in master order
+    """
+    layout = ResolvePipeLayout(list(df_pipe.columns), skip_rows)
+
+    # Drop Empty Columns (more efficient with list comprehension)
+    unnamed_cols = [col for col in df_pipe.columns if str(col).startswith('Unnamed:')]
+    if unnamed_cols:
+        logger.debug(f"Dropped {len(unnamed_cols)} unnamed columns")
+
+    # Reorg Columns to fit the expected Master Format
+    # 'Opportunity Owner','Created Date','Close Date','Stage','Opportunity Number','Indirect Account','End Customer','Estimated Quantity','Sales Price','Estimated Total Price','Sales Model Name','Part Number','Account Name','Product Line','Deal Type'
+    by_name = {str(col): col for col in df_pipe.columns}
+    pcols = [by_name[name] for name in layout['columns']]
+    return df_pipe.reindex(columns=pcols)
+
+def PipeCleanupRules() -> List[Tuple[str, List[Tuple[int, str, Any]]]]:
+    """Cleanup rules applied to the export rows, built from the configuration
+
+    A rule drops the rows matching all of its (column, operator, argument)
+    conditions. Columns are positions in master order, operators are
+    'isin', 'isna', 'lt' and 'startswith'. A rule with an empty argument
+    (empty list or prefix) is disabled.
+
+    Returns:
+        List of (rule name, conditions) in evaluation order
+    """
+    generic = GENERIC_CUSTOMER_PREFIX
+    return [
+        ('bogus owner', [(COL_OPTYOWNER, 'isin', PIPE_BOGUS_OWNERS)]),
+        ('missing owner', [(COL_OPTYOWNER, 'isna', None)]),
+        ('missing customer', [(COL_CUSTOMER, 'isna', None)]),
+        ('excluded owner', [(COL_OPTYOWNER, 'isin', EXCLUDED_PIPE_OWNERS)]),
+        (f'{generic} customer under {GENERIC_MIN_TOTAL_PRICE:.0f}', [(COL_CUSTOMER, 'startswith', generic),
+                                                                     (COL_TOTPRICE, 'lt', GENERIC_MIN_TOTAL_PRICE)]),
+        (f'{generic} customer without price', [(COL_CUSTOMER, 'startswith', generic),
+                                               (COL_TOTPRICE, 'isna', None)]),
+        ('excluded product line', [(COL_PRODUCTLINE, 'isin', EXCLUDED_PRODUCT_LINES)]),
+    ]
+
+def _ConditionMask(series: pd.Series, op: str, arg: Any) -> pd.Series:
+    """Evaluate one cleanup rule condition on a column (NaN never matches but 'isna')"""
+    if op == 'isin':
+        return series.isin(arg)
+    if op == 'isna':
+        return series.isna()
+    if op == 'lt':
+        return sanitize_numeric_series(series, default=np.nan) < arg
+    if op == 'startswith':
+        if series.dtype.kind in 'biufcM':
+            # Column without any text in this chunk (e.g. all blank)
+            series = series.astype(object)
+        return series.str.startswith(arg, na=False)
+    raise ConfigurationError(f"Unknown cleanup rule operator: {op}")
+
+def CompileCleanupMask(df_pipe: pd.DataFrame, rules: Optional[List[Tuple[str, List[Tuple[int, str, Any]]]]] = None) -> Tuple[pd.Series, Dict[str, int]]:
+    """Evaluate the cleanup rules into a single boolean drop mask
+
+    Args:
+        df_pipe: Export DataFrame (or chunk) with columns in master order
+        rules: Rules to apply (default PipeCleanupRules())
+
+    Returns:
+        Tuple of (mask of the rows to drop, rows dropped per rule). A row
+        matching several rules is counted for the first one only.
+    """
+    pcols = list(df_pipe.columns.values)
+    drop = pd.Series(False, index=df_pipe.index)
+    counts = {}
+
+    for name, conditions in (PipeCleanupRules() if rules is None else rules):
+        if any(op != 'isna' and not arg for _, op, arg in conditions):
+            continue
+        match = pd.Series(True, index=df_pipe.index)
+        for col_idx, op, arg in conditions:
+            match &= _ConditionMask(df_pipe[pcols[col_idx]], op, arg)
+        match &= ~drop
+        counts[name] = int(match.sum())
+        drop |= match
+
+    return drop, counts
+
+def FilterPipeRows(df_pipe: pd.DataFrame) -> pd.DataFrame:
+    """Remove bogus, excluded and out of scope rows from the export
+
+    The cleanup rules are compiled into one mask and applied in a single
+    selection. Row filters only look at the row itself, so they can run on
+    each chunk of a large export independently.
+
+    Args:
+        df_pipe: Export DataFrame (or chunk) with columns in master order
+
+    Returns:
+        Filtered DataFrame
+    """
+    drop, counts = CompileCleanupMask(df_pipe)
+    for name, count in counts.items():
+        if count:
+            logger.debug(f"Cleanup rule '{name}' removed {count} rows")
+    logger.debug(f"Cleanup removed {int(drop.sum())} of {len(df_pipe)} rows")
+
+    return df_pipe[~drop].copy()
+
+def NormalizePipeData(df_pipe: pd.DataFrame) -> pd.DataFrame:
+    """Fill the blank Product Line/Opportunity/Model values and apply the export schema
+
+    Args:
+        df_pipe: Filtered export DataFrame with columns in master order
+
+    Returns:
+        DataFrame with normalized Opportunity/Model values and typed columns
+    """
+    pcols = list(df_pipe.columns.values)
+
+    df_pipe['Product Line'] = df_pipe['Product Line'].fillna("")
+    # df_pipe['Product Line'].fillna("", inplace=True) - Deprecated 3.12
+
+    # Cleanup OPTY (remove NaN)
+    df_pipe['Opportunity Number'] = df_pipe['Opportunity Number'].fillna("")
+    df_pipe[pcols[COL_SALESMODELNAME]] = df_pipe[pcols[COL_SALESMODELNAME]].fillna("")
+    # df_pipe['Opportunity Number'].fillna("", inplace=True) - Deprecated 3.12
+    # df_pipe[cols[COL_SALESMODELNAME]].fillna("", inplace=True) - Deprecated 3.12
+
+    return ApplyPipeSchema(df_pipe)
+
+def ApplyPipeSchema(df_pipe: pd.DataFrame) -> pd.DataFrame:
+    """Convert the export columns to the dtypes declared in PIPE_SCHEMA
+
+    Args:
+        df_pipe: Normalized export DataFrame with columns in master order
+
+    Returns:
+        DataFrame with typed columns (the other columns are left untouched)
+    """
+    pcols = list(df_pipe.columns.values)
+
+    for col_idx, dtype in PIPE_SCHEMA.items():
+        if col_idx >= len(pcols):
+            continue
+        col = pcols[col_idx]
+        try:
+            if dtype.startswith('datetime64'):
+                # One inferred format per column, 'mixed' parsing only for the odd values
+                df_pipe[col] = sanitize_date_series(df_pipe[col])
+            elif dtype == 'float64':
+                # Currency symbols and separators are stripped, invalid values become blank
+                df_pipe[col] = sanitize_numeric_series(df_pipe[col], default=np.nan)
+            else:
+                df_pipe[col] = df_pipe[col].astype(dtype)
+        except Exception as e:
+            logger.warning(f"Could not convert column '{col}' to {dtype}: {str(e)}")
+
+    logger.debug(f"Applied export schema to {len(PIPE_SCHEMA)} columns")
+    return df_pipe
+
+def CleanupPipeData(df_pipe: pd.DataFrame) -> pd.DataFrame:
+    """Apply the row filters and the normalization to a whole export DataFrame"""
+    df_pipe = FilterPipeRows(df_pipe)
+    logger.info(f'Pipe file contains {len(df_pipe)} rows after cleanup')
+    return NormalizePipeData(df_pipe)
+
+def PreparePipeData(pfile: str) -> Tuple[pd.DataFrame, int]:
+    """Load a Salesforce export and apply the column reorganisation and cleanup
+
+    Only the layout columns are read from the export. CSV exports are parsed
+    in chunks of PIPE_CSV_CHUNKSIZE rows and each chunk is filtered before
+    the next one is read.
+
+    Args:
+        pfile: Path to the Salesforce export
+
+    Returns:
+        Tuple of (cleaned pipe DataFrame, detected header row)
+    """
+    if IsCsvPipe(pfile):
+        chunks, skip_rows = LoadPipeCsvChunks(pfile, project=True)
+        raw_rows = 0
+        chunk_count = 0
+        parts = []
+        for chunk in chunks:
+            raw_rows += len(chunk)
+            chunk_count += 1
+            chunk = FilterPipeRows(chunk)
+            # Keep one (possibly empty) chunk so the columns are always known
+            if not chunk.empty or not parts:
+                parts.append(chunk)
+        if not parts:
+            raise PipeProcessingError(f"CSV file {pfile} has no data rows")
+        if len(parts) > 1 and parts[0].empty:
+            parts.pop(0)
+        logger.info(f"Successfully loaded pipe file with {raw_rows} initial rows in {chunk_count} chunk(s) (skipped {skip_rows} header rows)")
+        df_pipe = pd.concat(parts)
+        logger.info(f'Pipe file contains {len(df_pipe)} rows after cleanup')
+        return NormalizePipeData(df_pipe), skip_rows
+
+    df_pipe, skip_rows = LoadPipeFile(pfile, project=True)
+    df_pipe = CleanupPipeData(df_pipe)
+    return df_pipe, skip_rows
+
+def HashPipeFile(pfile: str) -> str:
+    """Return the SHA-256 hex digest of a file content"""
+    digest = hashlib.sha256()
+    with open(pfile, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _PipeCacheSignature() -> str:
+    """Short signature of the settings that change the prepared data"""
+    settings = f"{PIPE_CACHE_VERSION}|{SKIP_ROW}|{PipeCleanupRules()!r}"
+    return hashlib.sha256(settings.encode('utf-8')).hexdigest()[:8]
+
+def _PipeCacheFormat() -> str:
+    """Columnar format used for new cache entries ('parquet' or 'pkl' fallback)"""
+    try:
+        import pyarrow  # noqa: F401
+        return 'parquet'
+    except ImportError:
+        return 'pkl'
+
+def _ReadPipeCache(cache_file: str) -> pd.DataFrame:
+    """Read a cached prepared export"""
+    if cache_file.endswith('.parquet'):
+        df_pipe = pd.read_parquet(cache_file)
+        # Parquet restores missing text as None, keep pandas NaN like a fresh parse
+        for col in df_pipe.columns[df_pipe.dtypes == object]:
+            df_pipe[col] = df_pipe[col].where(df_pipe[col].notna(), np.nan)
+        return df_pipe
+    return pd.read_pickle(cache_file)
+
+def _WritePipeCache(df_pipe: pd.DataFrame, cache_base: str) -> Optional[str]:
+    """Write a prepared export to the cache, returns the cache file or None"""
+    os.makedirs(PIPE_CACHE_DIR, exist_ok=True)
+    formats = ['parquet', 'pkl'] if _PipeCacheFormat() == 'parquet' else ['pkl']
+    for fmt in formats:
+        cache_file = f'{cache_base}.{fmt}'
+        tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+        try:
+            if fmt == 'parquet':
+                df_pipe.to_parquet(tmp_file)
+            else:
+                df_pipe.to_pickle(tmp_file)
+            os.replace(tmp_file, cache_file)
+            return cache_file
+        except Exception as e:
+            logger.debug(f"Could not write {fmt} cache entry {cache_file}: {str(e)}")
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+    return None
+
+def _PrunePipeCache(content_hash: str, keep: str) -> None:
+    """Remove the other cache entries of an export (older signature or PIPE_CACHE_VERSION)"""
+    for entry in glob.glob(os.path.join(PIPE_CACHE_DIR, f'{content_hash}-h*-*.*')):
+        if entry == keep or entry.endswith('.tmp'):
+            continue
+        try:
+            os.remove(entry)
+            logger.debug(f"Removed outdated cache entry: {os.path.basename(entry)}")
+        except OSError as e:
+            logger.debug(f"Could not remove cache entry {entry}: {str(e)}")
+
+def IsPipeCached(pfile: str) -> bool:
+    """Check if the prepared data of an export is in the columnar cache"""
+    if not PIPE_CACHE or not PIPE_CACHE_DIR:
+        return False
+    try:
+        content_hash = ManifestPipeHash(pfile)
+    except OSError:
+        return False
+    entries = glob.glob(os.path.join(PIPE_CACHE_DIR, f'{content_hash}-h*-{_PipeCacheSignature()}.*'))
+    return any(not entry.endswith('.tmp') for entry in entries)
+
+def LoadPreparedPipe(pfile: str) -> pd.DataFrame:
+    """Return the prepared pipe DataFrame for an export, using the columnar cache
+
+    Cache entries live in PIPE_CACHE_DIR and are keyed on the export content
+    hash and the settings signature (see _PipeCacheSignature), so a renamed or
+    copied export is still a cache hit while any content change forces a new
+    parse. The detected header row is in the entry name for information only:
+    the same content always has the same header row. Writing an entry removes
+    the entries of the same export made with other settings.
+
+    Args:
+        pfile: Path to the Salesforce export
+
+    Returns:
+        Cleaned pipe DataFrame (same as PreparePipeData)
+    """
+    if not PIPE_CACHE or not PIPE_CACHE_DIR:
+        return PreparePipeData(pfile)[0]
+
+    try:
+        content_hash = ManifestPipeHash(pfile)
+    except OSError as e:
+        raise PipeProcessingError(f"Failed to read pipe file {pfile}: {str(e)}")
+
+    signature = _PipeCacheSignature()
+    for cache_file in glob.glob(os.path.join(PIPE_CACHE_DIR, f'{content_hash}-h*-{signature}.*')):
+        if cache_file.endswith('.tmp'):
+            continue
+        try:
+            df_pipe = _ReadPipeCache(cache_file)
+            logger.info(f"Loaded {len(df_pipe)} prepared rows from cache: {Fore.GREEN}{os.path.basename(cache_file)}{Style.RESET_ALL}")
+            return df_pipe
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache entry {cache_file}: {str(e)}")
+
+    df_pipe, skip_rows = PreparePipeData(pfile)
+
+    cache_base = os.path.join(PIPE_CACHE_DIR, f'{content_hash}-h{skip_rows}-{signature}')
+    try:
+        cache_file = _WritePipeCache(df_pipe, cache_base)
+        if cache_file:
+            logger.debug(f"Stored prepared export in cache: {cache_file}")
+            _PrunePipeCache(content_hash, cache_file)
+    except Exception as e:
+        logger.warning(f"Could not write pipe cache in {PIPE_CACHE_DIR}: {str(e)}")
+
+    return df_pipe
+
+def MergePipeParts(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Merge the prepared parts of a multi-part export into one pipe
+
+    Rows are identified by Opportunity Number + Sales Model Name (the pipe Key).
+    An opportunity line found in several parts (overlapping split ranges) is
+    kept from the first part only. Repeated lines inside one part are distinct
+    line items of the report and are all kept.
+
+    Args:
+        frames: Prepared parts, in part order
+
+    Returns:
+        Merged pipe DataFrame with the PIPE_SCHEMA dtypes
+    """
+    columns = frames[0].columns
+    for frame in frames[1:]:
+        if len(frame.columns) != len(columns):
+            raise PipeProcessingError(f"Export parts have different layouts: {list(frame.columns)} vs {list(columns)}")
+        # Parts may come from reports in another language, align on master order
+        frame.columns = columns
+
+    df_pipe = pd.concat(frames, ignore_index=True)
+    part = np.repeat(np.arange(len(frames)), [len(frame) for frame in frames])
+    # Grouped on the (Opportunity Number, Model Name) pair, like EncodeKeys: 'OPP-1' + '2X' is not 'OPP-12' + 'X'
+    pair = [_KeyPart(df_pipe.iloc[:, COL_OPTYNUMBER]), _KeyPart(df_pipe.iloc[:, COL_SALESMODELNAME])]
+    first_part = pd.Series(part).groupby(pair).transform('min').to_numpy()
+    keep = part == first_part
+
+    dropped = len(df_pipe) - int(keep.sum())
+    if dropped:
+        logger.info(f"Dropped {dropped} rows already present in an earlier export part")
+    # Concatenated categories fall back to object, restore the schema
+    return ApplyPipeSchema(df_pipe[keep].reset_index(drop=True))
+
+def StartPipeExport(path: str, pool: Optional[ProcessPoolExecutor] = None) -> Tuple[List[Any], Optional[ProcessPoolExecutor]]:
+    """Start preparing an export (file or multi-part folder) in worker processes
+
+    The parts missing from the pipe cache are submitted to a pool of up to
+    PIPE_LOAD_WORKERS processes and parsed while the caller goes on (e.g.
+    loads the tracking workbook). Cached parts are read by CollectPipeExport,
+    no process is started when every part is cached.
+
+    Args:
+        path: Salesforce export, or folder holding the parts of one export
+        pool: Pool shared by several exports, None to start one for this export
+
+    Returns:
+        Tuple of (one Future or part path per part, pool started here to shut down or None)
+    """
+    parts = ListPipeParts(path)
+    if not parts:
+        raise PipeProcessingError(f"No Excel or CSV files found in multi-part export: {path}")
+    if os.path.isdir(path):
+        logger.info(f"Multi-part export with {len(parts)} parts: {', '.join(os.path.basename(part) for part in parts)}")
+
+    uncached = [part for part in parts if not IsPipeCached(part)]
+    workers = min(PIPE_LOAD_WORKERS, len(uncached))
+    if workers < 1:
+        return list(parts), None
+    logger.debug(f"Preparing {len(uncached)} export part(s) of {os.path.basename(path)} in worker processes")
+    started = None
+    if pool is None:
+        pool = started = ProcessPoolExecutor(max_workers=workers)
+    return [pool.submit(LoadPreparedPipe, part) if part in uncached else part for part in parts], started
+
+def CollectPipeExport(path: str, pending: List[Any]) -> pd.DataFrame:
+    """Wait for the export started with StartPipeExport and return its prepared pipe
+
+    Args:
+        path: Path given to StartPipeExport
+        pending: Futures and part paths returned by StartPipeExport
+
+    Returns:
+        Cleaned pipe DataFrame, parts merged with MergePipeParts
+    """
+    frames = [item.result() if isinstance(item, Future) else LoadPreparedPipe(item) for item in pending]
+    if not os.path.isdir(path):
+        return frames[0]
+
+    df_pipe = MergePipeParts(frames)
+    logger.info(f"Merged export contains {len(df_pipe)} rows")
+    return df_pipe
+
+def StopPipePool(pool: ProcessPoolExecutor, pending: List[Any]) -> None:
+    """Cancel the parts not started yet and shut the pool down
+
+    Same as pool.shutdown(cancel_futures=True), which needs Python 3.9.
+    """
+    for item in pending:
+        if isinstance(item, Future):
+            item.cancel()
+    pool.shutdown()
+
+def LoadPipeExport(path: str) -> pd.DataFrame:
+    """Return the prepared pipe of an export file or of a multi-part export folder
+
+    The parts of a multi-part export are prepared in parallel (see
+    StartPipeExport) and merged with MergePipeParts.
+
+    Args:
+        path: Salesforce export, or folder holding the parts of one export
+
+    Returns:
+        Cleaned pipe DataFrame
+    """
+    if not os.path.isdir(path):
+        return LoadPreparedPipe(path)
+
+    pending, pool = StartPipeExport(path)
+    try:
+        return CollectPipeExport(path, pending)
+    finally:
+        if pool is not None:
+            StopPipePool(pool, pending)
+
+################################################################
+# Export Manifest
+################################################################
+
+# Bump when the manifest entries change so the export directory is indexed again
+PIPE_MANIFEST_VERSION = 1
+
+# Manifest entries per store file (None key: in-memory only store)
+_pipe_manifests = {}
+
+def ParseExportTime(name: str) -> Optional[datetime]:
+    """Export time found in a Salesforce export file name, if any
+
+    Recognizes the epoch milliseconds of the Salesforce 'report1700000000000.xlsx'
+    names (other long numbers are not timestamps) and dates like
+    'Pipe-2025-11-20-10-15-33.xlsx' or 'Pipe_20251120.csv'.
+    """
+    match = re.search(r'(?i)(?<![a-z])report(1\d{12})(?!\d)', name)
+    if match:
+        return datetime.fromtimestamp(int(match.group(1)) / 1000)
+    match = re.search(r'(?<!\d)(20\d{2})[-_]?(\d{2})[-_]?(\d{2})(?:[-_ T]?(\d{2})[-_:h]?(\d{2})(?:[-_:]?(\d{2}))?)?(?!\d)', name)
+    if match:
+        try:
+            return datetime(*(int(part or 0) for part in match.groups()))
+        except ValueError:
+            return None
+    return None
+
+def HashPipeExport(path: str) -> str:
+    """Content hash of an export, combined over the parts of a multi-part export"""
+    if not os.path.isdir(path):
+        return HashPipeFile(path)
+    return hashlib.sha256('|'.join(HashPipeFile(part) for part in ListPipeParts(path)).encode()).hexdigest()
+
+def _PipeManifestFile() -> Optional[str]:
+    """JSON manifest of the export directory, stored with the pipe cache"""
+    if PIPE_CACHE and PIPE_CACHE_DIR:
+        return os.path.join(PIPE_CACHE_DIR, 'manifest.json')
+    return None
+
+def _LoadPipeManifest() -> Dict[str, Dict[str, Any]]:
+    """Return the manifest entries {export path: entry}, read once per store file"""
+    manifest_file = _PipeManifestFile()
+    if manifest_file not in _pipe_manifests:
+        exports = {}
+        if manifest_file and os.path.isfile(manifest_file):
+            try:
+                with open(manifest_file, encoding='utf-8') as f:
+                    stored = json.load(f)
+                if stored.get('version') == PIPE_MANIFEST_VERSION:
+                    exports = stored.get('exports', {})
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable export manifest {manifest_file}: {str(e)}")
+        _pipe_manifests[manifest_file] = exports
+    return _pipe_manifests[manifest_file]
+
+def _SavePipeManifest() -> None:
+    """Persist the manifest next to the pipe cache
+
+    Only the main process writes the manifest: worker processes parsing
+    exports hold a stale copy that would overwrite its entries.
+    """
+    manifest_file = _PipeManifestFile()
+    if not manifest_file:
+        return
+    if multiprocessing.parent_process() is not None:
+        logger.debug(f"Export manifest {manifest_file} not written from a worker process")
+        return
+    tmp_file = f'{manifest_file}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(PIPE_CACHE_DIR, exist_ok=True)
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'version': PIPE_MANIFEST_VERSION, 'exports': _LoadPipeManifest()}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_file, manifest_file)
+    except Exception as e:
+        logger.warning(f"Could not write export manifest {manifest_file}: {str(e)}")
+
+def _ManifestTime(entry: Dict[str, Any]) -> float:
+    """Sort key of a manifest entry: export time from the file name, else modification time"""
+    if entry.get('exported'):
+        return datetime.fromisoformat(entry['exported']).timestamp()
+    return entry['mtime']
+
+def RefreshPipeManifest(idir: str) -> Dict[str, Dict[str, Any]]:
+    """Bring the manifest of an export directory up to date
+
+    Each export (file or multi-part folder) has an entry with its size,
+    modification time, content hash, export time parsed from the name and
+    the time it was processed. Only new or modified exports are hashed, an
+    export whose content was already seen is flagged as a duplicate.
+    Content hashes are only computed when the manifest is persisted
+    (PIPE_CACHE enabled), otherwise duplicates are not detected.
+
+    Args:
+        idir: Export directory
+
+    Returns:
+        Manifest entries of the directory {export path: entry}
+    """
+    exports = _LoadPipeManifest()
+    persisted = _PipeManifestFile() is not None
+    root = os.path.normpath(os.path.abspath(idir))
+    changed = False
+
+    found = set()
+    for path in ListPipeFiles(idir):
+        path = os.path.normpath(os.path.abspath(path))
+        found.add(path)
+        stats = [os.stat(part) for part in ListPipeParts(path)]
+        size = sum(stat.st_size for stat in stats)
+        mtime = max(stat.st_mtime for stat in stats)
+        entry = exports.get(path)
+        if entry and entry['size'] == size and entry['mtime'] == mtime:
+            continue
+        exported = ParseExportTime(os.path.basename(path))
+        exports[path] = {
+            'size': size,
+            'mtime': mtime,
+            'hash': HashPipeExport(path) if persisted else None,
+            'exported': exported.isoformat() if exported else None,
+            'processed': None,
+            'duplicate_of': None,
+        }
+        changed = True
+
+    for path in [path for path in exports if os.path.dirname(path) == root and path not in found]:
+        del exports[path]
+        changed = True
+
+    entries = {path: exports[path] for path in found}
+    if changed:
+        # The oldest export of a content is the original, later copies are duplicates
+        originals = {}
+        for path in sorted(entries, key=lambda path: (_ManifestTime(entries[path]), path)):
+            entry = entries[path]
+            original = originals.setdefault(entry['hash'], path) if entry['hash'] else path
+            duplicate_of = original if original != path else None
+            if duplicate_of and entry['duplicate_of'] != duplicate_of:
+                logger.warning(f"Export {os.path.basename(path)} is a duplicate of {os.path.basename(duplicate_of)}, it will be ignored")
+            entry['duplicate_of'] = duplicate_of
+        _SavePipeManifest()
+    return entries
+
+def ListManifestPipes(idir: str, unprocessed: bool = False) -> List[str]:
+    """Exports of a directory sorted by export time, duplicates excluded
+
+    The export time comes from the file name (Salesforce names carry it),
+    else the file modification time. Creation time is not used: it changes
+    when files are copied or synced.
+
+    Args:
+        idir: Export directory
+        unprocessed: Only the exports not processed yet
+
+    Returns:
+        Export paths, oldest first
+    """
+    entries = RefreshPipeManifest(idir)
+    paths = [path for path, entry in entries.items()
+             if not entry['duplicate_of'] and not (unprocessed and entry['processed'])]
+    return sorted(paths, key=lambda path: (_ManifestTime(entries[path]), path))
+
+def ManifestPipeHash(pfile: str) -> str:
+    """Content hash of an export file, taken from the manifest when the file is unchanged"""
+    entry = _LoadPipeManifest().get(os.path.normpath(os.path.abspath(pfile)))
+    if entry and entry.get('hash'):
+        stat = os.stat(pfile)
+        if entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            return entry['hash']
+    return HashPipeFile(pfile)
+
+def MarkPipeProcessed(path: str) -> None:
+    """Record in the manifest that an export was processed"""
+    exports = _LoadPipeManifest()
+    entry = exports.get(os.path.normpath(os.path.abspath(path)))
+    if entry is not None:
+        entry['processed'] = datetime.now().isoformat(timespec='seconds')
+        _SavePipeManifest()
+
+################################################################
+# Calendar
+################################################################
+
+# Calendar table shared by the week and quarter derivations: one row per day,
+# whole years around the dates looked up so far (extended when needed)
+_calendar = {'table': None, 'fiscal_start': None}
 
-        ext = os.path.splitext(pfile)[-1].lower()
-        if ext not in ['.xls', '.xlsx']:
-            logger.error(f"Invalid file extension: {ext}. Expected .xls or .xlsx")
-            return False
+def BuildCalendarTable(first_year: int, last_year: int) -> pd.DataFrame:
+    """Build the calendar table of the days from first_year to last_year
 
-        # Try to read the file to ensure it's not corrupted
-        try:
-            pd.read_excel(pfile, nrows=1)
-        except Exception as e:
-            logger.error(f"File appears to be corrupted: {str(e)}")
-            return False
+    Args:
+        first_year: First calendar year of the table
+        last_year: Last calendar year of the table
 
-        logger.debug(f"Pipe file validation successful: {pfile}")
-        return True
-    except Exception as e:
-        logger.error(f"Error validating pipe file {pfile}: {str(e)}")
-        return False
+    Returns:
+        DataFrame indexed on the day with the columns 'ISO Year', 'ISO Week',
+        'Week' (W01-W53), 'Fiscal Quarter' (QnFYyy, see GetQFFromDate) and
+        '53 Weeks' (the ISO year of the day has a week 53)
+    """
+    days = pd.date_range(date(first_year, 1, 1), date(last_year, 12, 31), freq='D')
+    iso = days.isocalendar()
+
+    fiscal_month = (days.month - FISCAL_YEAR_START_MONTH) % 12
+    fiscal_year = days.year + ((days.month >= FISCAL_YEAR_START_MONTH) & (FISCAL_YEAR_START_MONTH > 1))
+
+    # An ISO year has 53 weeks when its December 28 is in week 53
+    iso_years = np.arange(iso['year'].min(), iso['year'].max() + 1)
+    long_years = iso_years[pd.DatetimeIndex([date(year, 12, 28) for year in iso_years]).isocalendar()['week'].to_numpy() == 53]
+
+    table = pd.DataFrame({
+        'ISO Year': iso['year'].astype('int64'),
+        'ISO Week': iso['week'].astype('int64'),
+        'Fiscal Quarter': 'Q' + pd.Index(fiscal_month // 3 + 1).astype(str)
+                          + 'FY' + pd.Index(fiscal_year % 100).astype(str).str.zfill(2),
+    }, index=days)
+    table.insert(2, 'Week', 'W' + table['ISO Week'].astype(str).str.zfill(2))
+    table['53 Weeks'] = table['ISO Year'].isin(long_years)
+    return table
+
+def CalendarTable(dates: Optional[pd.Series] = None) -> pd.DataFrame:
+    """Return the calendar table, covering today and the given dates
+
+    The table is built once and only rebuilt (on whole years) when dates
+    outside of it are looked up or FISCAL_YEAR_START_MONTH changes.
+    """
+    years = [datetime.now().year - 1, datetime.now().year + 1]
+    if dates is not None and dates.notna().any():
+        years += [dates.min().year, dates.max().year]
+
+    table = _calendar['table']
+    if (table is None or _calendar['fiscal_start'] != FISCAL_YEAR_START_MONTH
+            or min(years) < table.index[0].year or max(years) > table.index[-1].year):
+        if table is not None and _calendar['fiscal_start'] == FISCAL_YEAR_START_MONTH:
+            years += [table.index[0].year, table.index[-1].year]
+        _calendar['table'] = BuildCalendarTable(min(years), max(years))
+        _calendar['fiscal_start'] = FISCAL_YEAR_START_MONTH
+    return _calendar['table']
+
+def CalendarAttributes(dates: pd.Series) -> pd.DataFrame:
+    """Join a date column to the calendar table
+
+    Args:
+        dates: Dates (text values are parsed with sanitize_date_series)
+
+    Returns:
+        Calendar columns on the index of dates, NaN for missing dates
+    """
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = sanitize_date_series(dates)
+    days = dates.dt.normalize()
+    joined = CalendarTable(days).reindex(days.to_numpy())
+    joined.index = dates.index
+    return joined
+
+def IsoWeeksInYear(year: int) -> int:
+    """Return the number of ISO weeks of a year (52 or 53)"""
+    table = CalendarTable(pd.Series([pd.Timestamp(year, 12, 28)]))
+    return 53 if table.at[pd.Timestamp(year, 12, 28), '53 Weeks'] else 52
 
 ################################################################
 # Data Validation Functions
@@ -524,16 +2108,136 @@ def sanitize_numeric_value(value: Any, default: float = 0.0) -> float:
         logger.warning(f"Could not convert '{value}' to numeric, using default {default}")
         return default
 
+def sanitize_numeric_series(series: pd.Series, default: float = 0.0) -> pd.Series:
+    """Column version of sanitize_numeric_value
+
+    Numbers are kept, text values are stripped of currency symbols and
+    formatting with vectorized string operations and converted at once.
+    Only the values that still fail go through sanitize_numeric_value.
+
+    Args:
+        series: Column to convert
+        default: Value for blank or invalid cells
+
+    Returns:
+        float64 Series with the same index
+    """
+    if series.dtype.kind in 'biuf':
+        return series.astype('float64').fillna(default)
+
+    values = series.astype(object)
+    result = pd.Series(default, index=series.index, dtype='float64')
+    blank = values.isna() | (values == '')
+    is_text = values.map(lambda value: isinstance(value, str)) & ~blank
+
+    # Text: remove currency symbols and formatting, no digit left means default
+    cleaned = values[is_text].str.replace(r'[^\d.-]', '', regex=True)
+    no_digit = cleaned == ''
+    result[cleaned.index] = pd.to_numeric(cleaned.where(~no_digit), errors='coerce').where(~no_digit, default)
+
+    # Numbers and other values
+    others = ~blank & ~is_text
+    result[others] = pd.to_numeric(values[others], errors='coerce')
+
+    # Values pandas cannot convert (e.g. '1.2.3', dates) keep the per-cell rules and warnings
+    failed = result.isna() & ~blank
+    if failed.any():
+        result[failed] = [sanitize_numeric_value(value, default) for value in values[failed]]
+    return result
+
 def sanitize_date_value(value: Any) -> Optional[datetime]:
     """Safely convert value to datetime"""
     try:
         if pd.isna(value) or value == '':
             return None
+        if isinstance(value, datetime):
+            # Already parsed (e.g. typed export date column)
+            return value
         return pd.to_datetime(value, format='mixed')
     except Exception as e:
         logger.warning(f"Could not convert '{value}' to datetime: {str(e)}")
         return None
 
+# Date formats tried on text date columns, in order of preference
+# Month first comes before day first, like the 'mixed' parser for ambiguous dates
+PIPE_DATE_FORMATS = ['ISO8601', '%m/%d/%Y', '%d/%m/%Y', '%m/%d/%Y %H:%M', '%d/%m/%Y %H:%M',
+                     '%m/%d/%Y %I:%M %p', '%d.%m.%Y', '%d.%m.%Y %H:%M', '%d-%m-%Y', '%Y/%m/%d']
+# Plain delimited dates are parsed faster by pandas' native day/month parser than by strptime,
+# once the column order (day or month first) is known
+PIPE_DATE_FAST_PATHS = {
+    '%m/%d/%Y': {'format': 'mixed', 'dayfirst': False},
+    '%d/%m/%Y': {'format': 'mixed', 'dayfirst': True},
+    '%d.%m.%Y': {'format': 'mixed', 'dayfirst': True},
+    '%d-%m-%Y': {'format': 'mixed', 'dayfirst': True},
+}
+
+def InferDateFormat(values: pd.Series, sample_size: int = 500) -> Optional[str]:
+    """Return the first format of PIPE_DATE_FORMATS that parses every sampled value
+
+    Args:
+        values: Text dates (no blanks)
+        sample_size: Number of distinct values checked
+
+    Returns:
+        strftime format (or 'ISO8601'), None when no single format fits
+    """
+    sample = pd.Series(values.unique()[:sample_size])
+    if sample.empty:
+        return None
+    for fmt in PIPE_DATE_FORMATS:
+        try:
+            if pd.to_datetime(sample, format=fmt, errors='coerce').notna().all():
+                return fmt
+        except (ValueError, TypeError):
+            continue
+    return None
+
+def sanitize_date_series(series: pd.Series) -> pd.Series:
+    """Column version of sanitize_date_value, parsing text dates with one inferred format
+
+    Date cells are converted as is. Text dates are parsed with the format
+    inferred from a sample (see InferDateFormat), only the values that do
+    not match it go through the slower 'mixed' parser. Invalid dates
+    become NaT.
+
+    Args:
+        series: Column to convert
+
+    Returns:
+        datetime64 Series with the same index
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    values = series.astype(object)
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    if kind in ('datetime', 'datetime64', 'date', 'empty'):
+        # Excel date cells only
+        return pd.to_datetime(values, errors='coerce')
+    if kind == 'string':
+        # Text export (CSV): no date cells to convert
+        result = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+        text = values.dropna()
+    else:
+        is_text = values.map(lambda value: isinstance(value, str))
+        result = pd.to_datetime(values.where(~is_text), errors='coerce')
+        text = values[is_text]
+
+    text = text.str.strip()
+    text = text[text != '']
+    if not text.empty:
+        fmt = InferDateFormat(text)
+        if fmt:
+            parsed = pd.to_datetime(text, errors='coerce', **PIPE_DATE_FAST_PATHS.get(fmt, {'format': fmt}))
+            logger.debug(f"Parsing column '{series.name}' with date format {fmt}")
+        else:
+            parsed = pd.Series(pd.NaT, index=text.index, dtype='datetime64[ns]')
+        failed = parsed.isna()
+        if failed.any():
+            parsed[failed] = pd.to_datetime(text[failed], format='mixed', errors='coerce')
+        result[text.index] = parsed
+    return result
+
 def sanitize_string_value(value: Any, default: str = '') -> str:
     """Safely convert value to string"""
     try:
@@ -545,77 +2249,212 @@ def sanitize_string_value(value: Any, default: str = '') -> str:
 
 #Mapping Date to Quarter FYear
 def GetQFFromDate(cdate: datetime) -> Tuple[int, str]:
+    """Return the fiscal quarter and the 2 digits fiscal year of a date (see FISCAL_YEAR_START_MONTH)"""
+    fiscal_month = (cdate.month - FISCAL_YEAR_START_MONTH) % 12
+    Quarter = fiscal_month // 3 + 1
+
+    # The fiscal year is named after the calendar year it ends in
+    fiscal_year = cdate.year + (1 if FISCAL_YEAR_START_MONTH > 1 and cdate.month >= FISCAL_YEAR_START_MONTH else 0)
+    Year = str(fiscal_year)[-2:]
+
+    return Quarter, Year
+
+
+#Opportunity Keys
+# Integer Key of each (Opportunity Number, Model Name) pair, shared by df_pipe, df_master and
+# the Week History of one update. Code book of the pairs (code: position), see ResetKeyCodes
+_key_codes = {'pairs': None}
+
+# Key of a blank pair (no Opportunity Number and no Model Name)
+NO_KEY = -1
+
+def ResetKeyCodes() -> None:
+    """Start a new Key code book (codes are only comparable within one update)"""
+    _key_codes['pairs'] = None
+
+def _KeyPart(values: pd.Series) -> np.ndarray:
+    """Text of a Key component, missing values as ''"""
+    values = values.astype(object)
+    return values.where(values.notna(), '').astype(str).to_numpy()
+
+def EncodeKeys(opty: pd.Series, model: pd.Series) -> pd.Series:
+    """Encode (Opportunity Number, Model Name) pairs as dense integer Keys
+
+    A pair gets the same code in every frame encoded since ResetKeyCodes,
+    so Key joins and membership tests run on int arrays. Unlike the former
+    concatenated text Key, two distinct pairs never share a Key (e.g.
+    'OPP-1' + '2X' and 'OPP-12' + 'X').
+
+    Args:
+        opty: Opportunity Number column
+        model: Model Name column (same length)
 
-    cm = cdate.month
-    if cm < 4:
-        Quarter = 1
+    Returns:
+        int64 Series on the index of opty, NO_KEY for blank pairs
+    """
+    pairs = pd.MultiIndex.from_arrays([_KeyPart(opty), _KeyPart(model)])
+    book = _key_codes['pairs']
+    if book is None:
+        book = pairs.unique()
     else:
-        if cm < 7:
-            Quarter = 2
-        else:
-            if cm < 10:
-                Quarter = 3
-            else:
-                Quarter = 4
+        book = book.append(pairs[book.get_indexer(pairs) < 0].unique())
+    _key_codes['pairs'] = book
 
-    Year = str(cdate.year)[-2:]
+    codes = book.get_indexer(pairs)
+    codes[(pairs.get_level_values(0) == '') & (pairs.get_level_values(1) == '')] = NO_KEY
+    return pd.Series(codes, index=opty.index, dtype='int64')
 
-    return Quarter, Year
+def EncodeWeekHistoryKeys(df_whisto: pd.DataFrame) -> pd.DataFrame:
+    """Replace the text 'key' of the Week History rows by their Key code (see EncodeKeys)
+
+    Rows migrated from the old format only have the concatenated text key:
+    they are matched against the pairs already encoded (df_pipe and
+    df_master) and get their Opportunity Number and Model Name back.
+    """
+    if df_whisto.empty:
+        df_whisto['key'] = pd.Series(dtype='int64')
+        return df_whisto
 
+    legacy = ((_KeyPart(df_whisto['Opportunity Number']) == '') & (_KeyPart(df_whisto['Model Name']) == '')
+              & (_KeyPart(df_whisto['key']) != ''))
+    book = _key_codes['pairs']
+    if legacy.any() and book is not None:
+        # First known pair of each concatenated text key
+        texts = pd.Series(np.arange(len(book)), index=book.get_level_values(0) + book.get_level_values(1))
+        texts = texts[~texts.index.duplicated()]
+        found = texts.reindex(_KeyPart(df_whisto['key'])).to_numpy()
+        rows = legacy & ~np.isnan(found)
+        codes = found[rows].astype('int64')
+        df_whisto.loc[rows, 'Opportunity Number'] = book.get_level_values(0)[codes]
+        df_whisto.loc[rows, 'Model Name'] = book.get_level_values(1)[codes]
+        logger.info(f"Week History: {int(rows.sum())} rows of the old format matched to their opportunity")
+
+    df_whisto['key'] = EncodeKeys(df_whisto['Opportunity Number'], df_whisto['Model Name'])
+    return df_whisto
 
 #Generic Mapping Functions
-def Mapping_Generic(Key: str, Col: str) -> str:
+# Key index of df_master, rebuilt when df_master is replaced
+_master_index = {'frame': None, 'rows': 0, 'first': {}, 'last': {}}
+
+def MasterRowPosition(Key: int, first: bool = False) -> Optional[int]:
+    """Return the df_master row position of a Key, None if the Key is not in the master
+
+    The Key index is built once per master (one pass over the Key column)
+    instead of scanning the master for every lookup. A Key found on
+    several master rows resolves to its last row, or to its first row with
+    first=True (the Qty and Revenue fallbacks read the first one).
+    """
+    if df_master is None or 'Key' not in df_master.columns:
+        return None
+    return _MasterKeyIndex()['first' if first else 'last'].get(Key)
+
+def _MasterKeyIndex() -> Dict[str, Any]:
+    """Return the Key index of df_master, built on first use after a master change"""
+    if _master_index['frame'] is not df_master or _master_index['rows'] != len(df_master):
+        keys = df_master['Key'].tolist()
+        _master_index['frame'] = df_master
+        _master_index['rows'] = len(keys)
+        # Later rows overwrite earlier ones: last position per Key
+        _master_index['last'] = dict(zip(keys, range(len(keys))))
+        _master_index['first'] = dict(zip(reversed(keys), range(len(keys) - 1, -1, -1)))
+    return _master_index
+
+def MasterRowPositions(keys: pd.Series, first: bool = False) -> np.ndarray:
+    """Column version of MasterRowPosition: master row position of each Key, -1 if not found"""
+    if df_master is None or df_master.empty or 'Key' not in df_master.columns:
+        return np.full(len(keys), -1, dtype='int64')
+    positions = keys.map(_MasterKeyIndex()['first' if first else 'last'])
+    return positions.fillna(-1).to_numpy(dtype='int64')
+
+def JoinMasterColumns(keys: pd.Series, columns: List[str], first: bool = False) -> pd.DataFrame:
+    """Left join of a Key column to df_master columns
+
+    Every Key is resolved once against the master Key index, then all the
+    columns are taken from the master in one go, so the cost does not grow
+    with the number of Key lookups per column. Keys found on several master
+    rows use the same row as MasterRowPosition (the last one, or the first
+    one with first=True).
+
+    Args:
+        keys: Key column of the rows to enrich
+        columns: df_master columns to bring over (missing ones are left out)
+        first: Use the first master row of duplicated Keys
+
+    Returns:
+        DataFrame on the index of keys, NaN where the Key is not in the master
+    """
+    present = list(dict.fromkeys(Col for Col in columns if df_master is not None and Col in df_master.columns))
+    positions = MasterRowPositions(keys, first)
+    found = positions >= 0
+    values = np.full((len(keys), len(present)), np.nan, dtype=object)
+    if present:
+        values[found] = df_master[present].to_numpy(dtype=object)[positions[found]]
+    return pd.DataFrame(values, index=keys.index, columns=present, dtype=object)
+
+def Mapping_Generic(Key: int, Col: str) -> str:
     """Generic mapping function to get value from master dataframe"""
     try:
         if df_master is None or df_master.empty:
             return ''
 
-        rowval = df_master.loc[df_master['Key'] == Key]
-        if len(rowval) == 0:
+        pos = MasterRowPosition(Key)
+        if pos is None:
             return ''
 
-        rtv = rowval.at[rowval.index[-1], Col]
+        rtv = df_master[Col].iat[pos]
         return sanitize_string_value(rtv)
     except Exception as e:
         logger.debug(f"Error in Mapping_Generic for Key {Key}, Col {Col}: {str(e)}")
         return ''
 
+# Sanitized numeric master columns, rebuilt when df_master is replaced
+_master_numeric = {'frame': None, 'columns': {}}
+
+def MasterNumericColumn(Col: str) -> pd.Series:
+    """Return a df_master column converted with sanitize_numeric_series (once per master)"""
+    if _master_numeric['frame'] is not df_master:
+        _master_numeric['frame'] = df_master
+        _master_numeric['columns'] = {}
+    if Col not in _master_numeric['columns']:
+        _master_numeric['columns'][Col] = sanitize_numeric_series(df_master[Col])
+    return _master_numeric['columns'][Col]
+
 #Mapping Functions for
 # 'Estimated\nQuantity', 'Revenu From\nEstinated Qty', 'Quarter Invoice\nFacturation', 'Forecast projet\nMenu déroulant', 'Next Step & Support demandé / Commentaire'
 
-def Mapping_Qty(Key: str) -> Any:
+def Mapping_Qty(Key: int) -> Any:
     """Map quantity values with formula handling"""
     try:
         eq = Mapping_Generic(Key, 'Estimated\nQuantity')
 
         if str(eq).startswith('=') or str(eq) == '':
-            rowval = df_master.loc[df_master['Key'] == Key]
-            if len(rowval) > 0 and 'Quantité' in rowval.columns:
-                eq = rowval['Quantité'].values[0]
+            pos = MasterRowPosition(Key, first=True)
+            if pos is not None and 'Quantité' in df_master.columns:
+                eq = df_master['Quantité'].iat[pos]
 
         return sanitize_numeric_value(eq) if eq else ''
     except Exception as e:
         logger.debug(f"Error in Mapping_Qty for Key {Key}: {str(e)}")
         return ''
 
-def Mapping_RevEur(Key: str) -> Any:
+def Mapping_RevEur(Key: int) -> Any:
     """Map revenue values with formula and calculation handling"""
     try:
         rev = Mapping_Generic(Key, 'Revenu From\nEstinated Qty')
 
         if rev and rev != '':
-            rowval = df_master.loc[df_master['Key'] == Key]
-            if len(rowval) == 0:
+            pos = MasterRowPosition(Key, first=True)
+            if pos is None:
                 return ''
 
             if str(rev).startswith('='):
-                if 'Prix total' in rowval.columns:
-                    rev = sanitize_numeric_value(rowval['Prix total'].values[0])
+                if 'Prix total' in df_master.columns:
+                    rev = MasterNumericColumn('Prix total').iat[pos]
             else:
                 # Calculate from quantity and price
-                if 'Estimated\nQuantity' in rowval.columns and 'Prix de vente' in rowval.columns:
-                    qty = sanitize_numeric_value(rowval['Estimated\nQuantity'].values[0])
-                    price = sanitize_numeric_value(rowval['Prix de vente'].values[0])
+                if 'Estimated\nQuantity' in df_master.columns and 'Prix de vente' in df_master.columns:
+                    qty = MasterNumericColumn('Estimated\nQuantity').iat[pos]
+                    price = MasterNumericColumn('Prix de vente').iat[pos]
                     rev = qty * price
 
         return rev if rev else ''
@@ -661,6 +2500,9 @@ def Mapping_QtrInvoice(row: pd.Series) -> str:
 
     return seq
 
+# Forecast labels, from the lowest Win Rate bucket to the highest
+FORECAST_LABELS = ["LOST = Perdu", "UNCOMMITED = Pas certain", "UNCOMMITED UPSIDE = Certain à 50% du WIN","COMMIT AT RISK = Certain à 75% du WIN","COMMIT = Certain à 100% du WIN","WIN = Gagné"]
+
 def Mapping_FrCast(row: pd.Series) -> str:
     """Map forecast values based on Win Rate and Stage
 
@@ -677,7 +2519,7 @@ def Mapping_FrCast(row: pd.Series) -> str:
     eq = Mapping_Generic(Key,'Forecast projet\nMenu déroulant')
     seq = str(eq)
 
-    AS = ["LOST = Perdu", "UNCOMMITED = Pas certain", "UNCOMMITED UPSIDE = Certain à 50% du WIN","COMMIT AT RISK = Certain à 75% du WIN","COMMIT = Certain à 100% du WIN","WIN = Gagné"]
+    AS = FORECAST_LABELS
 
 # Update : Automatic fill of the column value base on Win Rate column ... If not empty
     fcast = seq
@@ -714,7 +2556,7 @@ def Mapping_FrCast(row: pd.Series) -> str:
 
     return fcast
 
-def Mapping_NxtStp(Key: str) -> str:
+def Mapping_NxtStp(Key: int) -> str:
     """Map next step comments from existing data
 
     Args:
@@ -726,6 +2568,143 @@ def Mapping_NxtStp(Key: str) -> str:
 
     return Mapping_Generic(Key,'Next Step & Support demandé / Commentaire')
 
+#Column versions of the mappings, on the whole Key column at once
+# Manually entered columns carried over from df_master
+MANUAL_COLUMNS = ['Estimated\nQuantity', 'Revenu From\nEstinated Qty', 'Quarter Invoice\nFacturation',
+                  'Forecast projet\nMenu déroulant', 'Next Step & Support demandé / Commentaire']
+
+def sanitize_string_series(series: pd.Series, default: str = '') -> pd.Series:
+    """Column version of sanitize_string_value"""
+    return series.astype(str).str.strip().where(series.notna(), default)
+
+def MasterStringColumns(keys: pd.Series, columns: List[str]) -> pd.DataFrame:
+    """Column version of Mapping_Generic: master values of the Keys as text, '' when not found"""
+    joined = JoinMasterColumns(keys, columns)
+    return pd.DataFrame({Col: sanitize_string_series(joined[Col]) if Col in joined.columns else ''
+                         for Col in columns}, index=keys.index)
+
+def MapManualColumns(keys: pd.Series) -> pd.DataFrame:
+    """Column version of Mapping_Qty, Mapping_RevEur and Mapping_NxtStp
+
+    The manually entered columns are brought over with one join of the Keys
+    to df_master, then the formula rules are applied as column operations:
+    a formula or a blank quantity falls back to 'Quantité', a formula
+    revenue to 'Prix total' and any other revenue is recomputed from the
+    quantity and the sales price (first master row of duplicated Keys).
+
+    Args:
+        keys: Key column of df_pipe
+
+    Returns:
+        DataFrame on the index of keys with the MANUAL_COLUMNS, Quarter Invoice
+        and Forecast hold the master values the derivation rules start from
+    """
+    mapped = MasterStringColumns(keys, MANUAL_COLUMNS)
+    first = MasterRowPositions(keys, first=True)
+    found = first >= 0
+    master_columns = df_master.columns if df_master is not None else []
+
+    # Quantity: formulas and blanks read the master 'Quantité', blank values stay blank
+    eq = mapped['Estimated\nQuantity']
+    qty = eq.astype(object)
+    fallback = (eq.str.startswith('=') | (eq == '')).to_numpy() & found
+    if 'Quantité' in master_columns:
+        qty[fallback] = df_master['Quantité'].to_numpy(dtype=object)[first[fallback]]
+    kept = qty.astype(bool)
+    mapped['Estimated\nQuantity'] = ''
+    mapped.loc[kept, 'Estimated\nQuantity'] = sanitize_numeric_series(qty[kept]).astype(object)
+
+    # Revenue: formulas read the master 'Prix total', values are recomputed from quantity and price
+    rev = mapped['Revenu From\nEstinated Qty']
+    revenue = rev.astype(object)
+    filled = (rev != '').to_numpy() & found
+    formula = rev.str.startswith('=').to_numpy()
+    if 'Prix total' in master_columns:
+        rows = filled & formula
+        revenue[rows] = MasterNumericColumn('Prix total').to_numpy()[first[rows]]
+    if 'Estimated\nQuantity' in master_columns and 'Prix de vente' in master_columns:
+        rows = filled & ~formula
+        revenue[rows] = (MasterNumericColumn('Estimated\nQuantity').to_numpy()[first[rows]]
+                         * MasterNumericColumn('Prix de vente').to_numpy()[first[rows]])
+    mapped['Revenu From\nEstinated Qty'] = revenue.where(revenue.astype(bool), '')
+
+    return mapped
+
+def MapQuarterInvoiceColumn(close_dates: pd.Series, preserved: pd.Series) -> pd.Series:
+    """Column version of Mapping_QtrInvoice
+
+    The fiscal quarter and year (QnFYyy, see GetQFFromDate) of the whole
+    Close Date column come from one join to the calendar table. Rows
+    without a close date keep the value of the tracking file.
+
+    Args:
+        close_dates: Close Date column of df_pipe (parsed by ApplyPipeSchema)
+        preserved: Quarter Invoice values of the tracking file (see MapManualColumns)
+
+    Returns:
+        Quarter Invoice column on the index of close_dates
+    """
+    quarters = CalendarAttributes(close_dates)['Fiscal Quarter']
+    dated = quarters.notna()
+    return preserved.astype(object).where(~dated, quarters)
+
+def _ParseWinRate(value: str) -> float:
+    """float() of a Win Rate text without its '%' signs, NaN if it cannot be read"""
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+def MapForecastColumn(stage: pd.Series, win_rate: pd.Series, preserved: pd.Series) -> pd.Series:
+    """Column version of Mapping_FrCast
+
+    Closed Won opportunities are WIN, a valid Forecast entered in the
+    tracking file is kept, the others are bucketed on their Win Rate (blank
+    Win Rate: blank Forecast). Win Rates that cannot be read keep the
+    tracking file value and are counted in a warning.
+
+    Args:
+        stage: Stage column of df_pipe
+        win_rate: Win Rate column of df_pipe ('75%' text values)
+        preserved: Forecast values of the tracking file (see MapManualColumns)
+
+    Returns:
+        Forecast column on the index of stage
+    """
+    labels = np.array(FORECAST_LABELS, dtype=object)
+    won = (stage.astype(str).str.lower() == 'closed won').to_numpy()
+    todo = ~won & ~preserved.isin(FORECAST_LABELS).to_numpy()
+
+    rates = win_rate.astype(object)
+    is_text = rates.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+    text = rates.where(is_text, '').str.replace('%', '', regex=False)
+    blank = is_text & (text.str.strip() == '').to_numpy()
+
+    # float() of the values pandas cannot read (e.g. '1_000'), non finite values are not bucketed
+    wr = pd.to_numeric(text.where(is_text & ~blank), errors='coerce')
+    retry = wr.isna().to_numpy() & is_text & ~blank
+    if retry.any():
+        wr[retry] = [_ParseWinRate(value) for value in text[retry]]
+    wr = wr.to_numpy(dtype='float64')
+    finite = np.isfinite(wr)
+
+    # Same bucket as Mapping_FrCast, including Python negative indexing of the labels
+    num_ranges = len(FORECAST_LABELS)
+    index = np.trunc(np.where(finite, (wr - 1) / (100 / num_ranges), 0))
+    index = np.minimum(index, num_ranges - 1)
+    bucketed = finite & (index >= -num_ranges)
+    index = np.where(index < 0, index + num_ranges, index).astype('int64')
+
+    forecast = preserved.astype(object).to_numpy(copy=True)
+    forecast[todo & blank] = ''
+    forecast[todo & bucketed] = labels[index[todo & bucketed]]
+    forecast[won] = "WIN = Gagné"
+
+    unread = todo & ~blank & ~bucketed & rates.notna().to_numpy()
+    if unread.any():
+        logger.warning(f"{int(unread.sum())} Win Rate value(s) could not be read, Forecast kept from the tracking file")
+    return pd.Series(forecast, index=stage.index, dtype=object)
+
 def DetectWeekShift(df_master: pd.DataFrame) -> Tuple[int, List[str]]:
     """Detect if there will be a week shift and return shift amount and existing week columns
 
@@ -748,9 +2727,9 @@ def DetectWeekShift(df_master: pd.DataFrame) -> Tuple[int, List[str]]:
             logger.info("No existing week columns found, no shift needed")
             return 0, []
 
-        # Find the center column (should be column X, the 3rd of 5 columns)
-        if len(existing_week_columns) >= 3:
-            center_column = existing_week_columns[2]  # Column X (0-indexed: V=0, W=1, X=2)
+        # Find the center column (the current week: column X, the 3rd of 5 columns)
+        if existing_week_columns:
+            center_column = existing_week_columns[(len(existing_week_columns) - 1) // 2]
 
             # Extract week number from center column (e.g., "Week 39" -> 39)
             if center_column.startswith('Week '):
@@ -758,11 +2737,11 @@ def DetectWeekShift(df_master: pd.DataFrame) -> Tuple[int, List[str]]:
                     center_week = int(center_column.replace('Week ', ''))
                     shift_amount = current_week - center_week
 
-                    # Handle year rollover
+                    # Handle year rollover (53 weeks ISO years included)
                     if shift_amount > 26:  # More than half year forward
-                        shift_amount -= 52  # Assume we went to previous year
+                        shift_amount -= IsoWeeksInYear(datetime.now().year)  # Assume we went to previous year
                     elif shift_amount < -26:  # More than half year backward
-                        shift_amount += 52  # Assume we went to next year
+                        shift_amount += IsoWeeksInYear(datetime.now().year - 1)  # Assume we went to next year
 
                     logger.info(f"Detected week shift: current week {current_week}, center was {center_week}, shift amount: {shift_amount}")
                     return shift_amount, existing_week_columns
@@ -797,29 +2776,33 @@ def ApplyWeekShiftFromHistory(df_master: pd.DataFrame, df_whisto: pd.DataFrame,
         # Find existing week columns in df_master
         existing_week_columns = [col for col in df_master.columns if col and str(col).startswith('Week ')]
 
-        if len(existing_week_columns) < 5:
-            logger.warning(f"Expected 5 week columns, found {len(existing_week_columns)}")
+        if len(existing_week_columns) < len(new_week_columns):
+            logger.warning(f"Expected {len(new_week_columns)} week columns, found {len(existing_week_columns)}")
             return df_master
 
+        # First history row of each key
+        history_keys = df_whisto['key'].tolist()
+        history_positions = dict(zip(reversed(history_keys), range(len(history_keys) - 1, -1, -1)))
+
         # For each row in df_master that has a Key
         for idx, row in df_master.iterrows():
-            if 'Key' not in row or pd.isna(row['Key']) or str(row['Key']).strip() == '':
+            if row['Key'] == NO_KEY:
                 continue
 
-            key = str(row['Key'])
+            key = row['Key']
 
             # Find this key in the history DataFrame
-            history_rows = df_whisto[df_whisto['key'] == key]
-            if len(history_rows) == 0:
+            position = history_positions.get(key)
+            if position is None:
                 # Clear week columns for this key since no history exists
                 for col in existing_week_columns:
                     if col in df_master.columns:
                         df_master.at[idx, col] = ''
                 continue
 
-            history_row = history_rows.iloc[0]
+            history_row = df_whisto.iloc[position]
 
-            # For each of the 5 week columns in the new structure
+            # For each of the week columns in the new structure
             for col_idx, new_week_col in enumerate(new_week_columns):
                 if col_idx >= len(existing_week_columns):
                     break  # Safety check
@@ -851,11 +2834,39 @@ def ApplyWeekShiftFromHistory(df_master: pd.DataFrame, df_whisto: pd.DataFrame,
         logger.error(f"Error applying week shift from history: {str(e)}")
         return df_master
 
+def ResizeMasterWeekColumns(df_master: pd.DataFrame, week_columns: List[str]) -> pd.DataFrame:
+    """Give df_master one week column per dynamic week column (WEEK_COLUMNS changed)
+
+    Extra week columns are dropped from the end, missing ones are added
+    empty after the last one. Their data is then restored from the Week
+    History (see ApplyWeekShiftFromHistory).
+
+    Args:
+        df_master: Master DataFrame with its current week columns
+        week_columns: Dynamic week column names (see GetDynamicWeekColumns)
+
+    Returns:
+        Master DataFrame with len(week_columns) week columns
+    """
+    existing_week_columns = [col for col in df_master.columns if col and str(col).startswith('Week ')]
+    if len(existing_week_columns) > len(week_columns):
+        df_master = df_master.drop(columns=existing_week_columns[len(week_columns):])
+    elif len(existing_week_columns) < len(week_columns):
+        position = (list(df_master.columns).index(existing_week_columns[-1]) + 1 if existing_week_columns
+                    else len(df_master.columns))
+        added = [col for col in week_columns if col not in existing_week_columns]
+        for col in added[:len(week_columns) - len(existing_week_columns)]:
+            df_master.insert(position, col, '')
+            position += 1
+    logger.info(f"Week columns resized from {len(existing_week_columns)} to {len(week_columns)} (WEEK_COLUMNS)")
+    return df_master
+
 def GetDynamicWeekColumns() -> List[str]:
-    """Generate the 5 dynamic week column names based on current week
+    """Generate the WEEK_COLUMNS dynamic week column names based on current week
 
     Returns:
-        List of 5 week column names: [Week-2, Week-1, Week, Week+1, Week+2]
+        List of week column names around the current week, e.g. with the
+        default 5 columns: [Week-2, Week-1, Week, Week+1, Week+2]
     """
     if CURWEEK is not None:
         current_week = CURWEEK
@@ -866,18 +2877,17 @@ def GetDynamicWeekColumns() -> List[str]:
 
     week_columns = []
 
-    for offset in range(-2, 3):  # -2, -1, 0, +1, +2
+    # Weeks before the current one, e.g. -2, -1, 0, +1, +2 for 5 columns
+    before = (WEEK_COLUMNS - 1) // 2
+    for offset in range(-before, WEEK_COLUMNS - before):
         week_num = current_week + offset
         # Handle year boundaries - most years have 52 weeks, some have 53
         if week_num < 1:
             # Get the actual number of weeks in the previous year
-            prev_year = datetime.now().year - 1
-            last_week_prev_year = datetime(prev_year, 12, 28).isocalendar()[1]  # Week containing Dec 28 is always the last week
-            week_num = last_week_prev_year + week_num
+            week_num = IsoWeeksInYear(datetime.now().year - 1) + week_num
         elif week_num > 52:
             # Check if current year actually has 53 weeks
-            current_year = datetime.now().year
-            last_week_current_year = datetime(current_year, 12, 28).isocalendar()[1]
+            last_week_current_year = IsoWeeksInYear(datetime.now().year)
             if week_num > last_week_current_year:
                 week_num = week_num - last_week_current_year
 
@@ -959,13 +2969,13 @@ def LoadWeekHistoryFromExcel(workbook: openpyxl.Workbook) -> pd.DataFrame:
         logger.warning(f"Error loading Week History: {str(e)}, creating new DataFrame")
         return CreateWeekHistoryDataFrame()
 
-def UpdateWeekHistoryRow(df_whisto: pd.DataFrame, key: str, week_data: Dict[str, str],
+def UpdateWeekHistoryRow(df_whisto: pd.DataFrame, key: int, week_data: Dict[str, str],
                          opty_number: str = '', model_name: str = '') -> pd.DataFrame:
     """Update or create a row in the Week History DataFrame
 
     Args:
         df_whisto: Week History DataFrame
-        key: Unique key for the opportunity (Opty Number + Model Name)
+        key: Key of the opportunity (Opty Number + Model Name code, see EncodeKeys)
         week_data: Dictionary mapping week column names to values
         opty_number: Opportunity Number (optional, for new rows)
         model_name: Model Name (optional, for new rows)
@@ -1065,21 +3075,21 @@ def UpgradeFormatV1toV2(worksheet: openpyxl.worksheet.worksheet.Worksheet) -> No
     try:
         logger.info("Upgrading Excel format from V1 (21 columns) to V2 (26 columns)")
 
-        # V2 adds 5 Week columns at the end (columns V, W, X, Y, Z)
+        # V2 adds the Week columns at the end (columns V to Z with the default 5 columns)
         # Generate current week column names
         dynamic_week_columns = GetDynamicWeekColumns()
 
         # Find the last column with data
         max_col = worksheet.max_column
 
-        # Add headers for the 5 new Week columns (row 2 is the header row)
+        # Add headers for the new Week columns (row 2 is the header row)
         for i, week_col_name in enumerate(dynamic_week_columns):
             col_idx = max_col + 1 + i  # Add after existing columns
             worksheet.cell(row=2, column=col_idx).value = week_col_name  # Header row 2
 
         # Initialize empty values for all data rows for the new columns
         for row_num in range(3, worksheet.max_row + 1):  # Start from row 3 (data rows)
-            for i in range(5):  # 5 new columns
+            for i in range(len(dynamic_week_columns)):
                 col_idx = max_col + 1 + i
                 worksheet.cell(row=row_num, column=col_idx).value = ""
 
@@ -1122,6 +3132,178 @@ def WriteWeekHistoryToExcel(workbook: openpyxl.Workbook, df_whisto: pd.DataFrame
     except Exception as e:
         logger.error(f"Error writing Week History to Excel: {str(e)}")
 
+################################################################
+# Change Feed
+################################################################
+
+# Export columns hashed in the row fingerprints (business columns of an opportunity line)
+PIPE_FINGERPRINT_COLUMNS = [COL_OPTYOWNER, COL_CREATED, COL_CLOSED, COL_STAGE, COL_QTY, COL_SALESPRICE, COL_TOTPRICE]
+
+# Columns of the Change Feed tab, changes in this order
+CHANGE_FEED_COLUMNS = ['Change', 'Opportunity Number', 'Model Name', 'Owner', 'Stage', 'Close Date', 'Total Price']
+CHANGE_KINDS = ['New', 'Changed', 'Removed']
+
+def FingerprintPipeRows(df_pipe: pd.DataFrame) -> pd.DataFrame:
+    """Hash the business columns of each opportunity line (see PIPE_FINGERPRINT_COLUMNS)
+
+    Args:
+        df_pipe: Prepared export with its Key column (see EncodeKeys)
+
+    Returns:
+        DataFrame indexed on Key with 'Opportunity Number', 'Model Name' and
+        'Fingerprint' (uint64). The lines of a Key found several times are
+        combined into one fingerprint, whatever their order.
+    """
+    pcols = list(df_pipe.columns.values)
+    # Same values, same hash: whether the export was parsed or read back from the pipe cache
+    business = {}
+    for idx in PIPE_FINGERPRINT_COLUMNS:
+        column = df_pipe[pcols[idx]]
+        if pd.api.types.is_numeric_dtype(column):
+            business[idx] = column.astype('float64')
+        elif pd.api.types.is_datetime64_any_dtype(column):
+            business[idx] = column.astype('datetime64[ns]')
+        else:
+            business[idx] = _KeyPart(column)
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(business), index=False)
+
+    keyed = (df_pipe['Key'] != NO_KEY).to_numpy()
+    lines = pd.DataFrame({
+        'Key': df_pipe['Key'].to_numpy()[keyed],
+        'Opportunity Number': _KeyPart(df_pipe['Opportunity Number'])[keyed],
+        'Model Name': _KeyPart(df_pipe[pcols[COL_SALESMODELNAME]])[keyed],
+        'Fingerprint': hashes.to_numpy()[keyed],
+    })
+    grouped = lines.groupby('Key', sort=False)
+    fingerprints = grouped[['Opportunity Number', 'Model Name']].first()
+    # uint64 sum (wraps around): order independent
+    fingerprints['Fingerprint'] = grouped['Fingerprint'].sum()
+    return fingerprints
+
+def LoadPipeFingerprints(workbook: openpyxl.Workbook) -> Optional[pd.DataFrame]:
+    """Load the fingerprints stored by the previous update, None before the first one
+
+    Returns:
+        DataFrame indexed on Key, like FingerprintPipeRows
+    """
+    if "Pipe Fingerprints" not in workbook.sheetnames:
+        return None
+    rows = list(workbook['Pipe Fingerprints'].iter_rows(min_row=2, values_only=True))
+    stored = pd.DataFrame([row[:3] for row in rows if row and row[2]],
+                          columns=['Opportunity Number', 'Model Name', 'Fingerprint'])
+    fingerprints = pd.DataFrame({
+        'Opportunity Number': _KeyPart(stored['Opportunity Number']),
+        'Model Name': _KeyPart(stored['Model Name']),
+        'Fingerprint': np.array([int(str(value), 16) for value in stored['Fingerprint']], dtype='uint64'),
+    }, index=EncodeKeys(stored['Opportunity Number'], stored['Model Name']).to_numpy())
+    fingerprints.index.name = 'Key'
+    return fingerprints[~fingerprints.index.duplicated()]
+
+def ClassifyPipeChanges(previous: Optional[pd.DataFrame], current: pd.DataFrame) -> pd.DataFrame:
+    """Compare the fingerprints of two updates with one join on Key
+
+    Args:
+        previous: Fingerprints of the previous update (None: first update, nothing to compare)
+        current: Fingerprints of this update
+
+    Returns:
+        DataFrame indexed on Key with 'Change' (New, Changed, Removed or
+        Unchanged), 'Opportunity Number' and 'Model Name'
+    """
+    if previous is None:
+        return pd.DataFrame(columns=['Change', 'Opportunity Number', 'Model Name'])
+
+    known = current.index.isin(previous.index)
+    changed = np.zeros(len(current), dtype=bool)
+    changed[known] = (current['Fingerprint'].to_numpy()[known]
+                      != previous['Fingerprint'].reindex(current.index[known]).to_numpy())
+    kept = current[['Opportunity Number', 'Model Name']].copy()
+    kept.insert(0, 'Change', np.where(~known, 'New', np.where(changed, 'Changed', 'Unchanged')))
+
+    removed = previous.loc[~previous.index.isin(current.index), ['Opportunity Number', 'Model Name']].copy()
+    removed.insert(0, 'Change', 'Removed')
+    return pd.concat([kept, removed])
+
+def BuildChangeFeed(changes: pd.DataFrame, df_pipe: pd.DataFrame) -> pd.DataFrame:
+    """Change Feed rows: the changed opportunity lines with their current values
+
+    Args:
+        changes: Result of ClassifyPipeChanges
+        df_pipe: Prepared export with its Key column
+
+    Returns:
+        DataFrame with the CHANGE_FEED_COLUMNS (blank values for removed lines)
+    """
+    pcols = list(df_pipe.columns.values)
+    feed = changes[changes['Change'] != 'Unchanged']
+    details = df_pipe.drop_duplicates('Key').set_index('Key').reindex(feed.index)
+    feed = pd.DataFrame({
+        'Change': feed['Change'],
+        'Opportunity Number': feed['Opportunity Number'],
+        'Model Name': feed['Model Name'],
+        'Owner': details[pcols[COL_OPTYOWNER]].astype(object),
+        'Stage': details[pcols[COL_STAGE]].astype(object),
+        'Close Date': details[pcols[COL_CLOSED]],
+        'Total Price': details[pcols[COL_TOTPRICE]],
+    }, index=feed.index)
+    order = feed['Change'].map({kind: rank for rank, kind in enumerate(CHANGE_KINDS)})
+    return feed.assign(_order=order).sort_values(['_order', 'Opportunity Number', 'Model Name']).drop(columns='_order')
+
+def WriteChangeFeedToExcel(workbook: openpyxl.Workbook, feed: pd.DataFrame, fingerprints: pd.DataFrame) -> None:
+    """Write the Change Feed tab and store the fingerprints for the next update"""
+    try:
+        for sheet in ("Change Feed", "Pipe Fingerprints"):
+            if sheet in workbook.sheetnames:
+                del workbook[sheet]
+
+        ws_feed = workbook.create_sheet("Change Feed")
+        ws_feed.append(CHANGE_FEED_COLUMNS)
+        for r in dataframe_to_rows(feed[CHANGE_FEED_COLUMNS], index=False, header=False):
+            ws_feed.append([None if pd.isna(value) else value for value in r])
+        Format_Cell(ws_feed, 2, 6, numbers.FORMAT_DATE_DDMMYY)
+        Format_Cell(ws_feed, 2, 7, '[$EUR ]#,##0_-')
+
+        ws_prints = workbook.create_sheet("Pipe Fingerprints")
+        ws_prints.append(['Opportunity Number', 'Model Name', 'Fingerprint'])
+        for opty, model, fingerprint in zip(fingerprints['Opportunity Number'], fingerprints['Model Name'],
+                                            fingerprints['Fingerprint']):
+            ws_prints.append([opty, model, f'{int(fingerprint):016x}'])
+
+        logger.info(f"Written Change Feed with {len(feed)} rows to Excel")
+
+    except Exception as e:
+        logger.error(f"Error writing Change Feed to Excel: {str(e)}")
+
+def WriteChangeFeedJson(path: str, changes: pd.DataFrame, feed: pd.DataFrame, export: str) -> None:
+    """Write the change feed of an update as JSON (counts per kind of change and changed lines)"""
+    counts = changes['Change'].value_counts()
+    document = {
+        'export': os.path.basename(os.path.normpath(export)),
+        'updated': datetime.now().isoformat(timespec='seconds'),
+        'first_update': changes.empty,
+        'counts': {kind: int(counts.get(kind, 0)) for kind in CHANGE_KINDS + ['Unchanged']},
+        'changes': [
+            {
+                'change': row['Change'],
+                'opportunity_number': row['Opportunity Number'],
+                'model_name': row['Model Name'],
+                'owner': None if pd.isna(row['Owner']) else str(row['Owner']),
+                'stage': None if pd.isna(row['Stage']) else str(row['Stage']),
+                'close_date': None if pd.isna(row['Close Date']) else pd.Timestamp(row['Close Date']).date().isoformat(),
+                'total_price': None if pd.isna(row['Total Price']) else float(row['Total Price']),
+            }
+            for row in feed.to_dict('records')
+        ],
+    }
+    tmp_file = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_file, path)
+        logger.info(f"Change feed written to {path}")
+    except Exception as e:
+        logger.warning(f"Could not write change feed {path}: {str(e)}")
+
 ################################################################
 # Owner Opportunity Tracking Functions
 ################################################################
@@ -1224,14 +3406,17 @@ def ExtractOwnerOpptyByWeek(df_pipe: pd.DataFrame) -> Dict[str, Dict[str, int]]:
         excluded_owner_count = 0
         old_year_count = 0
 
+        # Week numbers of the whole created date column from the calendar table
+        created_dates = sanitize_date_series(df_pipe[created_col])
+        weeks = CalendarAttributes(created_dates)['ISO Week']
+
         # Group by owner and created date, collecting unique opportunity numbers
-        for _, row in df_pipe.iterrows():
+        for (_, row), created_date, week_num in zip(df_pipe.iterrows(), created_dates, weeks):
             owner = sanitize_string_value(row[owner_col])
-            created_date = row[created_col]
             opty_num = sanitize_string_value(row[opty_col])
 
             # Skip if owner, date, or opty number is invalid
-            if owner == '' or pd.isna(created_date) or opty_num == '':
+            if owner == '' or pd.isna(row[created_col]) or opty_num == '':
                 continue
 
             # Skip excluded owners
@@ -1239,11 +3424,11 @@ def ExtractOwnerOpptyByWeek(df_pipe: pd.DataFrame) -> Dict[str, Dict[str, int]]:
                 excluded_owner_count += 1
                 continue
 
-            # Get week number from created date
-            try:
-                if isinstance(created_date, str):
-                    created_date = pd.to_datetime(created_date, format='mixed')
+            # Dates that could not be parsed
+            if pd.isna(created_date):
+                continue
 
+            try:
                 # Filter out future dates
                 if created_date > today:
                     future_date_count += 1
@@ -1255,8 +3440,7 @@ def ExtractOwnerOpptyByWeek(df_pipe: pd.DataFrame) -> Dict[str, Dict[str, int]]:
                     old_year_count += 1
                     continue
 
-                week_num = created_date.isocalendar()[1]
-                week_col = f'W{week_num:02d}'
+                week_col = f'W{int(week_num):02d}'
 
                 # Initialize owner if not exists
                 if owner not in owner_week_opties:
@@ -1342,15 +3526,20 @@ def ExtractOwnerOpptyDetails(df_pipe: pd.DataFrame, num_weeks: int = 5) -> pd.Da
         # Track unique opportunities per owner/year/week to avoid duplicates
         seen_opties = set()
 
+        # Convert the whole price column at once
+        prices = sanitize_numeric_series(df_pipe[price_col]).to_numpy()
+
+        # Week numbers of the whole created date column from the calendar table
+        created_dates = sanitize_date_series(df_pipe[created_col])
+        weeks = CalendarAttributes(created_dates)['ISO Week']
+
         # Iterate through pipe data
-        for _, row in df_pipe.iterrows():
+        for (_, row), price, created_date, week_num in zip(df_pipe.iterrows(), prices, created_dates, weeks):
             owner = sanitize_string_value(row[owner_col])
-            created_date = row[created_col]
             opty_num = sanitize_string_value(row[opty_col])
             customer = sanitize_string_value(row[customer_col])
-            price = sanitize_numeric_value(row[price_col])
 
-            # Skip if essential fields are invalid
+            # Skip if essential fields are invalid (or the date could not be parsed)
             if owner == '' or pd.isna(created_date) or opty_num == '':
                 continue
 
@@ -1360,9 +3549,6 @@ def ExtractOwnerOpptyDetails(df_pipe: pd.DataFrame, num_weeks: int = 5) -> pd.Da
 
             # Process date and extract week
             try:
-                if isinstance(created_date, str):
-                    created_date = pd.to_datetime(created_date, format='mixed')
-
                 record_year = created_date.year
 
                 # Only process current year and previous year records
@@ -1373,7 +3559,7 @@ def ExtractOwnerOpptyDetails(df_pipe: pd.DataFrame, num_weeks: int = 5) -> pd.Da
                 if record_year == current_year and created_date > today:
                     continue
 
-                week_num = created_date.isocalendar()[1]
+                week_num = int(week_num)
 
                 # Only process if in target weeks
                 if week_num not in target_weeks:
@@ -1526,7 +3712,7 @@ def WriteOwnerOpptyDetailsToExcel(workbook: openpyxl.Workbook, df_details: pd.Da
         logger.error(f"Error writing Owner Opty Tracking Details to Excel: {str(e)}")
         raise PipeProcessingError(f"Failed to write Owner Opty Tracking Details: {str(e)}")
 
-def Mapping_WeekColumn(Key: str, old_col_name: str, new_col_name: str) -> str:
+def Mapping_WeekColumn(Key: int, old_col_name: str, new_col_name: str) -> str:
     """Preserve data from existing week columns when renaming
 
     Args:
@@ -1565,6 +3751,82 @@ def Format_Cell(WS: openpyxl.worksheet.worksheet.Worksheet, start: int, ColIdx:
     except Exception as e:
         logger.error(f"Error formatting cells: {str(e)}")
 
+def _BlankCell(value: Any) -> bool:
+    """True for the values written as an empty cell"""
+    return value is None or (isinstance(value, str) and value == '') or (not isinstance(value, str) and pd.isna(value))
+
+def _SameCellValue(old: Any, new: Any) -> bool:
+    """Compare a cell read from the sheet with the value that would be written"""
+    if _BlankCell(old) or _BlankCell(new):
+        return _BlankCell(old) and _BlankCell(new)
+    try:
+        return bool(old == new)
+    except Exception:
+        return False
+
+def WritePipeRowsIncremental(WS: openpyxl.worksheet.worksheet.Worksheet, df_rows: pd.DataFrame, keys: np.ndarray,
+                             key_columns: Tuple[int, int], start: int,
+                             skip_columns: Tuple[int, ...] = ()) -> Tuple[int, Dict[str, int]]:
+    """Update the data rows of a sheet in place, writing only the lines that differ
+
+    Rows are matched on their Key (the n-th line of a Key with its n-th line on
+    the sheet). Changed lines get their differing cells rewritten, lines of the
+    sheet no longer in df_rows are deleted and new lines appended at the bottom.
+
+    Args:
+        WS: Worksheet to update (Pipeline Sell Out)
+        df_rows: Rows to write, in the sheet column order
+        keys: Key of each row of df_rows (see EncodeKeys)
+        key_columns: Positions (0-based) of the Opportunity Number and Model Name in the rows
+        start: First data row of the sheet
+        skip_columns: Columns (1-based) left untouched on the kept lines (formulas)
+
+    Returns:
+        First row whose position or content changed as a whole (formulas and formats
+        to refresh from there) and the number of New, Changed, Removed and Unchanged lines
+    """
+    existing = list(WS.iter_rows(min_row=start, max_row=max(WS.max_row, start - 1), values_only=True))
+    opty_idx, model_idx = key_columns
+    old_keys = EncodeKeys(pd.Series([row[opty_idx] if len(row) > opty_idx else None for row in existing], dtype=object),
+                          pd.Series([row[model_idx] if len(row) > model_idx else None for row in existing], dtype=object)).to_numpy()
+
+    # (Key, occurrence) pairs, so lines of a Key found several times are matched one to one
+    def occurrences(values: np.ndarray) -> pd.MultiIndex:
+        return pd.MultiIndex.from_arrays([values, pd.Series(values).groupby(values).cumcount().to_numpy()])
+    match = occurrences(old_keys).get_indexer(occurrences(np.asarray(keys)))
+
+    counts = {'New': 0, 'Changed': 0, 'Removed': 0, 'Unchanged': 0}
+    new_rows = []
+    for row, position in zip(dataframe_to_rows(df_rows, index=False, header=False), match):
+        if position < 0:
+            new_rows.append(row)
+            continue
+        old = existing[position]
+        width = max(len(row), len(old))
+        differ = [c for c in range(width) if c + 1 not in skip_columns
+                  and not _SameCellValue(old[c] if c < len(old) else None, row[c] if c < len(row) else None)]
+        for c in differ:
+            WS.cell(start + position, c + 1).value = row[c] if c < len(row) else None
+        counts['Changed' if differ else 'Unchanged'] += 1
+
+    # Removed lines, bottom up by runs of consecutive rows
+    removed = sorted(set(range(len(existing))) - set(match[match >= 0].tolist()))
+    counts['Removed'] = len(removed)
+    runs = []
+    for position in removed:
+        if runs and runs[-1][1] == position:
+            runs[-1][1] = position + 1
+        else:
+            runs.append([position, position + 1])
+    for first, last in reversed(runs):
+        WS.delete_rows(start + first, amount=last - first)
+    refresh = start + removed[0] if removed else start + len(existing)
+
+    for row in new_rows:
+        WS.append(row)
+    counts['New'] = len(new_rows)
+    return refresh, counts
+
 def Write2Log(wb: openpyxl.Workbook, DataLst: List[Any]) -> pd.DataFrame:
     """Write pipeline data to the log sheet
 
@@ -1756,8 +4018,54 @@ def UpdatePipeAnalysis(wb: openpyxl.Workbook, df_log: pd.DataFrame) -> bool:
 
     return ret
 
-def UpdatePipe(LatestPipe: str) -> None:
-    """Main function to update pipe data with enhanced error handling"""
+################################################################
+# Tracking Workbook
+################################################################
+
+# Workbook saved by the last update, kept for the next one in watch mode
+_tracking_workbook = {'keep': False, 'workbook': None, 'stamp': None}
+
+def _FileStamp(path: str) -> Optional[Tuple[int, int]]:
+    """(size, modification time in ns) of a file, None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+def LoadTrackingWorkbook() -> openpyxl.Workbook:
+    """Load the INPUT_SUIVI_RAW workbook, or reuse the one saved by the previous update
+
+    The in-memory workbook is only reused while the file on disk is the one
+    it was saved to (see KeepTrackingWorkbook) and was not modified since.
+    """
+    workbook = _tracking_workbook['workbook']
+    _tracking_workbook['workbook'] = None
+    if workbook is not None and _FileStamp(INPUT_SUIVI_RAW) == _tracking_workbook['stamp']:
+        logger.info("Reusing the tracking workbook kept in memory")
+        return workbook
+    return openpyxl.load_workbook(INPUT_SUIVI_RAW, keep_vba=False)
+
+def KeepTrackingWorkbook(workbook: openpyxl.Workbook) -> None:
+    """Keep a saved workbook in memory for the next update (watch mode)
+
+    Only done when updates are chained on the same file (INPUT_SUIVI_RAW is
+    OUTPUT_SUIVI_RAW): the saved workbook is then the next input.
+    """
+    if not _tracking_workbook['keep']:
+        return
+    if os.path.normcase(os.path.abspath(INPUT_SUIVI_RAW)) != os.path.normcase(os.path.abspath(OUTPUT_SUIVI_RAW)):
+        return
+    _tracking_workbook['workbook'] = workbook
+    _tracking_workbook['stamp'] = _FileStamp(OUTPUT_SUIVI_RAW)
+
+def UpdatePipe(LatestPipe: str, pending: Optional[List[Any]] = None) -> None:
+    """Main function to update pipe data with enhanced error handling
+
+    Args:
+        LatestPipe: Salesforce export (or multi-part export folder)
+        pending: Export already started with StartPipeExport (see UpdatePipes)
+    """
     global df_master, cols
 
     # Create colored debug message for pipe update start
@@ -1766,15 +4074,11 @@ def UpdatePipe(LatestPipe: str) -> None:
     logger.debug(colored_start_message)
 
     try:
-        # Validate input file
-        if not CheckPipeFile(LatestPipe):
-            raise PipeProcessingError(f"Invalid pipe file: {LatestPipe}")
-
         # Row where the Data starts (Generally 2 when the first row is used for header)
         HEADERSHIFT=3
 
         # Get creation Date for futur usage in the Log Tab
-        ctimef = datetime.strptime(time.ctime(os.path.getctime(LatestPipe)), "%a %b %d %H:%M:%S %Y")
+        ctimef = datetime.strptime(time.ctime(GetPipeTime(LatestPipe)), "%a %b %d %H:%M:%S %Y")
 
         ####################################
         # Load Latest Pipe File
@@ -1789,102 +4093,35 @@ def UpdatePipe(LatestPipe: str) -> None:
         colored_message = f'Using pipe file: {Fore.GREEN}{filename}{Style.RESET_ALL}'
         logger.info(colored_message)
 
-        # Automatically detect header row (replaces manual SKIP_ROW configuration)
-        try:
-            skip_rows = DetectHeaderRow(LatestPipe)
-            if SKIP_ROW > 0 and SKIP_ROW != skip_rows:
-                logger.warning(f"SKIP_ROW={SKIP_ROW} in .env differs from auto-detected {skip_rows}. Using auto-detected value.")
-                logger.warning("Note: SKIP_ROW is deprecated. Auto-detection is now used by default.")
-        except Exception as e:
-            logger.warning(f"Header auto-detection failed: {str(e)}. Using SKIP_ROW={SKIP_ROW}")
-            skip_rows = SKIP_ROW
-
-        # Load pipe file with auto-detected skip rows
+        # Validate, auto-detect header row and load the export in one pass (or from the cache)
+        # The export is parsed by worker processes while the tracking workbook is loaded
+        pool = None
+        if pending is None:
+            pending, pool = StartPipeExport(LatestPipe)
         try:
-            df_pipe = pd.read_excel(LatestPipe, skiprows=skip_rows)
-            logger.info(f"Successfully loaded pipe file with {len(df_pipe)} initial rows (skipped {skip_rows} header rows)")
-        except Exception as e:
-            raise PipeProcessingError(f"Failed to read Excel file {LatestPipe}: {str(e)}")
-
-        # Drop Empty Columns (more efficient with list comprehension)
-        unnamed_cols = [col for col in df_pipe.columns if str(col).startswith('Unnamed:')]
-        if unnamed_cols:
-            df_pipe.drop(columns=unnamed_cols, inplace=True)
-            logger.debug(f"Dropped {len(unnamed_cols)} unnamed columns")
-
-        # Reorg Columns to fit the expected Master Format
-        # 'Opportunity Owner','Created Date','Close Date','Stage','Opportunity Number','Indirect Account','End Customer','Estimated Quantity','Sales Price','Estimated Total Price','Sales Model Name','Part Number','Account Name','Product Line','Deal Type'
-        cols = list(df_pipe.columns.values)
-        # Col numbers starts at 0
-        Cval = cols.pop(11)
-        cols.insert(7, Cval)
-        Cval = cols.pop(11)
-        cols.insert(7, Cval)
-        df_pipe = df_pipe.reindex(columns=cols)
-
-        ####################################
-        # Cleanup Data
-        ####################################
+            ####################################
+            # If Backup option is activated ... Then backup the actual Pipe file before processing.
+            # Naming : name of INPUT_SUIVI_RAW "-yymmdd-hh-bck.xlsx"
+            ####################################
 
-        # Remove bogus values more efficiently with single operation
-        bogus_values = ['Total', 'Confidential Information - Do Not Distribute',
-                        'Copyright © 2000-2023 salesforce.com, inc. All rights reserved.']
+            if BCKUP_PIPE_FILE:
+                BackupPipeBefore(INPUT_SUIVI_RAW)
 
-        # Create mask for all bogus values at once
-        mask = ~df_pipe[cols[COL_OPTYOWNER]].isin(bogus_values)
-        df_pipe = df_pipe[mask]
+            ####################################
+            # Load PipeLine Excel File and convert the 'Pipeline Sell Out' Tab to DataFrame
+            ####################################
 
-        # Drop NaN values
-        df_pipe.dropna(subset=[cols[COL_OPTYOWNER], cols[COL_CUSTOMER]], inplace=True)
-        logger.debug(f"Removed bogus values and NaN entries")
-
-
-        logger.info(f'Pipe file contains {len(df_pipe)} rows after initial processing')
+            try:
+                myworkbook = LoadTrackingWorkbook()
+                worksheet = myworkbook['Pipeline Sell Out']
+            except Exception as e:
+                raise PipeProcessingError(f"Failed to load tracking workbook {INPUT_SUIVI_RAW}: {str(e)}")
 
-    # Owner to keep
-    # 'William ROMAN', 'Corinne CORDEIRO', 'Kajanan SHAN', 'Younes Giaccheri', 'Aziz ABELHAOU', 'Hippolyte FOVIAUX', 'Hatem ABBACI', 'Mehdi Dahbi', 'Gwenael BOJU', 'Charles TEZENAS', Etc ...
-    
-        # Owner filtering (more efficient with single isin operation)
-        if EXCLUDED_PIPE_OWNERS:
-            owner_mask = ~df_pipe[cols[COL_OPTYOWNER]].isin(EXCLUDED_PIPE_OWNERS)
-            df_pipe = df_pipe[owner_mask]
-            logger.debug(f"Filtered out {len(EXCLUDED_PIPE_OWNERS)} excluded pipe owners: {EXCLUDED_PIPE_OWNERS}")
-        else:
-            logger.debug(f"No excluded pipe owners configured, keeping all owners")
-
-        # Client to Drop
-        # 'Generic End User'
-        # if Estimated Tot Price < 50K
-        COL_SALESPRICE = 8
-        COL_TOTPRICE = 9
-        mask = (df_pipe[cols[COL_TOTPRICE]] < 50000) & df_pipe[cols[COL_CUSTOMER]].str.startswith('Generic')
-        df_pipe.drop(df_pipe[mask].index, inplace=True)
-        # Remove also the blank tot price for those 'Generic'
-        mask = (df_pipe[cols[COL_TOTPRICE]]).isna() & df_pipe[cols[COL_CUSTOMER]].str.startswith('Generic')
-        df_pipe.drop(df_pipe[mask].index, inplace=True)
-
-        # Remove product lines more efficiently
-        excluded_product_lines = ['LM', 'MS', 'MR']
-        product_mask = ~df_pipe['Product Line'].isin(excluded_product_lines)
-        df_pipe = df_pipe[product_mask]
-        df_pipe['Product Line'] = df_pipe['Product Line'].fillna("")
-        logger.debug(f"Filtered out excluded product lines")
-        # df_pipe['Product Line'].fillna("", inplace=True) - Deprecated 3.12
-
-
-        # Cleanup OPTY (remove NaN)
-        df_pipe['Opportunity Number'] = df_pipe['Opportunity Number'].fillna("")
-        df_pipe[cols[COL_SALESMODELNAME]] = df_pipe[cols[COL_SALESMODELNAME]].fillna("")
-        # df_pipe['Opportunity Number'].fillna("", inplace=True) - Deprecated 3.12
-        # df_pipe[cols[COL_SALESMODELNAME]].fillna("", inplace=True) - Deprecated 3.12
-
-        # Format dates with error handling
-        try:
-            df_pipe[cols[COL_CREATED]] = pd.to_datetime(df_pipe[cols[COL_CREATED]], format='mixed', errors='coerce')
-            df_pipe[cols[COL_CLOSED]] = pd.to_datetime(df_pipe[cols[COL_CLOSED]], format='mixed', errors='coerce')
-            logger.debug("Date columns formatted successfully")
-        except Exception as e:
-            logger.warning(f"Date formatting issues: {str(e)}")
+            df_pipe = CollectPipeExport(LatestPipe, pending)
+        finally:
+            if pool is not None:
+                StopPipePool(pool, pending)
+        cols = list(df_pipe.columns.values)
 
         # Copy "Run Rate" Type  Deals - But don't delete the line from the main Dataframe
         df_pipe_RR = df_pipe.loc[df_pipe['Deal Type']=='Run Rate Deal'].copy()
@@ -1892,28 +4129,22 @@ def UpdatePipe(LatestPipe: str) -> None:
         # Copy "Closed Lost" Opportunities - And remove them from the main Dataframe later
         df_pipe_CL = df_pipe.loc[df_pipe[cols[COL_STAGE]]=='Closed Lost'].copy()
 
-        # Create Key Columns (Opty+Model)
-        df_pipe['Key'] = df_pipe.apply(lambda row: f'{row["Opportunity Number"]}{row[cols[COL_SALESMODELNAME]]}', axis = 1)
-
-        logger.info(f'{len(df_pipe)} rows after data cleanup')
-
-        ####################################
-        # If Backup option is activated ... Then backup the actual Pipe file before processing.
-        # Naming : name of INPUT_SUIVI_RAW "-yymmdd-hh-bck.xlsx"
-        ####################################
-
-        if BCKUP_PIPE_FILE:
-            BackupPipeBefore(INPUT_SUIVI_RAW)
+        # Create Key Columns (Opty+Model), integer codes shared with df_master and the Week History
+        ResetKeyCodes()
+        df_pipe['Key'] = EncodeKeys(df_pipe['Opportunity Number'], df_pipe[cols[COL_SALESMODELNAME]])
 
-        ####################################
-        # Load PipeLine Excel File and convert the 'Pipeline Sell Out' Tab to DataFrame
-        ####################################
+        # Row fingerprints of the export, compared with the ones of the previous update
+        fingerprints = FingerprintPipeRows(df_pipe)
+        changes = ClassifyPipeChanges(LoadPipeFingerprints(myworkbook), fingerprints)
+        change_feed = BuildChangeFeed(changes, df_pipe)
+        if changes.empty:
+            logger.info('No fingerprints of a previous update, the change feed starts with the next one')
+        else:
+            counts = changes['Change'].value_counts()
+            logger.info('Changes since the previous update: ' + ', '.join(
+                f'{int(counts.get(kind, 0))} {kind.lower()}' for kind in CHANGE_KINDS + ['Unchanged']))
 
-        try:
-            myworkbook = openpyxl.load_workbook(INPUT_SUIVI_RAW, keep_vba=False)
-            worksheet = myworkbook['Pipeline Sell Out']
-        except Exception as e:
-            raise PipeProcessingError(f"Failed to load tracking workbook {INPUT_SUIVI_RAW}: {str(e)}")
+        logger.info(f'{len(df_pipe)} rows after data cleanup')
 
         ####################################
         # Load/Create Week History DataFrame
@@ -1975,10 +4206,10 @@ def UpdatePipe(LatestPipe: str) -> None:
             UpgradeFormatV1toV2(worksheet)
             excel_column_count = worksheet.max_column  # Update count after upgrade
             logger.info(f"Excel format upgraded to V2 ({excel_column_count} columns)")
-        elif excel_column_count == V2_COLUMN_COUNT:
-            logger.debug(f"Excel file is already V2 format ({V2_COLUMN_COUNT} columns)")
+        elif excel_column_count in (V2_COLUMN_COUNT, V1_COLUMN_COUNT + WEEK_COLUMNS):
+            logger.debug(f"Excel file is already V2 format ({excel_column_count} columns, {V1_COLUMN_COUNT + WEEK_COLUMNS} with WEEK_COLUMNS={WEEK_COLUMNS})")
         else:
-            logger.warning(f"Unexpected Excel format: {excel_column_count} columns (expected {V1_COLUMN_COUNT} or {V2_COLUMN_COUNT})")
+            logger.warning(f"Unexpected Excel format: {excel_column_count} columns (expected {V1_COLUMN_COUNT} or {V1_COLUMN_COUNT + WEEK_COLUMNS})")
 
         df_master = pd.DataFrame(worksheet.values)
 
@@ -2015,27 +4246,31 @@ def UpdatePipe(LatestPipe: str) -> None:
         df_master['Nom du produit'] = df_master['Nom du produit'].fillna("")
 
         # Create Key Columns (Opty+Model)
-        df_master['Key'] = df_master.apply(lambda row: f'{row["Opportunity Number"]}{row["Nom du produit"]}', axis = 1)
-        # Master columns used for the Key while transitioning Columns Names
-        #df_master['Key'] = df_master.apply(lambda row: f'{row["Date de création"]}{row["Quantité"]}', axis = 1)
+        df_master['Key'] = EncodeKeys(df_master['Opportunity Number'], df_master['Nom du produit'])
+        df_whisto = EncodeWeekHistoryKeys(df_whisto)
+
+        # Manual columns from one join of the Keys to df_master
+        manual = MapManualColumns(df_pipe['Key'])
 
         # Column Quantity
-        df_pipe['Estimated\nQuantity'] = df_pipe['Key'].map(Mapping_Qty)
+        df_pipe['Estimated\nQuantity'] = manual['Estimated\nQuantity']
 
         # Column Revenu projet
-        df_pipe['Revenu From\nEstinated Qty'] = df_pipe['Key'].map(Mapping_RevEur)
+        df_pipe['Revenu From\nEstinated Qty'] = manual['Revenu From\nEstinated Qty']
 
         # Column Quarter Invoice
-        df_pipe['Quarter Invoice\nFacturation'] = df_pipe.apply(Mapping_QtrInvoice, axis=1)
+        df_pipe['Quarter Invoice\nFacturation'] = MapQuarterInvoiceColumn(
+            df_pipe[cols[COL_CLOSED]], manual['Quarter Invoice\nFacturation'])
 
         # Column Forecast projet
-        # df_pipe['Forecast projet\nMenu déroulant'] = df_pipe['Key'].map(Mapping_FrCast)
-        df_pipe['Forecast projet\nMenu déroulant'] = df_pipe.apply(Mapping_FrCast, axis=1)
+        win_rate = df_pipe['Win Rate'] if 'Win Rate' in df_pipe.columns else pd.Series(np.nan, index=df_pipe.index)
+        df_pipe['Forecast projet\nMenu déroulant'] = MapForecastColumn(
+            df_pipe[cols[COL_STAGE]], win_rate, manual['Forecast projet\nMenu déroulant'])
 
         # Column Next Step
-        df_pipe['Next Step & Support demandé / Commentaire'] = df_pipe['Key'].map(Mapping_NxtStp)
+        df_pipe['Next Step & Support demandé / Commentaire'] = manual['Next Step & Support demandé / Commentaire']
 
-        # Dynamic Week Columns (5 columns: Week-2, Week-1, Week, Week+1, Week+2)
+        # Dynamic Week Columns (WEEK_COLUMNS columns, by default: Week-2, Week-1, Week, Week+1, Week+2)
         dynamic_week_columns = GetDynamicWeekColumns()
         current_week = datetime.now().isocalendar()[1] if CURWEEK is None else CURWEEK
         logger.info(f'Adding dynamic week columns (current week {current_week}): {dynamic_week_columns}')
@@ -2049,8 +4284,8 @@ def UpdatePipe(LatestPipe: str) -> None:
         # Copy existing week data to Week History BEFORE any column updates
         logger.info('Copying existing week data to Week History before any shifts')
         for _, row in df_master.iterrows():
-            if 'Key' in row and pd.notna(row['Key']) and str(row['Key']).strip() != '':
-                key = str(row['Key'])
+            if row['Key'] != NO_KEY:
+                key = row['Key']
                 # Extract Opportunity Number and Model Name
                 opty_number = str(row.get('Opportunity Number', '')) if pd.notna(row.get('Opportunity Number')) else ''
                 model_name = str(row.get('Nom du produit', '')) if pd.notna(row.get('Nom du produit')) else ''
@@ -2068,7 +4303,11 @@ def UpdatePipe(LatestPipe: str) -> None:
         # Apply week shift to master data if needed using history data
         ####################################
 
-        if shift_amount != 0:
+        resized = len(existing_week_columns) != len(dynamic_week_columns)
+        if resized:
+            df_master = ResizeMasterWeekColumns(df_master, dynamic_week_columns)
+
+        if shift_amount != 0 or resized:
             df_master = ApplyWeekShiftFromHistory(df_master, df_whisto, dynamic_week_columns)
 
         ####################################
@@ -2078,19 +4317,15 @@ def UpdatePipe(LatestPipe: str) -> None:
         # Get existing column names that might contain week data (for preservation)
         existing_week_columns = [col for col in df_master.columns if col and str(col).startswith('Week ')]
 
-        for i, new_week_col in enumerate(dynamic_week_columns):
-            # After shift, df_master has the correct data in positional columns
-            if i < len(existing_week_columns):
-                old_week_col = existing_week_columns[i]  # This is the positional column (Week 37, Week 38, etc.)
-                # Get the shifted data from the positional column in df_master
-                df_pipe[new_week_col] = df_pipe['Key'].apply(
-                    lambda key: Mapping_Generic(key, old_week_col)  # Use old_week_col which has the shifted data
-                )
-            else:
-                # New column, initialize with empty values
-                df_pipe[new_week_col] = df_pipe['Key'].map(
-                    lambda key: Mapping_Generic(key, new_week_col)
-                )
+        # After shift, df_master has the correct data in positional columns (Week 37, Week 38, etc.)
+        # New columns without a positional column read their own name (empty values)
+        source_week_columns = [existing_week_columns[i] if i < len(existing_week_columns) else new_week_col
+                               for i, new_week_col in enumerate(dynamic_week_columns)]
+
+        # All the week columns carried over with one join of the Keys to df_master
+        week_values = MasterStringColumns(df_pipe['Key'], source_week_columns)
+        for new_week_col, old_week_col in zip(dynamic_week_columns, source_week_columns):
+            df_pipe[new_week_col] = week_values[old_week_col]
 
 
         # Remove "Étape:Rejected"
@@ -2117,7 +4352,8 @@ def UpdatePipe(LatestPipe: str) -> None:
         logger.info(f'Extracting opportunity details for last {WEEKS_TO_TRACK_DETAILS} weeks')
         df_opty_details = ExtractOwnerOpptyDetails(df_pipe, num_weeks=WEEKS_TO_TRACK_DETAILS)
 
-        # No need of the Key Column anymore
+        # No need of the Key Column anymore (kept aside for the incremental update of the sheet)
+        pipe_keys = df_pipe['Key'].to_numpy()
         df_pipe.drop(['Key'], axis=1, inplace=True)
         df_master.drop(['Key'], axis=1, inplace=True)
 
@@ -2136,12 +4372,22 @@ def UpdatePipe(LatestPipe: str) -> None:
         except Exception as e:
             logger.debug(f"Error cleaning None columns: {str(e)}")
 
+        # Where the Key parts are written on the sheet
+        key_columns = (list(df_pipe.columns).index('Opportunity Number'), list(df_pipe.columns).index(cols[COL_SALESMODELNAME]))
         df_pipe.columns = df_master.columns
 
-        worksheet.delete_rows(3, amount=(worksheet.max_row - 2))
+        if INCREMENTAL_UPDATE:
+            # Only the added, changed and removed lines are written (the formula column is left as is)
+            first_refresh, row_counts = WritePipeRowsIncremental(worksheet, df_pipe, pipe_keys, key_columns, HEADERSHIFT,
+                                                                skip_columns=(18,))
+            logger.info('Incremental update of Pipeline Sell Out: ' + ', '.join(
+                f'{count} {kind.lower()}' for kind, count in row_counts.items()))
+        else:
+            first_refresh = HEADERSHIFT
+            worksheet.delete_rows(3, amount=(worksheet.max_row - 2))
 
-        for r in dataframe_to_rows(df_pipe, index=False, header=False):
-            worksheet.append(r)
+            for r in dataframe_to_rows(df_pipe, index=False, header=False):
+                worksheet.append(r)
 
         # Update Excel column headers for dynamic Week columns (starting at column V = 22)
         # Reuse the dynamic_week_columns already calculated above
@@ -2150,23 +4396,28 @@ def UpdatePipe(LatestPipe: str) -> None:
             col_idx = 22 + i  # V=22, W=23, X=24, Y=25, Z=26
             worksheet.cell(row=2, column=col_idx).value = week_col_name
 
-        for i in range(HEADERSHIFT,worksheet.max_row+1):
+        # Headers of the week columns dropped by a smaller WEEK_COLUMNS
+        for col_idx in range(22 + len(dynamic_week_columns), worksheet.max_column + 1):
+            if str(worksheet.cell(row=2, column=col_idx).value or '').startswith('Week '):
+                worksheet.cell(row=2, column=col_idx).value = None
+
+        for i in range(first_refresh,worksheet.max_row+1):
             worksheet.cell(i,18).value = f'=Q{i}*I{i}'
 
         logger.info(f'Updated sheet now contains {len(df_pipe)} rows')
 
         # Apply Columns Formats
         # Col C = 2
-        Format_Cell(worksheet,3,2,numbers.FORMAT_DATE_DDMMYY)
+        Format_Cell(worksheet,first_refresh,2,numbers.FORMAT_DATE_DDMMYY)
         # Col C = 3
-        Format_Cell(worksheet,3,3,numbers.FORMAT_DATE_DDMMYY)
+        Format_Cell(worksheet,first_refresh,3,numbers.FORMAT_DATE_DDMMYY)
 
         # Col K = 9
-        Format_Cell(worksheet,3,9,numbers.FORMAT_CURRENCY_EUR_SIMPLE)
+        Format_Cell(worksheet,first_refresh,9,numbers.FORMAT_CURRENCY_EUR_SIMPLE)
         # Col L = 10
-        Format_Cell(worksheet,3,10,'[$EUR ]#,##0_-')
+        Format_Cell(worksheet,first_refresh,10,'[$EUR ]#,##0_-')
         # Col Q = 17
-        Format_Cell(worksheet,3,18,'[$EUR ]#,##0_-')
+        Format_Cell(worksheet,first_refresh,18,'[$EUR ]#,##0_-')
 
         # Log Pipe Data
         lst = [datetime(ctimef.year,ctimef.month,ctimef.day,0,0), ctimef.isocalendar()[1], worksheet.max_row - 2, SFPipeAmmount, EstPipeAmmount]
@@ -2183,6 +4434,12 @@ def UpdatePipe(LatestPipe: str) -> None:
 
         WriteWeekHistoryToExcel(myworkbook, df_whisto)
 
+        ####################################
+        # Write Change Feed back to Excel
+        ####################################
+
+        WriteChangeFeedToExcel(myworkbook, change_feed, fingerprints)
+
         ####################################
         # Write Owner Opportunity Tracking back to Excel
         ####################################
@@ -2208,6 +4465,9 @@ def UpdatePipe(LatestPipe: str) -> None:
                 logger.info(f"Hidden {hidden_count} tab(s): {', '.join(HIDDEN_TABS[:3])}{'...' if len(HIDDEN_TABS) > 3 else ''}")
 
         myworkbook.save(OUTPUT_SUIVI_RAW)
+        KeepTrackingWorkbook(myworkbook)
+        if CHANGE_FEED_FILE:
+            WriteChangeFeedJson(CHANGE_FEED_FILE, changes, change_feed, LatestPipe)
         # Create colored log message for saving file
         output_filename = os.path.basename(OUTPUT_SUIVI_RAW)
         colored_saving_message = f'Saving to: {Fore.GREEN}{output_filename}{Style.RESET_ALL}'
@@ -2220,6 +4480,125 @@ def UpdatePipe(LatestPipe: str) -> None:
     logger.info("Pipe update completed successfully")
     return
 
+def UpdatePipes(paths: List[str]) -> None:
+    """Update the tracking file with several exports, in order ('all' and 'new' modes)
+
+    The exports are parsed and cleaned ahead by a shared pool of
+    PIPE_LOAD_WORKERS processes, a window of twice that many exports in
+    advance, while the updates themselves run one after the other. When
+    INPUT_SUIVI_RAW is OUTPUT_SUIVI_RAW the tracking workbook stays in
+    memory from one update to the next (see KeepTrackingWorkbook).
+    Each export is marked processed in the manifest after its update.
+
+    Args:
+        paths: Exports (or multi-part export folders), oldest first
+    """
+    pool = ProcessPoolExecutor(max_workers=PIPE_LOAD_WORKERS) if PIPE_LOAD_WORKERS > 0 and len(paths) > 1 else None
+    ahead = 2 * PIPE_LOAD_WORKERS
+    started = {}
+    _tracking_workbook['keep'] = True
+    try:
+        for i, path in enumerate(paths):
+            # Keep the pool busy with the next exports while this one updates the workbook
+            for upcoming in paths[i:i + ahead + 1]:
+                if upcoming not in started and pool is not None:
+                    started[upcoming] = StartPipeExport(upcoming, pool)[0]
+            logger.info(f"Processing file {i + 1}/{len(paths)}: {path}")
+            UpdatePipe(path, started.pop(path, None))
+            MarkPipeProcessed(path)
+    finally:
+        _tracking_workbook.update(keep=False, workbook=None, stamp=None)
+        if pool is not None:
+            StopPipePool(pool, [item for pending in started.values() for item in pending])
+
+################################################################
+# Watch Mode
+################################################################
+
+def _PipeStamps(idir: str) -> Dict[str, Tuple[int, int]]:
+    """{export path: (size, modification time)} of the exports of a directory"""
+    stamps = {}
+    for path in ListPipeFiles(idir):
+        parts = [_FileStamp(part) for part in ListPipeParts(path)]
+        if parts and None not in parts:
+            stamps[os.path.normpath(os.path.abspath(path))] = (sum(p[0] for p in parts), max(p[1] for p in parts))
+    return stamps
+
+def WatchPipeDirectory(idir: str, interval: Optional[float] = None, settle: Optional[float] = None,
+                       max_scans: Optional[int] = None) -> int:
+    """Update the tracking file each time a new export arrives in a directory
+
+    The directory is scanned every interval seconds. A new or modified export
+    is processed once its size and modification time did not change for
+    settle seconds and its structure is valid (a partially written xlsx
+    fails the ZIP check). The process, its imports, the pipe cache and the
+    tracking workbook (see KeepTrackingWorkbook) stay loaded between updates.
+    A failed update is logged and the export is not retried until modified.
+
+    Args:
+        idir: Export directory
+        interval: Seconds between two scans (default PIPE_WATCH_INTERVAL)
+        settle: Seconds an export must stay unchanged (default PIPE_WATCH_SETTLE)
+        max_scans: Stop after this many scans (None: until interrupted)
+
+    Returns:
+        Number of exports processed
+    """
+    interval = PIPE_WATCH_INTERVAL if interval is None else interval
+    settle = PIPE_WATCH_SETTLE if settle is None else settle
+    _tracking_workbook['keep'] = True
+
+    # Exports already there are not processed again, except a latest one never processed
+    known = _PipeStamps(idir)
+    unprocessed = ListManifestPipes(idir, unprocessed=True)
+    if unprocessed and unprocessed[-1] == ListManifestPipes(idir)[-1]:
+        known.pop(unprocessed[-1], None)
+    pending = {}
+
+    logger.info(f"Watching {Fore.CYAN}{idir}{Style.RESET_ALL} for new exports (every {interval:g}s, Ctrl+C to stop)")
+    processed = 0
+    scans = 0
+    try:
+        while max_scans is None or scans < max_scans:
+            scans += 1
+            now = time.monotonic()
+            stamps = _PipeStamps(idir)
+            for path, stamp in stamps.items():
+                if known.get(path) == stamp:
+                    continue
+                if path not in pending or pending[path][0] != stamp:
+                    # New or still being written: wait until it settles
+                    pending[path] = (stamp, now)
+            for path in [path for path in pending if path not in stamps]:
+                del pending[path]
+
+            ready = []
+            for path in [path for path, (stamp, since) in pending.items() if now - since >= settle]:
+                known[path] = pending.pop(path)[0]
+                # Invalid exports are reported once, and retried when modified
+                if CheckPipeFile(path):
+                    ready.append(path)
+            if ready:
+                todo = ListManifestPipes(idir, unprocessed=True)
+            for path in sorted(ready, key=lambda path: todo.index(path) if path in todo else -1):
+                if path not in todo:
+                    logger.info(f"Export {os.path.basename(path)} already processed or duplicate, skipped")
+                    continue
+                try:
+                    UpdatePipe(path)
+                    MarkPipeProcessed(path)
+                    processed += 1
+                except PipeProcessingError as e:
+                    logger.error(f"Update with {os.path.basename(path)} failed, waiting for the next export: {str(e)}")
+
+            if max_scans is None or scans < max_scans:
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        logger.info("Watch mode stopped")
+    finally:
+        _tracking_workbook.update(keep=False, workbook=None, stamp=None)
+    return processed
+
 def main() -> None:
     """Main function with comprehensive error handling and validation"""
     try:
@@ -2236,10 +4615,30 @@ def main() -> None:
 
         if len(sys.argv) > 1:
             logger.info(f'Parameter {sys.argv[1]} detected')
-            if sys.argv[1].lower() == 'all':
+            if sys.argv[1].lower() == 'check':
+                # Structural check only: python UpdatePipe.py check [export or folder ...]
+                paths = sys.argv[2:] or ListPipeFiles(DIRECTORY_PIPE_RAW)
+                start = time.perf_counter()
+                valid, invalid = CheckPipeFiles(paths)
+                for path in valid:
+                    logger.info(f"{Fore.GREEN}OK{Style.RESET_ALL} {path}")
+                for path in invalid:
+                    logger.error(f"INVALID {path}")
+                logger.info(f"Checked {len(paths)} exports in {time.perf_counter() - start:.2f}s: {len(valid)} valid, {len(invalid)} invalid")
+                sys.exit(1 if invalid else 0)
+            if sys.argv[1].lower() == 'watch':
+                # Long running: update on each new export until Ctrl+C
+                processed = WatchPipeDirectory(DIRECTORY_PIPE_RAW)
+                logger.info(f"Processed {processed} exports in watch mode")
+                return
+            if sys.argv[1].lower() in ('all', 'new'):
+                # 'new': only the exports not processed yet (see the export manifest)
                 loopProc = True
-                PipeFList = GetAllPipe(DIRECTORY_PIPE_RAW)
-                logger.info(f"Processing all {len(PipeFList)} pipe files")
+                unprocessed = sys.argv[1].lower() == 'new'
+                PipeFList, invalid = CheckPipeFiles(GetAllPipe(DIRECTORY_PIPE_RAW, unprocessed))
+                for path in invalid:
+                    logger.warning(f"Skipping invalid pipe file: {path}")
+                logger.info(f"Processing {'new' if unprocessed else 'all'} {len(PipeFList)} pipe files")
             else:
                 if CheckPipeFile(sys.argv[1]):
                     LatestPipe = sys.argv[1]
@@ -2255,11 +4654,10 @@ def main() -> None:
 
         # Process files
         if loopProc:
-            for i, f in enumerate(PipeFList, 1):
-                logger.info(f"Processing file {i}/{len(PipeFList)}: {f}")
-                UpdatePipe(f)
+            UpdatePipes(PipeFList)
         else:
             UpdatePipe(LatestPipe)
+            MarkPipeProcessed(LatestPipe)
 
         logger.info("UpdatePipe application completed successfully")
 
@@ -5,6 +5,7 @@ Usage:
     python debug_owner_week.py "Owner Name" 43
 
 This will show all opportunities created by the owner in the specified week.
+The export is loaded through UpdatePipe (same cleanup and columnar cache).
 """
 
 import sys
@@ -17,6 +18,8 @@ import platform
 # Load environment variables
 load_dotenv()
 
+import UpdatePipe
+
 # Detect if we can use Unicode icons safely
 # On Windows, check PowerShell version. Use plain text for older versions.
 def can_use_unicode():
@@ -46,7 +49,6 @@ USE_UNICODE = can_use_unicode()
 WARNING_ICON = "⚠️" if USE_UNICODE else "[!]"
 
 DIRECTORY_PIPE_RAW = os.getenv("DIRECTORY_PIPE_RAW")
-SKIP_ROW = int(os.getenv("SKIP_ROW", 12))
 
 # Column indices (after reorg)
 COL_OPTYOWNER = 0
@@ -61,12 +63,11 @@ COL_SALESMODELNAME = 10
 
 def get_latest_pipe(directory):
     """Get the latest pipe file from directory"""
-    import glob
-    files = glob.glob(f'{directory}/*.xls*')
+    files = UpdatePipe.ListManifestPipes(directory)
     if not files:
-        print(f"ERROR: No Excel files found in {directory}")
+        print(f"ERROR: No Excel or CSV files found in {directory}")
         sys.exit(1)
-    return max(files, key=os.path.getctime)
+    return files[-1]
 
 def main():
     if len(sys.argv) < 3:
@@ -85,23 +86,10 @@ def main():
     latest_pipe = get_latest_pipe(DIRECTORY_PIPE_RAW)
     print(f"Loading pipe file: {os.path.basename(latest_pipe)}")
 
-    df_pipe = pd.read_excel(latest_pipe, skiprows=SKIP_ROW)
-
-    # Drop unnamed columns
-    unnamed_cols = [col for col in df_pipe.columns if str(col).startswith('Unnamed:')]
-    if unnamed_cols:
-        df_pipe.drop(columns=unnamed_cols, inplace=True)
-
-    # Reorg columns (same as UpdatePipe.py)
+    # Same prepared data as UpdatePipe (auto-detected header, cleanup, parsed dates),
+    # served from the columnar cache when the export was already processed
+    df_pipe = UpdatePipe.LoadPipeExport(latest_pipe)
     cols = list(df_pipe.columns.values)
-    Cval = cols.pop(11)
-    cols.insert(7, Cval)
-    Cval = cols.pop(11)
-    cols.insert(7, Cval)
-    df_pipe = df_pipe.reindex(columns=cols)
-
-    # Format dates
-    df_pipe[cols[COL_CREATED]] = pd.to_datetime(df_pipe[cols[COL_CREATED]], format='mixed', errors='coerce')
 
     # Get column names
     owner_col = cols[COL_OPTYOWNER]
@@ -127,13 +115,9 @@ def main():
     # Get current year
     current_year = datetime.now().year
 
-    # Add week and year columns
-    owner_opties['Week'] = owner_opties[created_col].apply(
-        lambda x: x.isocalendar()[1] if pd.notna(x) else None
-    )
-    owner_opties['Year'] = owner_opties[created_col].apply(
-        lambda x: x.year if pd.notna(x) else None
-    )
+    # Add week and year columns (week from the UpdatePipe calendar table)
+    owner_opties['Week'] = UpdatePipe.CalendarAttributes(owner_opties[created_col])['ISO Week']
+    owner_opties['Year'] = UpdatePipe.sanitize_date_series(owner_opties[created_col]).dt.year
 
     # Filter for target week AND current year only
     week_opties = owner_opties[
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Test script for the column-level (vectorized) versions of the per-row helpers
+
+Each vectorized helper must give the same result as the per-row function it replaces.
+"""
+
+import sys
+import os
+import unittest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import UpdatePipe
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+
+def same_values(left, right):
+    """Compare two lists of floats, NaN equal to NaN"""
+    return len(left) == len(right) and all(
+        (pd.isna(a) and pd.isna(b)) or a == b for a, b in zip(left, right))
+
+
+def encode_keys(pairs):
+    """Integer Keys of (Opportunity Number, Model Name) pairs, as built by UpdatePipe"""
+    UpdatePipe.ResetKeyCodes()
+    opty, model = zip(*pairs)
+    return UpdatePipe.EncodeKeys(pd.Series(opty), pd.Series(model)).tolist()
+
+
+def test_sanitize_numeric_series():
+    """sanitize_numeric_series matches sanitize_numeric_value cell by cell"""
+    values = [True, 2.5, '3', datetime(2025, 1, 1), None, '', '€1,234.50', 'EUR 99',
+              '-', '1.2.3', np.nan, 7, '  12 ', 'abc', '-5.5%']
+    series = pd.Series(values, dtype=object, index=range(100, 100 + len(values)))
+
+    for default in (0.0, np.nan):
+        result = UpdatePipe.sanitize_numeric_series(series, default)
+        assert result.dtype == 'float64'
+        assert list(result.index) == list(series.index)
+        expected = [UpdatePipe.sanitize_numeric_value(v, default) for v in values]
+        assert same_values(result.tolist(), expected), f"{result.tolist()} != {expected}"
+
+    # Numeric columns only get the blanks replaced
+    numeric = pd.Series([1, np.nan, 3.5])
+    assert UpdatePipe.sanitize_numeric_series(numeric).tolist() == [1.0, 0.0, 3.5]
+
+
+def test_sanitize_date_series():
+    """Text dates are parsed with one inferred format, odd values fall back to 'mixed'"""
+    # Day first, detected thanks to the days above 12
+    day_first = pd.Series(['05/01/2026', '25/12/2025', ' 13/02/2026 ', '', None])
+    result = UpdatePipe.sanitize_date_series(day_first)
+    assert result.dtype == 'datetime64[ns]'
+    assert result.tolist()[:3] == [pd.Timestamp(2026, 1, 5), pd.Timestamp(2025, 12, 25),
+                                   pd.Timestamp(2026, 2, 13)]
+    assert result[3:].isna().all()
+
+    # Ambiguous dates are read month first, like the 'mixed' parser
+    assert UpdatePipe.InferDateFormat(pd.Series(['05/01/2026', '06/02/2026'])) == '%m/%d/%Y'
+    assert UpdatePipe.InferDateFormat(pd.Series(['not a date'])) is None
+
+    # Real dates pass through, odd text values and invalid ones are handled per cell
+    mixed = pd.Series([datetime(2025, 3, 4), '2025-06-30', 'March 5, 2025', 'garbage'], dtype=object)
+    result = UpdatePipe.sanitize_date_series(mixed)
+    assert result.tolist()[:3] == [pd.Timestamp(2025, 3, 4), pd.Timestamp(2025, 6, 30),
+                                   pd.Timestamp(2025, 3, 5)]
+    assert pd.isna(result.iloc[3])
+
+    # Parsed values are not parsed again downstream
+    stamp = pd.Timestamp(2025, 3, 4)
+    assert UpdatePipe.sanitize_date_value(stamp) is stamp
+
+
+def test_master_key_index():
+    """Master lookups through the Key index match a scan of the master"""
+    A, B, C, missing = encode_keys([('OPP-1', 'ModelA'), ('OPP-2', 'ModelB'), ('OPP-3', 'ModelC'), ('OPP-9', 'ModelZ')])
+    master = pd.DataFrame({
+        'Key': [A, B, A, C],
+        'Next Step & Support demandé / Commentaire': ['old note', 'note B', 'new note', None],
+        'Estimated\nQuantity': ['=Q3*2', 5, '=Q5', ''],
+        'Quantité': [10, 5, 12, 7],
+        'Revenu From\nEstinated Qty': ['=R3', 500, '=R5', ''],
+        'Prix de vente': [100.0, 100.0, 110.0, 50.0],
+        'Prix total': [1000.0, 500.0, 1320.0, 350.0],
+    }, index=[5, 6, 7, 8])
+    assert master['Key'].dtype == 'int64'
+
+    saved = getattr(UpdatePipe, 'df_master', None)
+    UpdatePipe.df_master = master
+    try:
+        # Duplicate keys: generic lookups read the last row, Qty/Revenue fallbacks the first one
+        assert UpdatePipe.MasterRowPosition(A) == 2
+        assert UpdatePipe.MasterRowPosition(A, first=True) == 0
+        assert UpdatePipe.MasterRowPosition(missing) is None
+
+        assert UpdatePipe.Mapping_NxtStp(A) == 'new note'
+        assert UpdatePipe.Mapping_NxtStp(C) == ''
+        assert UpdatePipe.Mapping_NxtStp(missing) == ''
+        assert UpdatePipe.Mapping_Generic(B, 'Unknown column') == ''
+
+        assert UpdatePipe.Mapping_Qty(A) == 10.0
+        assert UpdatePipe.Mapping_Qty(B) == 5.0
+        assert UpdatePipe.Mapping_Qty(C) == 7.0
+        assert UpdatePipe.Mapping_RevEur(A) == 1000.0
+        assert UpdatePipe.Mapping_RevEur(B) == 500.0
+        assert UpdatePipe.Mapping_RevEur(missing) == ''
+
+        # A new master (e.g. after a week shift) gets a new index
+        UpdatePipe.df_master = master.iloc[::-1].reset_index(drop=True)
+        assert UpdatePipe.MasterRowPosition(A) == 3
+        assert UpdatePipe.Mapping_NxtStp(A) == 'old note'
+    finally:
+        UpdatePipe.df_master = saved
+
+
+def test_map_manual_columns():
+    """The joined manual columns match the per-Key mappings"""
+    A, B, C, D, E, missing = encode_keys([('OPP-1', 'ModelA'), ('OPP-2', 'ModelB'), ('OPP-3', 'ModelC'),
+                                          ('OPP-4', 'ModelD'), ('OPP-5', 'ModelE'), ('OPP-9', 'ModelZ')])
+    master = pd.DataFrame({
+        'Key': [A, B, A, C, D, E],
+        'Next Step & Support demandé / Commentaire': ['old note', ' note B ', 'new note', None, 12, ''],
+        'Estimated\nQuantity': ['=Q3*2', 5, '=Q5', '', 0, None],
+        'Quantité': [10, 5, 12, 7, 3, 0],
+        'Revenu From\nEstinated Qty': ['=R3', 500, '=R5', '', 'x', 0],
+        'Prix de vente': [100.0, '€100', 110.0, 50.0, 20.0, 1.0],
+        'Prix total': [1000.0, 500.0, 1320.0, 350.0, '60', 0.0],
+        'Quarter Invoice\nFacturation': ['Q1FY26', None, 'Q2FY26', '', 'Q3FY26', 'Q4FY26'],
+    }, index=[5, 6, 7, 8, 9, 10])
+    keys = pd.Series([A, missing, B, C, D, E, A], index=range(200, 207))
+
+    saved = getattr(UpdatePipe, 'df_master', None)
+    try:
+        for frame in (master, master.drop(columns=['Quantité', 'Prix total']), master.iloc[0:0], None):
+            UpdatePipe.df_master = frame
+            mapped = UpdatePipe.MapManualColumns(keys)
+            assert list(mapped.index) == list(keys.index)
+            assert mapped['Estimated\nQuantity'].tolist() == keys.map(UpdatePipe.Mapping_Qty).tolist()
+            assert mapped['Revenu From\nEstinated Qty'].tolist() == keys.map(UpdatePipe.Mapping_RevEur).tolist()
+            assert mapped['Next Step & Support demandé / Commentaire'].tolist() == keys.map(UpdatePipe.Mapping_NxtStp).tolist()
+            assert mapped['Quarter Invoice\nFacturation'].tolist() == [
+                UpdatePipe.Mapping_Generic(key, 'Quarter Invoice\nFacturation') for key in keys]
+    finally:
+        UpdatePipe.df_master = saved
+
+
+def test_map_forecast_column():
+    """The Forecast classifier matches Mapping_FrCast and counts the unreadable Win Rates"""
+    stages = ['Closed Won', 'Qualify', 'Propose', 'Propose', 'Negotiate', 'Qualify', 'Qualify',
+              'Qualify', 'Qualify', 'Qualify', 'Closed Lost', 'Qualify', 'Qualify', 'Qualify', 'Qualify']
+    rates = ['10%', '75%', '0%', '100%', ' 50 % ', '', None, 'abc', 33.0, '-20%', '1%',
+             '1_000', 'inf', '-500%', '%']
+    preserved = ['', 'COMMIT = Certain à 100% du WIN', 'typo', '', 'x', 'LOST = Perdu', 'kept', 'kept',
+                 'kept', '', '', '', 'kept', 'kept', '']
+    df = pd.DataFrame({'Stage': stages, 'Win Rate': rates, 'Key': [f'K{i}' for i in range(len(rates))]},
+                      index=range(50, 50 + len(rates)))
+
+    saved_master, saved_cols = getattr(UpdatePipe, 'df_master', None), UpdatePipe.cols
+    UpdatePipe.df_master = pd.DataFrame({'Key': df['Key'], 'Forecast projet\nMenu déroulant': preserved})
+    UpdatePipe.cols = None
+    try:
+        expected = df.apply(UpdatePipe.Mapping_FrCast, axis=1).tolist()
+        with unittest.TestCase().assertLogs(UpdatePipe.logger, 'WARNING') as logs:
+            result = UpdatePipe.MapForecastColumn(df['Stage'].astype('category'), df['Win Rate'],
+                                                  pd.Series(preserved, index=df.index))
+    finally:
+        UpdatePipe.df_master, UpdatePipe.cols = saved_master, saved_cols
+
+    assert list(result.index) == list(df.index)
+    assert result.tolist() == expected, f"{result.tolist()} != {expected}"
+    # 'abc', 33.0, 'inf' and '-500%'
+    assert '4 Win Rate value(s) could not be read' in logs.output[0]
+
+
+def test_map_quarter_invoice_column():
+    """Quarter Invoice is derived from the close dates, per fiscal year start"""
+    close = pd.Series(pd.to_datetime(['2025-01-15', '2025-03-31', '2025-04-01', '2025-09-30',
+                                      '2025-10-01', '2025-12-31', None, '2026-06-15']),
+                      index=range(10, 18))
+    preserved = pd.Series(['', 'Q9FY99', '', '', '', '', 'Q2FY25', ''], index=close.index)
+    df = pd.DataFrame({'Key': [f'K{i}' for i in range(len(close))], 'Date de clôture': close})
+
+    saved = (getattr(UpdatePipe, 'df_master', None), UpdatePipe.cols, UpdatePipe.FISCAL_YEAR_START_MONTH)
+    UpdatePipe.df_master = pd.DataFrame({'Key': df['Key'].tolist(), 'Quarter Invoice\nFacturation': preserved.tolist()})
+    UpdatePipe.cols = None
+    try:
+        for start in (1, 4, 10):
+            UpdatePipe.FISCAL_YEAR_START_MONTH = start
+            result = UpdatePipe.MapQuarterInvoiceColumn(close, preserved)
+            assert list(result.index) == list(close.index)
+            assert result.tolist() == df.apply(UpdatePipe.Mapping_QtrInvoice, axis=1).tolist()
+
+        UpdatePipe.FISCAL_YEAR_START_MONTH = 1
+        assert UpdatePipe.MapQuarterInvoiceColumn(close, preserved).tolist() == [
+            'Q1FY25', 'Q1FY25', 'Q2FY25', 'Q3FY25', 'Q4FY25', 'Q4FY25', 'Q2FY25', 'Q2FY26']
+        # Fiscal year starting in April, named after the year it ends in
+        UpdatePipe.FISCAL_YEAR_START_MONTH = 4
+        assert UpdatePipe.MapQuarterInvoiceColumn(close, preserved).tolist() == [
+            'Q4FY25', 'Q4FY25', 'Q1FY26', 'Q2FY26', 'Q3FY26', 'Q3FY26', 'Q2FY25', 'Q1FY27']
+
+        # Text close dates are parsed first
+        text = pd.Series(['15/01/2025', '', '30/09/2025'])
+        assert UpdatePipe.MapQuarterInvoiceColumn(text, pd.Series(['a', 'b', 'c'])).tolist() == [
+            'Q4FY25', 'b', 'Q2FY26']
+    finally:
+        UpdatePipe.df_master, UpdatePipe.cols, UpdatePipe.FISCAL_YEAR_START_MONTH = saved
+
+
+def test_encode_keys():
+    """Opportunity + Model pairs get integer Keys shared between frames"""
+    UpdatePipe.ResetKeyCodes()
+    pipe = UpdatePipe.EncodeKeys(pd.Series(['OPP-1', 'OPP-12', 'OPP-1', None, 'OPP-3'], index=range(10, 15)),
+                                 pd.Series(['2X', 'X', '2X', None, np.nan], dtype='category', index=range(10, 15)))
+    assert pipe.dtype == 'int64' and list(pipe.index) == list(range(10, 15))
+    # The concatenated text of the first two pairs is the same, their Keys are not
+    assert pipe[10] == pipe[12] != pipe[11]
+    assert pipe[13] == UpdatePipe.NO_KEY and pipe[14] >= 0
+
+    master = UpdatePipe.EncodeKeys(pd.Series(['OPP-12', 'OPP-9', 'OPP-3']), pd.Series(['X', 'Y', '']))
+    assert master.tolist() == [pipe[11], master[1], pipe[14]] and master[1] not in pipe.tolist()
+
+    # Week History rows of the old format are matched on their text key
+    history = pd.DataFrame({'key': ['OPP-9Y', 'OPP-3', 'OPP-99Z', 'ignored'],
+                            'Opportunity Number': ['', '', '', 'OPP-1'],
+                            'Model Name': ['', '', '', '2X']})
+    history = UpdatePipe.EncodeWeekHistoryKeys(history)
+    assert history['key'].tolist()[:2] == [master[1], pipe[14]]
+    assert history['key'][2] == UpdatePipe.NO_KEY and history['key'][3] == pipe[10]
+    assert history['Opportunity Number'].tolist()[:2] == ['OPP-9', 'OPP-3']
+    assert history['Model Name'].tolist()[:2] == ['Y', '']
+
+
+def pipe_frame(rows):
+    """Prepared export with the COL_* layout"""
+    columns = ['Owner', 'Created Date', 'Close Date', 'Stage', 'Opportunity Number', 'Account', 'End Customer',
+               'Quantity', 'Sales Price', 'Total Price', 'Model Name', 'Currency', 'Win Rate', 'Product Line',
+               'Deal Type']
+    df = pd.DataFrame([[owner, datetime(2025, 1, 6), close, stage, opty, '', '', qty, 10.0, qty * 10.0, model,
+                        'EUR', '', 'NX', 'Project Deal'] for opty, model, owner, stage, close, qty in rows],
+                      columns=columns)
+    df['Key'] = UpdatePipe.EncodeKeys(df['Opportunity Number'], df['Model Name'])
+    return df
+
+
+def test_change_feed():
+    """Fingerprints stored in the workbook classify the lines of the next export"""
+    import openpyxl
+    UpdatePipe.ResetKeyCodes()
+    close = datetime(2025, 3, 31)
+    before = pipe_frame([('OPP-1', 'A', 'Anna', 'Qualify', close, 2),
+                         ('OPP-2', 'B', 'Bob', 'Qualify', close, 1),
+                         ('OPP-2', 'B', 'Bob', 'Propose', close, 3),
+                         ('OPP-3', 'C', 'Carl', 'Qualify', close, 1)])
+    workbook = openpyxl.Workbook()
+    assert UpdatePipe.LoadPipeFingerprints(workbook) is None
+    first = UpdatePipe.ClassifyPipeChanges(None, UpdatePipe.FingerprintPipeRows(before))
+    assert first.empty and UpdatePipe.BuildChangeFeed(first, before).empty
+    UpdatePipe.WriteChangeFeedToExcel(workbook, UpdatePipe.BuildChangeFeed(first, before),
+                                      UpdatePipe.FingerprintPipeRows(before))
+
+    # Read back as a later update: Key codes start over
+    UpdatePipe.ResetKeyCodes()
+    after = pipe_frame([('OPP-2', 'B', 'Bob', 'Propose', close, 3),
+                        ('OPP-4', 'D', 'Dana', 'Qualify', close, 5),
+                        ('OPP-2', 'B', 'Bob', 'Qualify', close, 1),
+                        ('OPP-1', 'A', 'Anna', 'Commit', close, 2)])
+    # Quantities read back as floats (pipe cache) keep their fingerprint
+    after['Quantity'] = after['Quantity'].astype('float64')
+    previous = UpdatePipe.LoadPipeFingerprints(workbook)
+    changes = UpdatePipe.ClassifyPipeChanges(previous, UpdatePipe.FingerprintPipeRows(after))
+    by_opty = dict(zip(changes['Opportunity Number'], changes['Change']))
+    assert by_opty == {'OPP-1': 'Changed', 'OPP-2': 'Unchanged', 'OPP-3': 'Removed', 'OPP-4': 'New'}
+
+    feed = UpdatePipe.BuildChangeFeed(changes, after)
+    assert feed['Change'].tolist() == ['New', 'Changed', 'Removed']
+    assert feed['Stage'].tolist()[:2] == ['Qualify', 'Commit'] and pd.isna(feed['Stage'].iloc[2])
+    assert feed['Total Price'].tolist()[:2] == [50.0, 20.0]
+
+    UpdatePipe.WriteChangeFeedToExcel(workbook, feed, UpdatePipe.FingerprintPipeRows(after))
+    rows = list(workbook['Change Feed'].iter_rows(min_row=2, values_only=True))
+    assert [row[:3] for row in rows] == [('New', 'OPP-4', 'D'), ('Changed', 'OPP-1', 'A'), ('Removed', 'OPP-3', 'C')]
+    assert rows[2][3:] == (None, None, None, None)
+
+
+def test_write_pipe_rows_incremental():
+    """Only the lines that differ are written, unchanged lines stay in place"""
+    import openpyxl
+    UpdatePipe.ResetKeyCodes()
+    workbook = openpyxl.Workbook()
+    ws = workbook.active
+    ws.append(['title'])
+    ws.append(['Opportunity Number', 'Nom du produit', 'Stage', 'Formula'])
+    for row in [('OPP-1', 'A', 'Qualify'), ('OPP-2', 'B', 'Qualify'), ('OPP-3', 'C', 'Qualify'),
+                ('OPP-2', 'B', 'Propose'), ('OPP-4', 'D', None)]:
+        ws.append(list(row) + ['=formula'])
+    ws.cell(6, 2).number_format = 'kept'
+
+    rows = pd.DataFrame([['OPP-2', 'B', 'Qualify', 0.0], ['OPP-5', 'E', 'Qualify', 0.0],
+                         ['OPP-1', 'A', 'Commit', 0.0], ['OPP-2', 'B', 'Propose', 0.0], ['OPP-4', 'D', '', 0.0]],
+                        columns=['Opportunity Number', 'Nom du produit', 'Stage', 'Formula'])
+    keys = UpdatePipe.EncodeKeys(rows['Opportunity Number'], rows['Nom du produit']).to_numpy()
+    refresh, counts = UpdatePipe.WritePipeRowsIncremental(ws, rows, keys, (0, 1), 3, skip_columns=(4,))
+
+    assert counts == {'New': 1, 'Changed': 1, 'Removed': 1, 'Unchanged': 3}
+    values = [row for row in ws.iter_rows(min_row=3, values_only=True)]
+    assert [row[:3] for row in values] == [('OPP-1', 'A', 'Commit'), ('OPP-2', 'B', 'Qualify'),
+                                           ('OPP-2', 'B', 'Propose'), ('OPP-4', 'D', None), ('OPP-5', 'E', 'Qualify')]
+    # Rows from the removed line down need their formulas and formats again
+    assert refresh == 5 and values[0][3] == '=formula' and values[4][3] == 0.0
+    assert ws.cell(5, 2).number_format == 'kept'
+    assert UpdatePipe.WritePipeRowsIncremental(ws, rows, keys, (0, 1), 3, skip_columns=(4,))[1]['Unchanged'] == 5
+
+
+if __name__ == "__main__":
+    test_sanitize_numeric_series()
+    test_sanitize_date_series()
+    test_master_key_index()
+    test_map_manual_columns()
+    test_map_forecast_column()
+    test_map_quarter_invoice_column()
+    test_encode_keys()
+    test_change_feed()
+    test_write_pipe_rows_incremental()
+    print("Vectorized mapping tests PASSED!")
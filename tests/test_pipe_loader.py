@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+Test script for the single-pass Salesforce export loader
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import UpdatePipe
+import csv
+import json
+import zipfile
+import openpyxl
+import pandas as pd
+from datetime import datetime
+
+# Raw column order of the Salesforce report (UpdatePipe reorders it to the master layout)
+EXPORT_HEADER = ['Opportunity Owner', 'Created Date', 'Close Date', 'Stage', 'Opportunity Number',
+                 'Indirect Account', 'End Customer', 'Estimated Total Price', 'Sales Model Name',
+                 'Part Number', 'Estimated Quantity', 'Sales Price', 'Account Name',
+                 'Product Line', 'Deal Type', 'Win Rate']
+
+EXPORT_ROWS = [
+    ['Alice MARTIN', datetime(2025, 9, 1), datetime(2025, 12, 15), 'Qualification', 'OPP-001',
+     'Reseller A', 'Clinique Générale', 25000, 'ModelA', 'PN-1', 100, 250.0, 'Disti A', 'NX', 'Project', '50%'],
+    ['Bob DURAND', datetime(2025, 9, 8), datetime(2026, 1, 20), 'Closed Won', 'OPP-002',
+     'Reseller B', 'Generic End User', 60000, 'ModelB', 'PN-2', 120, 500.5, 'Disti B', 'NB', 'Run Rate Deal', '100%'],
+    ['Alice MARTIN', datetime(2025, 9, 10), None, 'Closed Lost', 'OPP-003',
+     None, 'Customer C', 999, 'ModelC', 'PN-3', 10, 99.9, 'Disti A', 'LM', 'Project', None],
+]
+
+
+def write_export(path, preamble_rows=12, header=EXPORT_HEADER, rows=EXPORT_ROWS, leading_blank_col=True):
+    """Write a synthetic Salesforce export with preamble lines before the header"""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    offset = 2 if leading_blank_col else 1
+    ws.cell(row=1, column=1).value = 'ASUS BTB PIPELINE'
+    if preamble_rows > 3:
+        ws.cell(row=3, column=1).value = 'Exported first 15,000 rows. Use the API to export more.'
+    for c, value in enumerate(header):
+        ws.cell(row=preamble_rows + 1, column=offset + c).value = value
+    for r, row in enumerate(rows):
+        for c, value in enumerate(row):
+            ws.cell(row=preamble_rows + 2 + r, column=offset + c).value = value
+    total_row = preamble_rows + 2 + len(rows)
+    ws.cell(row=total_row, column=offset).value = 'Total'
+    ws.cell(row=total_row + 2, column=1).value = 'Confidential Information - Do Not Distribute'
+    wb.save(path)
+
+
+def write_export_csv(path, preamble_rows=12, delimiter=',', encoding='utf-8-sig'):
+    """Write the same synthetic export as CSV (Salesforce 'Export details' layout)"""
+    with open(path, 'w', newline='', encoding=encoding) as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        writer.writerow(['ASUS BTB PIPELINE'])
+        for _ in range(preamble_rows - 1):
+            writer.writerow([])
+        writer.writerow(EXPORT_HEADER)
+        for row in EXPORT_ROWS:
+            values = []
+            for value in row:
+                if isinstance(value, datetime):
+                    value = value.strftime('%Y-%m-%d')
+                elif isinstance(value, float) and delimiter == ';':
+                    value = str(value).replace('.', ',')
+                values.append('' if value is None else value)
+            writer.writerow(values)
+        writer.writerow(['Total'])
+        writer.writerow(['Confidential Information - Do Not Distribute'])
+
+
+def test_loader_matches_read_excel(tmp_path):
+    """The streaming loader must build the same DataFrame as pd.read_excel(skiprows=...)"""
+    for preamble in (12, 15):
+        export = str(tmp_path / f'export_{preamble}.xlsx')
+        write_export(export, preamble_rows=preamble)
+
+        df_pipe, skip_rows = UpdatePipe.LoadPipeFile(export)
+        assert skip_rows == preamble, f"Expected header after {preamble} rows, got {skip_rows}"
+
+        expected = pd.read_excel(export, skiprows=skip_rows)
+        pd.testing.assert_frame_equal(df_pipe, expected)
+
+
+def test_reader_engines_match(tmp_path):
+    """Every installed reader backend must produce the same DataFrame"""
+    export = str(tmp_path / 'export.xlsx')
+    write_export(export, preamble_rows=15)
+
+    saved = UpdatePipe.PIPE_READER_ENGINE
+    frames = {}
+    try:
+        for engine, reader_class in UpdatePipe.PIPE_READERS.items():
+            if not reader_class.available():
+                print(f"Reader engine {engine} not installed, skipped")
+                continue
+            UpdatePipe.PIPE_READER_ENGINE = engine
+            assert UpdatePipe.GetPipeReader().name == engine
+            frames[engine] = UpdatePipe.LoadPipeFile(export)[0]
+    finally:
+        UpdatePipe.PIPE_READER_ENGINE = saved
+
+    reference = frames.pop('openpyxl')
+    for engine, df_pipe in frames.items():
+        pd.testing.assert_frame_equal(df_pipe, reference, obj=f"{engine} engine")
+
+
+def test_csv_export_matches_xlsx(tmp_path):
+    """A CSV export read in small chunks gives the same prepared data as the xlsx export"""
+    xlsx = str(tmp_path / 'export.xlsx')
+    write_export(xlsx, preamble_rows=12, leading_blank_col=False)
+    expected = UpdatePipe.PreparePipeData(xlsx)[0]
+
+    saved = UpdatePipe.PIPE_CSV_CHUNKSIZE
+    UpdatePipe.PIPE_CSV_CHUNKSIZE = 2
+    try:
+        for delimiter, encoding in ((',', 'utf-8-sig'), (';', 'cp1252')):
+            export = str(tmp_path / f'export_{encoding}.csv')
+            write_export_csv(export, preamble_rows=12, delimiter=delimiter, encoding=encoding)
+            assert UpdatePipe.SniffPipeCsv(export) == (encoding, delimiter)
+            assert UpdatePipe.DetectHeaderRow(export) == 12
+
+            df_pipe, skip_rows = UpdatePipe.PreparePipeData(export)
+            assert skip_rows == 12
+            pd.testing.assert_frame_equal(df_pipe, expected, check_dtype=False)
+    finally:
+        UpdatePipe.PIPE_CSV_CHUNKSIZE = saved
+
+
+def test_prepared_pipe_schema(tmp_path):
+    """Prepared exports carry the declared categorical, datetime and float dtypes"""
+    export = str(tmp_path / 'export.xlsx')
+    write_export(export)
+    df_pipe = UpdatePipe.PreparePipeData(export)[0]
+    pcols = list(df_pipe.columns)
+
+    for col_idx, dtype in UpdatePipe.PIPE_SCHEMA.items():
+        assert str(df_pipe[pcols[col_idx]].dtype) == dtype, f"{pcols[col_idx]} is {df_pipe[pcols[col_idx]].dtype}"
+
+    # Filters and lookups keep working on the typed columns
+    assert list(df_pipe.loc[df_pipe['Deal Type'] == 'Run Rate Deal', 'Opportunity Number']) == ['OPP-002']
+    assert df_pipe[pcols[UpdatePipe.COL_TOTPRICE]].sum() == 85000.0
+
+
+def test_export_layout_by_name(tmp_path):
+    """Columns are ordered by name and the layout is reused for the next export of the report"""
+    # Same report with the columns in another order
+    order = [0, 1, 2, 3, 4, 5, 6, 15, 14, 13, 12, 11, 10, 9, 8, 7]
+    header = [EXPORT_HEADER[i] for i in order]
+    rows = [[row[i] for i in order] for row in EXPORT_ROWS]
+    shuffled = str(tmp_path / 'shuffled.xlsx')
+    write_export(shuffled, preamble_rows=15, header=header, rows=rows)
+    reference = str(tmp_path / 'reference.xlsx')
+    write_export(reference, preamble_rows=15)
+
+    saved = UpdatePipe.PIPE_CACHE, UpdatePipe.PIPE_CACHE_DIR
+    UpdatePipe.PIPE_CACHE, UpdatePipe.PIPE_CACHE_DIR = True, str(tmp_path / 'PipeCache')
+    try:
+        expected = UpdatePipe.PreparePipeData(reference)[0]
+        df_pipe = UpdatePipe.PreparePipeData(shuffled)[0]
+        pd.testing.assert_frame_equal(df_pipe, expected)
+
+        layout = UpdatePipe.ResolvePipeLayout(header, 15)
+        assert layout['resolved_by'] == 'name'
+        assert layout['language'] == 'English'
+        assert layout['columns'][7:10] == ['Estimated Quantity', 'Sales Price', 'Estimated Total Price']
+
+        # Stored layouts are found from the raw header row without detection
+        UpdatePipe._pipe_layouts.clear()
+        assert os.path.isfile(os.path.join(UpdatePipe.PIPE_CACHE_DIR, 'layouts.json'))
+        assert UpdatePipe.MatchKnownLayout(15, [''] + header) == layout
+        assert UpdatePipe.MatchKnownLayout(14, [''] + header) is None
+
+        # A layout saved meanwhile by another process is kept when this one saves
+        UpdatePipe._pipe_layouts.clear()
+        UpdatePipe._LoadPipeLayouts()
+        other = UpdatePipe._ReadPipeLayouts(os.path.join(UpdatePipe.PIPE_CACHE_DIR, 'layouts.json'))
+        other['other-report'] = dict(layout, skip_rows=20)
+        with open(os.path.join(UpdatePipe.PIPE_CACHE_DIR, 'layouts.json'), 'w', encoding='utf-8') as f:
+            json.dump({'version': UpdatePipe.PIPE_LAYOUT_VERSION, 'layouts': other}, f)
+        UpdatePipe.ResolvePipeLayout(['Owner'] + EXPORT_HEADER[1:], 12)
+        stored = UpdatePipe._ReadPipeLayouts(os.path.join(UpdatePipe.PIPE_CACHE_DIR, 'layouts.json'))
+        assert 'other-report' in stored and len(stored) == len(other) + 1
+    finally:
+        UpdatePipe.PIPE_CACHE, UpdatePipe.PIPE_CACHE_DIR = saved
+
+    # Unknown column names fall back to the legacy positional order
+    renamed = ['Owner'] + EXPORT_HEADER[1:]
+    assert UpdatePipe.ResolvePipeLayout(renamed, 12)['resolved_by'] == 'position'
+
+
+def test_loader_column_projection(tmp_path):
+    """Only the master columns are loaded, extra report columns are skipped"""
+    header = EXPORT_HEADER[:5] + ['Next Step'] + EXPORT_HEADER[5:] + ['Description']
+    rows = [row[:5] + ['Call back'] + row[5:] + ['Long text'] for row in EXPORT_ROWS]
+    wide = str(tmp_path / 'wide.xlsx')
+    write_export(wide, preamble_rows=12, header=header, rows=rows)
+    reference = str(tmp_path / 'reference.xlsx')
+    write_export(reference, preamble_rows=12)
+
+    df_pipe, skip_rows = UpdatePipe.LoadPipeFile(wide, project=True)
+    expected = UpdatePipe.ReorgPipeColumns(UpdatePipe.LoadPipeFile(reference)[0], skip_rows)
+    assert 'Next Step' not in df_pipe.columns and 'Description' not in df_pipe.columns
+    # The footer line is written in the leading column, which the projection never reads:
+    # blank in every layout column, it is trimmed with the empty row above it like any trailing empty row
+    assert len(expected) == len(df_pipe) + 2 and expected.iloc[len(df_pipe):].isna().all(axis=None)
+    pd.testing.assert_frame_equal(df_pipe.reset_index(drop=True), expected.dropna(how='all').reset_index(drop=True))
+    pd.testing.assert_frame_equal(UpdatePipe.PreparePipeData(wide)[0], UpdatePipe.PreparePipeData(reference)[0])
+
+
+def test_cleanup_rules_mask():
+    """Cleanup rules are compiled into one mask with per-rule counts and follow the configuration"""
+    columns = UpdatePipe.ResolvePipeLayout(EXPORT_HEADER, 12)['columns']
+    df_pipe = pd.DataFrame([
+        ['Total', None, None, None, None, None, None, None, None, None, None, None, None, None, None, None],
+        ['Alice MARTIN', None, None, 'Stage', 'OPP-1', None, 'Generic End User', 1, 10.0, 40000, 'M', 'P', 'D', 'NX', None, None],
+        ['Alice MARTIN', None, None, 'Stage', 'OPP-2', None, 'Generic End User', 1, 10.0, None, 'M', 'P', 'D', 'NX', None, None],
+        ['Alice MARTIN', None, None, 'Stage', 'OPP-3', None, 'Generic End User', 1, 10.0, 60000, 'M', 'P', 'D', 'NX', None, None],
+        ['Bob DURAND', None, None, 'Stage', 'OPP-4', None, 'Customer', 1, 10.0, 100, 'M', 'P', 'D', 'MS', None, None],
+        ['Bob DURAND', None, None, 'Stage', 'OPP-5', None, 'Customer', 1, 10.0, 100, 'M', 'P', 'D', 'NB', None, None],
+    ], columns=columns)
+
+    drop, counts = UpdatePipe.CompileCleanupMask(df_pipe)
+    assert list(df_pipe.loc[~drop, 'Opportunity Number']) == ['OPP-3', 'OPP-5']
+    # 'Total' is also missing its customer but is only counted once
+    assert counts['bogus owner'] == 1 and counts['missing customer'] == 0
+    assert counts['Generic customer under 50000'] == 1
+    assert counts['Generic customer without price'] == 1
+    assert counts['excluded product line'] == 1
+
+    saved = UpdatePipe.GENERIC_MIN_TOTAL_PRICE, UpdatePipe.EXCLUDED_PRODUCT_LINES, UpdatePipe.EXCLUDED_PIPE_OWNERS
+    UpdatePipe.GENERIC_MIN_TOTAL_PRICE, UpdatePipe.EXCLUDED_PRODUCT_LINES = 100000.0, []
+    UpdatePipe.EXCLUDED_PIPE_OWNERS = ['Bob DURAND']
+    try:
+        kept = UpdatePipe.FilterPipeRows(df_pipe)
+    finally:
+        UpdatePipe.GENERIC_MIN_TOTAL_PRICE, UpdatePipe.EXCLUDED_PRODUCT_LINES, UpdatePipe.EXCLUDED_PIPE_OWNERS = saved
+    assert kept.empty
+
+
+def test_loader_rejects_invalid_files(tmp_path):
+    """Missing files and unsupported extensions raise PipeProcessingError"""
+    bad_ext = tmp_path / 'export.txt'
+    bad_ext.write_text('not an export')
+    for path in (str(tmp_path / 'missing.xlsx'), str(bad_ext)):
+        try:
+            UpdatePipe.LoadPipeFile(path)
+        except UpdatePipe.PipeProcessingError:
+            continue
+        assert False, f"Expected PipeProcessingError for {path}"
+
+
+def rewrite_xlsx(src, dst, skip=(), stored=()):
+    """Copy an xlsx package, dropping the skip members and storing the stored ones uncompressed"""
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(dst, 'w', zipfile.ZIP_DEFLATED) as zout:
+        for info in zin.infolist():
+            if info.filename not in skip:
+                compress = zipfile.ZIP_STORED if info.filename in stored else zipfile.ZIP_DEFLATED
+                zout.writestr(info.filename, zin.read(info.filename), compress_type=compress)
+
+
+def test_validate_pipe_structure(tmp_path):
+    """Corrupted exports are rejected without parsing the workbook"""
+    export = str(tmp_path / 'export.xlsx')
+    write_export(export)
+    UpdatePipe.ValidatePipeStructure(export)
+    with zipfile.ZipFile(export) as archive:
+        assert UpdatePipe.FirstWorksheetPart(archive) == 'xl/worksheets/sheet1.xml'
+
+    data = open(export, 'rb').read()
+    truncated = tmp_path / 'truncated.xlsx'
+    truncated.write_bytes(data[:len(data) // 2])
+
+    no_sheet = str(tmp_path / 'no_sheet.xlsx')
+    rewrite_xlsx(export, no_sheet, skip=['xl/worksheets/sheet1.xml'])
+
+    # Flip one byte of an uncompressed member: the archive opens but the CRC is wrong
+    bad_crc = str(tmp_path / 'bad_crc.xlsx')
+    rewrite_xlsx(export, bad_crc, stored=['xl/worksheets/sheet1.xml'])
+    raw = bytearray(open(bad_crc, 'rb').read())
+    pos = raw.index(b'Opportunity Owner')
+    raw[pos] = ord('X')
+    open(bad_crc, 'wb').write(bytes(raw))
+
+    legacy = tmp_path / 'legacy.xlsx'
+    legacy.write_bytes(UpdatePipe.OLE2_SIGNATURE + b'\0' * 504)
+    empty_csv = tmp_path / 'empty.csv'
+    empty_csv.write_bytes(b'')
+
+    for path in (str(truncated), no_sheet, bad_crc, str(legacy), str(empty_csv)):
+        try:
+            UpdatePipe.ValidatePipeStructure(path)
+        except UpdatePipe.DataValidationError:
+            assert not UpdatePipe.CheckPipeFile(path)
+            continue
+        assert False, f"Expected DataValidationError for {path}"
+
+    # Legacy .xls workbooks only get the OLE2 signature check
+    xls = tmp_path / 'legacy.xls'
+    xls.write_bytes(UpdatePipe.OLE2_SIGNATURE + b'\0' * 504)
+    valid, invalid = UpdatePipe.CheckPipeFiles([export, str(xls), str(truncated)])
+    assert valid == [export, str(xls)] and invalid == [str(truncated)]
+
+
+def test_prepared_pipe_cache(tmp_path):
+    """A second load of the same export content is served from the cache unchanged"""
+    export = str(tmp_path / 'export.xlsx')
+    write_export(export, preamble_rows=15)
+
+    saved = UpdatePipe.PIPE_CACHE, UpdatePipe.PIPE_CACHE_DIR
+    UpdatePipe.PIPE_CACHE, UpdatePipe.PIPE_CACHE_DIR = True, str(tmp_path / 'PipeCache')
+    try:
+        first = UpdatePipe.LoadPreparedPipe(export)
+        cache_files = [f for f in os.listdir(UpdatePipe.PIPE_CACHE_DIR) if f != 'layouts.json']
+        assert len(cache_files) == 1, f"Expected one cache entry, got {cache_files}"
+        assert '-h15-' in cache_files[0], "Cache entry name must show the detected header row"
+        cache_entry = os.path.join(UpdatePipe.PIPE_CACHE_DIR, cache_files[0])
+
+        # Same content under another name is still a cache hit
+        copy = str(tmp_path / 'copy.xlsx')
+        with open(export, 'rb') as src, open(copy, 'wb') as dst:
+            dst.write(src.read())
+        second = UpdatePipe.LoadPreparedPipe(copy)
+        assert [f for f in os.listdir(UpdatePipe.PIPE_CACHE_DIR) if f != 'layouts.json'] == cache_files
+
+        # An entry made with other settings is replaced, not kept next to the new one
+        stale = cache_entry.replace(f'-{UpdatePipe._PipeCacheSignature()}.', '-00000000.')
+        os.rename(cache_entry, stale)
+        UpdatePipe.LoadPreparedPipe(export)
+        assert [f for f in os.listdir(UpdatePipe.PIPE_CACHE_DIR) if f != 'layouts.json'] == cache_files
+    finally:
+        UpdatePipe.PIPE_CACHE, UpdatePipe.PIPE_CACHE_DIR = saved
+
+    pd.testing.assert_frame_equal(first, second)
+    assert list(first.columns[:4]) == ['Opportunity Owner', 'Created Date', 'Close Date', 'Stage']
+    assert 'Total' not in set(first['Opportunity Owner'])
+
+
+def test_multi_part_export(tmp_path):
+    """Parts of a split export are merged, lines found in an earlier part are dropped"""
+    extra = ['Carl PETIT', datetime(2025, 10, 2), datetime(2026, 3, 31), 'Proposal', 'OPP-004',
+             'Reseller C', 'Customer D', 4000, 'ModelD', 'PN-4', 20, 200.0, 'Disti B', 'NR', 'Project', '25%']
+    # Same Opportunity Number + Model Name text as OPP-001 / ModelA, but another line
+    colliding = extra[:4] + ['OPP-00'] + extra[5:8] + ['1ModelA'] + extra[9:]
+    folder = tmp_path / 'Pipe-2025-11-20.parts'
+    folder.mkdir()
+    write_export(str(folder / 'part1.xlsx'), rows=EXPORT_ROWS[:2])
+    # Overlapping range: OPP-002 is in both parts, OPP-004 is two line items of the same report
+    write_export(str(folder / 'part2.xlsx'), rows=[EXPORT_ROWS[1], extra, extra, colliding])
+    single = str(tmp_path / 'single.xlsx')
+    write_export(single, rows=EXPORT_ROWS[:2] + [extra, extra, colliding])
+
+    # Only '.parts' sub-folders are multi-part exports, an archive of older exports is ignored
+    archive = tmp_path / 'Archive'
+    archive.mkdir()
+    write_export(str(archive / 'Pipe-2025-09-01.xlsx'))
+    assert sorted(UpdatePipe.ListPipeFiles(str(tmp_path))) == [str(folder), single]
+    assert UpdatePipe.CheckPipeFile(str(folder))
+
+    saved = UpdatePipe.PIPE_CACHE, UpdatePipe.PIPE_LOAD_WORKERS
+    try:
+        UpdatePipe.PIPE_CACHE = False
+        expected = UpdatePipe.LoadPipeExport(single)
+        for workers in (0, 2):
+            UpdatePipe.PIPE_LOAD_WORKERS = workers
+            merged = UpdatePipe.LoadPipeExport(str(folder))
+            pd.testing.assert_frame_equal(merged, expected)
+    finally:
+        UpdatePipe.PIPE_CACHE, UpdatePipe.PIPE_LOAD_WORKERS = saved
+
+    assert merged['Opportunity Number'].tolist() == ['OPP-001', 'OPP-002', 'OPP-004', 'OPP-004', 'OPP-00']
+
+
+def test_pipe_manifest(tmp_path):
+    """Exports are ordered by the time in their name, hashed once, duplicates and processed ones skipped"""
+    raw = tmp_path / 'raw'
+    raw.mkdir()
+    write_export(str(raw / 'report1763632800000.xlsx'), rows=EXPORT_ROWS[:1])   # 2025-11-20
+    write_export(str(raw / 'Pipe-2025-11-27-08-00-00.xlsx'), rows=EXPORT_ROWS[:2])
+    write_export(str(raw / 'Pipe_20251113.xlsx'), rows=EXPORT_ROWS)
+    # Same content as an older export, downloaded again
+    (raw / 'Pipe-2025-12-01.xlsx').write_bytes((raw / 'Pipe_20251113.xlsx').read_bytes())
+    # Modification times in the reverse order (copied or synced folder)
+    for i, name in enumerate(sorted(os.listdir(raw), reverse=True)):
+        os.utime(raw / name, (1_700_000_000 + i, 1_700_000_000 + i))
+
+    hashed = []
+    saved = UpdatePipe.PIPE_CACHE, UpdatePipe.PIPE_CACHE_DIR, UpdatePipe.HashPipeFile
+    UpdatePipe.PIPE_CACHE, UpdatePipe.PIPE_CACHE_DIR = True, str(tmp_path / 'PipeCache')
+    UpdatePipe.HashPipeFile = lambda path: hashed.append(path) or saved[2](path)
+    try:
+        names = [os.path.basename(path) for path in UpdatePipe.GetAllPipe(str(raw))]
+        assert names == ['Pipe_20251113.xlsx', 'report1763632800000.xlsx', 'Pipe-2025-11-27-08-00-00.xlsx']
+        assert len(hashed) == 4
+        assert os.path.basename(UpdatePipe.GetLatestPipe(str(raw))) == 'Pipe-2025-11-27-08-00-00.xlsx'
+
+        UpdatePipe.MarkPipeProcessed(str(raw / 'Pipe_20251113.xlsx'))
+        # Reloaded from disk: unchanged exports are not hashed again
+        UpdatePipe._pipe_manifests.clear()
+        unprocessed = UpdatePipe.GetAllPipe(str(raw), unprocessed=True)
+        assert [os.path.basename(path) for path in unprocessed] == names[1:]
+        assert len(hashed) == 4
+
+        # A modified export is indexed again and is no longer processed
+        write_export(str(raw / 'Pipe_20251113.xlsx'), rows=EXPORT_ROWS[1:])
+        assert len(UpdatePipe.GetAllPipe(str(raw), unprocessed=True)) == 4
+        assert len(hashed) == 5
+    finally:
+        UpdatePipe.PIPE_CACHE, UpdatePipe.PIPE_CACHE_DIR, UpdatePipe.HashPipeFile = saved
+        UpdatePipe._pipe_manifests.clear()
+
+    assert UpdatePipe.ParseExportTime('report.xlsx') is None
+    assert UpdatePipe.ParseExportTime('report1763632800000 (1).xlsx') == datetime.fromtimestamp(1763632800)
+    # A 13-digit number outside the Salesforce report name is not an export time
+    assert UpdatePipe.ParseExportTime('Quote 1763632800000 EMEA.xlsx') is None
+    assert UpdatePipe.ParseExportTime('Pipe 2025-11-20 10h15.xlsx') == datetime(2025, 11, 20, 10, 15)
+
+
+def test_watch_pipe_directory(tmp_path):
+    """Watch mode processes the latest unprocessed export once it is complete"""
+    raw = tmp_path / 'raw'
+    raw.mkdir()
+    for name in ('Pipe-2025-11-10.xlsx', 'Pipe-2025-11-20.xlsx'):
+        write_export(str(raw / name), rows=EXPORT_ROWS[:1] if '10' in name else EXPORT_ROWS[:2])
+    complete = tmp_path / 'complete.xlsx'
+    write_export(str(complete))
+    latest = raw / 'Pipe-2025-11-27.xlsx'
+    # Download still in progress
+    latest.write_bytes(complete.read_bytes()[:2000])
+
+    calls = []
+    saved = UpdatePipe.PIPE_CACHE, UpdatePipe.PIPE_CACHE_DIR, UpdatePipe.UpdatePipe
+    UpdatePipe.PIPE_CACHE, UpdatePipe.PIPE_CACHE_DIR = True, str(tmp_path / 'PipeCache')
+    UpdatePipe.UpdatePipe = calls.append
+    try:
+        UpdatePipe.MarkPipeProcessed(UpdatePipe.GetAllPipe(str(raw))[0])
+        assert UpdatePipe.WatchPipeDirectory(str(raw), interval=0, settle=0, max_scans=2) == 0
+
+        latest.write_bytes(complete.read_bytes())
+        assert UpdatePipe.WatchPipeDirectory(str(raw), interval=0, settle=0, max_scans=2) == 1
+        assert calls == [str(latest)]
+        # Processed exports are not processed again
+        assert UpdatePipe.WatchPipeDirectory(str(raw), interval=0, settle=0, max_scans=2) == 0
+    finally:
+        UpdatePipe.PIPE_CACHE, UpdatePipe.PIPE_CACHE_DIR, UpdatePipe.UpdatePipe = saved
+        UpdatePipe._pipe_manifests.clear()
+
+
+def test_update_pipes_prepares_ahead(tmp_path):
+    """'all' mode hands each update its export, prepared ahead by the worker pool, in order"""
+    paths = []
+    for i in range(1, 4):
+        path = str(tmp_path / f'Pipe-2025-11-{10 + i}.xlsx')
+        write_export(path, rows=EXPORT_ROWS[:i])
+        paths.append(path)
+
+    updates = []
+    def record_update(path, pending):
+        assert pending and all(isinstance(item, UpdatePipe.Future) for item in pending)
+        updates.append((path, UpdatePipe.CollectPipeExport(path, pending)))
+
+    saved = UpdatePipe.PIPE_CACHE, UpdatePipe.PIPE_LOAD_WORKERS, UpdatePipe.UpdatePipe
+    UpdatePipe.PIPE_CACHE, UpdatePipe.PIPE_LOAD_WORKERS, UpdatePipe.UpdatePipe = False, 2, record_update
+    try:
+        UpdatePipe.UpdatePipes(paths)
+        expected = [UpdatePipe.LoadPreparedPipe(path) for path in paths]
+    finally:
+        UpdatePipe.PIPE_CACHE, UpdatePipe.PIPE_LOAD_WORKERS, UpdatePipe.UpdatePipe = saved
+
+    assert [path for path, _ in updates] == paths
+    for (_, df_pipe), df_expected in zip(updates, expected):
+        pd.testing.assert_frame_equal(df_pipe, df_expected)
+    assert not UpdatePipe._tracking_workbook['keep']
+
+
+def test_match_header_row():
+    """Both English and French header rows are recognized"""
+    assert UpdatePipe.MatchHeaderRow(['', 'Opportunity Owner', 'Created Date'])[0] == 'English'
+    assert UpdatePipe.MatchHeaderRow(["Propriétaire de l'opportunité", 'Étape'])[0] == 'French'
+    assert UpdatePipe.MatchHeaderRow(['Total', 'Stage', 'Something']) is None
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    with tempfile.TemporaryDirectory() as tmp:
+        test_loader_matches_read_excel(Path(tmp))
+        test_reader_engines_match(Path(tmp))
+        test_csv_export_matches_xlsx(Path(tmp))
+        test_prepared_pipe_schema(Path(tmp))
+        test_export_layout_by_name(Path(tmp))
+        test_loader_column_projection(Path(tmp))
+        test_loader_rejects_invalid_files(Path(tmp))
+        test_validate_pipe_structure(Path(tmp))
+        test_prepared_pipe_cache(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_multi_part_export(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_pipe_manifest(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_watch_pipe_directory(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_update_pipes_prepares_ahead(Path(tmp))
+    test_cleanup_rules_mask()
+    test_match_header_row()
+    print("Pipe loader tests PASSED!")
@@ -187,10 +187,60 @@ def test_week_history_functions():
     print('Week History functions test passed')
     return True
 
+def test_week_columns_setting():
+    """WEEK_COLUMNS sets the number of dynamic week columns, the current week in the middle"""
+    saved = (UpdatePipe.CURWEEK, UpdatePipe.WEEK_COLUMNS)
+    try:
+        UpdatePipe.CURWEEK = 20
+        UpdatePipe.WEEK_COLUMNS = 5
+        assert UpdatePipe.GetDynamicWeekColumns() == ['Week 18', 'Week 19', 'Week 20', 'Week 21', 'Week 22']
+        UpdatePipe.WEEK_COLUMNS = 4
+        assert UpdatePipe.GetDynamicWeekColumns() == ['Week 19', 'Week 20', 'Week 21', 'Week 22']
+        UpdatePipe.WEEK_COLUMNS = 7
+        week_columns = UpdatePipe.GetDynamicWeekColumns()
+        assert week_columns == [f'Week {week}' for week in range(17, 24)]
+
+        # The current week stays the center column of the shift detection
+        master = pd.DataFrame({'Key': [1], 'Other': ['x'], **{col: ['v'] for col in week_columns}})
+        assert UpdatePipe.DetectWeekShift(master)[0] == 0
+
+        # Resizing to the new setting: extra columns dropped, missing ones added empty after the last one
+        five = master.drop(columns=['Week 17', 'Week 23'])
+        resized = UpdatePipe.ResizeMasterWeekColumns(five, week_columns)
+        assert list(resized.columns) == ['Key', 'Other', 'Week 18', 'Week 19', 'Week 20', 'Week 21', 'Week 22',
+                                         'Week 17', 'Week 23']
+        assert resized['Week 23'].tolist() == ['']
+        resized = UpdatePipe.ResizeMasterWeekColumns(master, ['Week 19', 'Week 20', 'Week 21'])
+        assert list(resized.columns) == ['Key', 'Other', 'Week 17', 'Week 18', 'Week 19']
+    finally:
+        UpdatePipe.CURWEEK, UpdatePipe.WEEK_COLUMNS = saved
+
+def test_calendar_table():
+    """The calendar table matches isocalendar() and GetQFFromDate day by day"""
+    dates = pd.Series(pd.date_range('2019-12-20', '2027-01-10', freq='D'))
+    calendar = UpdatePipe.CalendarAttributes(dates)
+
+    assert calendar['ISO Week'].tolist() == [day.isocalendar()[1] for day in dates]
+    assert calendar['ISO Year'].tolist() == [day.isocalendar()[0] for day in dates]
+    assert calendar['Fiscal Quarter'].tolist() == ['Q%dFY%s' % UpdatePipe.GetQFFromDate(day) for day in dates]
+    assert calendar['Week'].iloc[0] == 'W51'
+
+    # 2020 and 2026 have a week 53
+    assert [UpdatePipe.IsoWeeksInYear(year) for year in (2020, 2021, 2025, 2026)] == [53, 52, 52, 53]
+    assert calendar.loc[dates == pd.Timestamp(2027, 1, 1), '53 Weeks'].item()
+
+    # Text dates are parsed, missing dates have no calendar attributes
+    joined = UpdatePipe.CalendarAttributes(pd.Series(['31/12/2024', None], index=[7, 9]))
+    assert list(joined.index) == [7, 9]
+    assert joined.loc[7, 'Week'] == 'W01' and joined.loc[7, 'ISO Year'] == 2025
+    assert joined.loc[9].isna().all()
+
 if __name__ == "__main__":
     try:
         test_week_shift_detection()
         test_week_history_functions()
+        test_calendar_table()
+        test_week_columns_setting()
 
         print("\\n" + "="*50)
         print("TESTING ACTUAL USER SCENARIOS")